@@ -0,0 +1,209 @@
+"""
+EUGW Well-Processing Benchmark
+==============================
+Measures throughput and peak memory of each stage of the parcel-to-well
+path on synthetic EUGW data (eugw_synthetic.py), and fails when a stage
+regresses against a saved baseline.
+
+Stages (per scale):
+  - read:         read the generated parcel table back from disk (CSV)
+  - expand_<eng>: expand parcels to wells with each selected engine
+  - write_csv:    write the well rows to CSV
+  - write_parquet: write the well rows to GeoParquet (if pyarrow is installed)
+
+Each stage runs once untraced for wall time / rows per second, then once
+under tracemalloc for peak memory, so tracing does not skew the timing.
+
+Usage:
+  python benchmark_eugw_wells.py                          # 10k and 100k, compare to baseline
+  python benchmark_eugw_wells.py --rows 10000 100000 1000000
+  python benchmark_eugw_wells.py --engines vectorized rowwise --rows 10000
+  python benchmark_eugw_wells.py --update-baseline        # record a new baseline
+
+Exit code 1 when throughput drops, or peak memory grows, by more than
+--tolerance (default 25%) relative to the baseline.
+"""
+
+import os
+import sys
+import gc
+import json
+import time
+import argparse
+import tempfile
+import tracemalloc
+from datetime import datetime
+
+import pandas as pd
+
+import process_eugw_parcels_to_wells as wells
+from eugw_synthetic import generate_eugw_parcels
+
+# ============================================================
+# CONFIGURATION
+# ============================================================
+
+DEFAULT_ROWS = [10000, 100000]
+DEFAULT_ENGINES = ['vectorized']
+DEFAULT_TOLERANCE = 0.25
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             'benchmark_eugw_wells_baseline.json')
+
+
+# ============================================================
+# MEASUREMENT
+# ============================================================
+
+def measure(func, n_rows):
+    """
+    Run func() twice: once untraced for wall time, then under tracemalloc
+    for peak memory. Returns (result, metrics dict).
+    """
+    gc.collect()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    del result
+
+    gc.collect()
+    tracemalloc.start()
+    result = func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    metrics = {
+        'rows': n_rows,
+        'seconds': round(elapsed, 4),
+        'rows_per_s': round(n_rows / elapsed, 1) if elapsed > 0 else None,
+        'peak_mb': round(peak / 1024 ** 2, 2),
+    }
+    return result, metrics
+
+
+def run_benchmarks(row_counts, engines, workdir):
+    """Run every stage at every scale. Returns {'stage@rows': metrics}."""
+    results = {}
+    for n in row_counts:
+        print(f"\n--- {n} parcels ---")
+        parcels = generate_eugw_parcels(n, seed=0)
+        input_csv = os.path.join(workdir, f"parcels_{n}.csv")
+        parcels.to_csv(input_csv, index=False)
+        del parcels
+
+        df, results[f"read@{n}"] = measure(lambda: pd.read_csv(input_csv), n)
+        print_stage(f"read@{n}", results[f"read@{n}"])
+
+        out_df = None
+        for engine in engines:
+            key = f"expand_{engine}@{n}"
+            (out_df, _), results[key] = measure(lambda: wells.ENGINES[engine](df), n)
+            print_stage(key, results[key])
+
+        n_out = len(out_df)
+        out_csv = os.path.join(workdir, f"wells_{n}.csv")
+        _, results[f"write_csv@{n}"] = measure(
+            lambda: out_df.to_csv(out_csv, index=False), n_out)
+        print_stage(f"write_csv@{n}", results[f"write_csv@{n}"])
+
+        if wells.pa is not None:
+            out_pq = os.path.join(workdir, f"wells_{n}.parquet")
+
+            def write_parquet():
+                writer = wells.ParquetWellWriter(out_pq)
+                writer.write(out_df)
+                writer.close()
+
+            _, results[f"write_parquet@{n}"] = measure(write_parquet, n_out)
+            print_stage(f"write_parquet@{n}", results[f"write_parquet@{n}"])
+
+        del df, out_df
+    return results
+
+
+def print_stage(key, m):
+    print(f"  {key:<28} {m['seconds']:>9.3f} s  {m['rows_per_s'] or 0:>12,.0f} rows/s"
+          f"  {m['peak_mb']:>9.1f} MB peak")
+
+
+# ============================================================
+# REGRESSION CHECK
+# ============================================================
+
+def compare_to_baseline(results, baseline, tolerance):
+    """Return a list of regression messages (empty if none)."""
+    failures = []
+    for key, m in results.items():
+        base = baseline.get(key)
+        if not base:
+            continue
+        if base.get('rows_per_s') and m['rows_per_s'] is not None:
+            floor = base['rows_per_s'] * (1 - tolerance)
+            if m['rows_per_s'] < floor:
+                failures.append(f"{key}: throughput {m['rows_per_s']:,.0f} rows/s "
+                                f"< {floor:,.0f} (baseline {base['rows_per_s']:,.0f})")
+        if base.get('peak_mb'):
+            ceiling = base['peak_mb'] * (1 + tolerance)
+            if m['peak_mb'] > ceiling:
+                failures.append(f"{key}: peak memory {m['peak_mb']:.1f} MB "
+                                f"> {ceiling:.1f} MB (baseline {base['peak_mb']:.1f} MB)")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the EUGW parcel-to-well path.")
+    parser.add_argument('--rows', type=int, nargs='+', default=DEFAULT_ROWS)
+    parser.add_argument('--engines', nargs='+', default=DEFAULT_ENGINES,
+                        choices=sorted(wells.ENGINES))
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument('--update-baseline', action='store_true')
+    parser.add_argument('--report', help="also write this run's results to a JSON file")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("EUGW WELL-PROCESSING BENCHMARK")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        results = run_benchmarks(args.rows, args.engines, workdir)
+
+    run = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'pandas': pd.__version__,
+        'results': results,
+    }
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(run, f, indent=2)
+
+    if args.update_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f).get('results', {})
+        baseline.update(results)
+        run['results'] = baseline
+        with open(args.baseline, 'w') as f:
+            json.dump(run, f, indent=2)
+        print(f"\nBaseline updated: {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --update-baseline to record one.")
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f).get('results', {})
+    failures = compare_to_baseline(results, baseline, args.tolerance)
+
+    print(f"\n--- Regression check (tolerance {args.tolerance:.0%}) ---")
+    if failures:
+        for msg in failures:
+            print(f"  REGRESSION {msg}")
+        sys.exit(1)
+    print("  No regressions.")
+
+
+if __name__ == '__main__':
+    main()
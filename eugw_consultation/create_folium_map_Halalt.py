@@ -38,6 +38,8 @@ import io
 import datetime as dt
 import timeit
 
+from eugw_aoi import esri_to_gdf
+
 
 # ============================================================
 # CONFIGURATION
@@ -109,20 +111,6 @@ MAX_RADIUS = 20
 # DATA READING
 # ============================================================
 
-def esri_to_gdf(aoi):
-    """Returns a GeoDataFrame from an ESRI shp or featureclass (gdb)"""
-    if '.shp' in aoi:
-        gdf = gpd.read_file(aoi)
-    elif '.gdb' in aoi:
-        l = aoi.split('.gdb')
-        gdb = l[0] + '.gdb'
-        fc = os.path.basename(aoi)
-        gdf = gpd.read_file(filename=gdb, layer=fc)
-    else:
-        raise Exception('Format not recognized. Please provide a shp or featureclass (gdb)!')
-    return gdf
-
-
 def flatten_to_2d(gdf):
     """Flattens 3D geometries to 2D"""
     for i, row in gdf.iterrows():
@@ -0,0 +1,97 @@
+"""
+EUGW AOI Coordinate Validation
+==============================
+Point-in-polygon check of EUGW well locations against the provincial
+boundary or a project AOI, replacing the lat/lon rectangle as the test of
+a "valid" location.
+
+parse_coordinates still drops tokens outside the BC bounding box
+(48 < lat < 60, -140 < lon < -114); that box lets offshore and
+out-of-province points through (Washington, Alberta, Alaska panhandle,
+open Pacific). After expansion (and GWELLS recovery), every located row is
+tested against the AOI in one vectorized call:
+  - the AOI parts are dissolved into one geometry, reprojected to WGS84
+    and prepared (shapely.prepare), so each test hits its edge index
+  - shapely.contains_xy runs over the lat/lon arrays of all candidate rows
+  - rows that fall outside get coord_status 'outside_aoi'; lat/lon are
+    kept so the points can be reviewed on a map
+
+Input: shp, featureclass (path inside a .gdb) or any file geopandas reads
+       (e.g. GeoJSON, GeoPackage), or a shapely geometry in lon/lat.
+"""
+
+import os
+
+import numpy as np
+import shapely
+
+try:
+    import geopandas as gpd
+except ImportError:  # AOI files need geopandas; shapely geometries do not
+    gpd = None
+
+from eugw_gwells import LOCATED_STATUS
+
+
+OUTSIDE_STATUS = 'outside_aoi'
+
+
+# ============================================================
+# AOI LOADING
+# ============================================================
+
+def esri_to_gdf(aoi):
+    """Returns a GeoDataFrame from a shp, featureclass (gdb) or other vector file"""
+    if gpd is None:
+        raise ImportError("Reading an AOI file requires geopandas")
+    aoi = str(aoi)
+    if '.gdb' in aoi:
+        l = aoi.split('.gdb')
+        gdb = l[0] + '.gdb'
+        fc = os.path.basename(aoi)
+        return gpd.read_file(filename=gdb, layer=fc)
+    return gpd.read_file(aoi)
+
+
+def load_aoi(aoi):
+    """
+    Load the AOI as one prepared WGS84 (lon/lat) geometry.
+    aoi: file path (see esri_to_gdf) or a shapely geometry in lon/lat.
+    """
+    if isinstance(aoi, shapely.Geometry):
+        geom = aoi
+    else:
+        gdf = esri_to_gdf(aoi)
+        if gdf.crs is not None and gdf.crs.to_epsg() != 4326:
+            gdf = gdf.to_crs('epsg:4326')
+        geom = shapely.union_all(shapely.force_2d(gdf.geometry.values))
+        print(f"AOI: {len(gdf)} features from {aoi}")
+
+    if geom is None or geom.is_empty:
+        raise ValueError("AOI geometry is empty")
+    shapely.prepare(geom)
+    return geom
+
+
+# ============================================================
+# VALIDATION
+# ============================================================
+
+def validate_coordinates(out_df, aoi_geom):
+    """
+    Set coord_status to 'outside_aoi' for located rows whose point is not
+    inside the AOI. Returns (out_df, n_outside). out_df is modified in place.
+    """
+    status = out_df['coord_status'].to_numpy(dtype=object)
+    rows = np.flatnonzero(np.isin(status, LOCATED_STATUS))
+    if len(rows) == 0:
+        return out_df, 0
+
+    lon = out_df['pt_longitude'].to_numpy(dtype=float, na_value=np.nan)[rows]
+    lat = out_df['pt_latitude'].to_numpy(dtype=float, na_value=np.nan)[rows]
+    inside = shapely.contains_xy(aoi_geom, lon, lat)
+
+    outside = rows[~inside]
+    if len(outside):
+        out_df.iloc[outside, out_df.columns.get_loc('coord_status')] = OUTSIDE_STATUS
+    return out_df, len(outside)
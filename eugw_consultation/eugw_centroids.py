@@ -0,0 +1,705 @@
+"""
+EUGW Parcel Centroids - Open-Source Backend
+===========================================
+arcpy-free version of process_eugw_centroids.py for the Linux processing
+nodes. Same output fields and rules, computed column-wise:
+
+  - EUGW_Master_Spatial is streamed with pyogrio's Arrow reader (or from a
+    GeoParquet export) in batches of batch_size parcels, each one attribute
+    table + one geometry array
+  - each batch's centroids come from one shapely.centroid call; as with arcpy's
+    shape.centroid, a centroid that falls outside its polygon is replaced by
+    a point on the surface; null and zero-area polygons are skipped
+  - with workers > 1, each batch is split into spatially coherent chunks
+    (Z-order of the polygon bounding-box centres, balanced by vertex count)
+    whose centroids are computed in a process pool and merged back in input
+    order, so the output equals a single-process run
+  - cls_purpose, qty_cmd, qty_cmd_log and qty_flag are derived for all
+    parcels at once and match the arcpy script's per-row functions
+  - output is a GeoPackage (pyogrio) or GeoParquet (.parquet/.geoparquet),
+    written batch by batch
+  - with delta=True every centroid carries src_hash, the fingerprint of its
+    source feature (attributes + geometry WKB), so the next delta run can
+    refresh the output in place (see DELTA REFRESH). Full builds skip the
+    fingerprints; the first delta run against such an output rebuilds it
+
+Usage:
+    from eugw_centroids import run_centroids
+    run_centroids(INPUT_GDB, 'EUGW_Parcel_Centroids.gpkg', layer='EUGW_Master_Spatial')
+"""
+
+import os
+import json
+import math
+import sqlite3
+import hashlib
+from contextlib import closing
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import shapely
+
+try:
+    import pyogrio
+except ImportError:
+    pyogrio = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pc = pq = None
+
+try:
+    import pyproj
+except ImportError:
+    pyproj = None
+
+from eugw_stats import StreamingStats
+from eugw_normalize import (parse_floats, units_to_cmd, convertible_units,
+                            classify_purposes, UNKNOWN_PURPOSE, UNIT_CONVERSIONS,
+                            NON_VOLUMETRIC_UNITS, PARCEL_UNITS, MULTI_COMMERCIAL,
+                            MULTI_NO_COMMERCIAL)
+
+
+NEW_FIELDS = ['cls_purpose', 'qty_cmd', 'qty_cmd_log', 'qty_flag']
+HASH_FIELD = 'src_hash'
+HASH_FIELD_LENGTH = 40
+OUTPUT_LAYER = 'EUGW_Parcel_Centroids'
+SKIP_FIELDS = ('SHAPE', 'SHAPE_LENGTH', 'SHAPE_AREA', 'OBJECTID', 'FID')
+MISSING_TOKENS = ('', 'None', 'nan')
+MAX_FIELD_NAME = 64
+PARQUET_EXTENSIONS = ('.parquet', '.geoparquet')
+DEFAULT_BATCH_SIZE = 50000
+CHUNKS_PER_WORKER = 4     # more chunks than workers evens out expensive multipart parcels
+ZORDER_BITS = 16          # grid resolution of the spatial sort (2^16 cells per axis)
+
+
+# ============================================================
+# READING
+# ============================================================
+
+def _split_table(table, geom_col):
+    """
+    Arrow table -> (attrs DataFrame without shape/OID fields, shapely geometry
+    array, geometry WKB array).
+    """
+    wkb = table.column(geom_col).to_numpy(zero_copy_only=False)
+    geoms = shapely.from_wkb(wkb)
+    attrs = table.drop_columns([geom_col]).to_pandas()
+    attrs = attrs[[c for c in attrs.columns if str(c).upper() not in SKIP_FIELDS]]
+    return attrs, geoms, wkb
+
+
+def _parquet_geo(path):
+    """(geometry column, crs string or None) from GeoParquet metadata."""
+    geo = json.loads((pq.read_schema(path).metadata or {}).get(b'geo', b'{}'))
+    geom_col = geo.get('primary_column', 'geometry')
+    crs = geo.get('columns', {}).get(geom_col, {}).get('crs')
+    if isinstance(crs, dict) and pyproj is not None:
+        crs = pyproj.CRS.from_json_dict(crs).to_string()
+    return geom_col, crs
+
+
+def parcel_crs(path, layer=None):
+    """CRS of the parcel layer (e.g. 'EPSG:3005'), or None."""
+    if str(path).lower().endswith(PARQUET_EXTENSIONS):
+        return _parquet_geo(path)[1]
+    if pyogrio is None:
+        raise ImportError("Reading a GDB/GPKG layer requires pyogrio")
+    return pyogrio.read_info(path, layer=layer)['crs']
+
+
+def read_parcel_polygons(path, layer=None):
+    """
+    Read parcel polygons and their attributes in one columnar pass.
+    Returns (attrs DataFrame, geometry ndarray, crs string or None).
+    """
+    if str(path).lower().endswith(PARQUET_EXTENSIONS):
+        geom_col, crs = _parquet_geo(path)
+        table = pq.read_table(path)
+    else:
+        if pyogrio is None:
+            raise ImportError("Reading a GDB/GPKG layer requires pyogrio")
+        meta, table = pyogrio.read_arrow(path, layer=layer)
+        geom_col = meta.get('geometry_name') or 'wkb_geometry'
+        crs = meta.get('crs')
+    attrs, geoms, _ = _split_table(table, geom_col)
+    return attrs, geoms, crs
+
+
+def iter_parcel_batches(path, layer=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Yield (attrs DataFrame, geometry ndarray, WKB ndarray) for consecutive
+    batches of batch_size parcels, streamed as Arrow record batches.
+    """
+    if str(path).lower().endswith(PARQUET_EXTENSIONS):
+        geom_col = _parquet_geo(path)[0]
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size):
+            yield _split_table(pa.Table.from_batches([batch]), geom_col)
+        return
+
+    if pyogrio is None:
+        raise ImportError("Reading a GDB/GPKG layer requires pyogrio")
+    with pyogrio.raw.open_arrow(path, layer=layer, batch_size=batch_size,
+                                use_pyarrow=True) as (meta, reader):
+        geom_col = meta.get('geometry_name') or 'wkb_geometry'
+        for batch in reader:
+            yield _split_table(pa.Table.from_batches([batch]), geom_col)
+
+
+# ============================================================
+# COLUMN-WISE NORMALIZATION
+# ============================================================
+
+def _split_tokens(values):
+    """Explode comma-separated strings to (row, pos, token) with stripped tokens."""
+    tokens = values.str.split(',').explode()
+    rows = tokens.index.to_numpy(dtype=np.int64)
+    pos = tokens.groupby(level=0, sort=False).cumcount().to_numpy(dtype=np.int64)
+    return rows, pos, tokens.str.strip().to_numpy(dtype=object)
+
+
+def sum_quantities(qty, units):
+    """
+    Sum every quantity of a parcel in CMD, column-wise (the per-row rule it
+    matches is kept as a reference in tests/test_centroids.py).
+    Units pad with the last unit and convert by eugw_normalize.UNIT_CONVERSIONS
+    (PARCEL_UNITS only); quantities with other units are dropped from the sum.
+    Returns (qty_cmd float array with NaN for None, qty_flag object array).
+    """
+    qty = pd.Series(qty, dtype=object).reset_index(drop=True)
+    units = pd.Series(units, dtype=object).reset_index(drop=True)
+    n = len(qty)
+    qty_cmd = np.full(n, np.nan)
+    flags = np.full(n, 'no_quantity', dtype=object)
+
+    q_text = qty.astype(str).str.strip()
+    has = (qty.notna() & units.notna()).to_numpy() & ~q_text.isin(MISSING_TOKENS).to_numpy()
+    idx = np.flatnonzero(has)
+    if len(idx) == 0:
+        return qty_cmd, flags
+
+    q_rows, q_pos, q_tok = _split_tokens(q_text.iloc[idx])
+    u_rows, u_pos, u_tok = _split_tokens(units.iloc[idx].astype(str).str.strip())
+
+    # Pad units with the last unit: quantity at pos uses unit min(pos, n_units - 1)
+    n_units = np.bincount(u_rows, minlength=n)
+    u_start = np.concatenate([[0], np.cumsum(n_units)])[:-1]
+    unit = u_tok[u_start[q_rows] + np.minimum(q_pos, n_units[q_rows] - 1)]
+
+    value, parsed = parse_floats(q_tok)
+    cmd = units_to_cmd(value, unit)
+    converted = parsed & convertible_units(unit)
+
+    # Left-to-right sum per parcel, one token position at a time (same as sum())
+    total = np.zeros(n)
+    for p in range(int(q_pos.max()) + 1):
+        at = converted & (q_pos == p)
+        total[q_rows[at]] += cmd[at]
+
+    n_qtys = np.bincount(q_rows, minlength=n)
+    n_conv = np.bincount(q_rows[converted], minlength=n)
+
+    flag = np.where(n_qtys[idx] == 1, 'direct', 'summed').astype(object)
+    partial = n_conv[idx] < n_qtys[idx]
+    flag[partial] = flag[partial] + '_partial_unconvertible'
+    none = n_conv[idx] == 0
+    flag[none] = 'unconvertible_units'
+
+    flags[idx] = flag
+    qty_cmd[idx] = np.where(none, np.nan, total[idx])
+    return qty_cmd, flags
+
+
+def log_quantities(qty_cmd):
+    """
+    qty_cmd_log: log10(qty_cmd + 1) for positive quantities, NaN otherwise.
+    Uses math.log10 (np.log10 can differ in the last bit) to match the arcpy output.
+    """
+    qty_cmd = np.asarray(qty_cmd, dtype=float)
+    out = np.full(len(qty_cmd), np.nan)
+    pos = qty_cmd > 0
+    out[pos] = np.fromiter(map(math.log10, qty_cmd[pos] + 1), dtype=float, count=int(pos.sum()))
+    return out
+
+
+# ============================================================
+# CENTROIDS
+# ============================================================
+
+def polygon_centroids(geoms):
+    """
+    Centroids of all polygons in one call. A centroid outside its polygon is
+    replaced by shapely.point_on_surface (as arcpy's shape.centroid does).
+    Returns (points for the kept polygons, kept mask); null/zero-area polygons are dropped.
+    """
+    geoms = np.asarray(geoms, dtype=object)
+    area = shapely.area(geoms)
+    kept = ~shapely.is_missing(geoms) & (np.nan_to_num(area) > 0)
+
+    polys = geoms[kept]
+    points = shapely.centroid(polys)
+    outside = ~shapely.intersects(points, polys)
+    if outside.any():
+        points[outside] = shapely.point_on_surface(polys[outside])
+    return shapely.force_2d(points), kept
+
+
+def zorder_keys(geoms, bits=ZORDER_BITS):
+    """
+    Z-order (Morton) key of each polygon's bounding-box centre on a
+    2^bits x 2^bits grid over the batch extent; missing geometries get key 0.
+    """
+    bounds = shapely.bounds(geoms)
+    cx = (bounds[:, 0] + bounds[:, 2]) / 2
+    cy = (bounds[:, 1] + bounds[:, 3]) / 2
+    valid = np.isfinite(cx) & np.isfinite(cy)
+    keys = np.zeros(len(geoms), dtype=np.uint64)
+    if not valid.any():
+        return keys
+
+    cells = (1 << bits) - 1
+    def grid(v):
+        lo, hi = v[valid].min(), v[valid].max()
+        scaled = (v[valid] - lo) / (hi - lo) if hi > lo else np.zeros(valid.sum())
+        return np.round(scaled * cells).astype(np.uint64)
+
+    gx, gy = grid(cx), grid(cy)
+    z = np.zeros(len(gx), dtype=np.uint64)
+    for b in range(bits):
+        bit = np.uint64(b)
+        z |= ((gx >> bit) & np.uint64(1)) << np.uint64(2 * b)
+        z |= ((gy >> bit) & np.uint64(1)) << np.uint64(2 * b + 1)
+    keys[valid] = z
+    return keys
+
+
+def spatial_chunks(geoms, n_chunks):
+    """
+    Split row positions into n_chunks spatially coherent chunks: rows sorted
+    by Z-order, cut where the running vertex count crosses equal shares.
+    Returns a list of position arrays.
+    """
+    order = np.argsort(zorder_keys(geoms), kind='stable')
+    work = np.cumsum(shapely.get_num_coordinates(geoms)[order] + 1)
+    cuts = np.searchsorted(work, work[-1] * np.arange(1, n_chunks) / n_chunks) if len(work) else []
+    return [part for part in np.split(order, cuts) if len(part)]
+
+
+def _centroid_chunk(wkb):
+    """Worker entry point: (x, y, kept) of polygon_centroids for one chunk of WKB."""
+    points, kept = polygon_centroids(shapely.from_wkb(wkb))
+    return shapely.get_x(points), shapely.get_y(points), kept
+
+
+def polygon_centroids_parallel(geoms, wkb, executor, n_chunks):
+    """
+    polygon_centroids over spatial chunks in a process pool, merged back in
+    input order. Workers get the chunk's WKB (cheap to pickle, unlike
+    geometries) and parse it themselves.
+    Returns the same (points, kept) as polygon_centroids.
+    """
+    geoms = np.asarray(geoms, dtype=object)
+    wkb = np.asarray(wkb, dtype=object)
+    parts = spatial_chunks(geoms, max(1, min(n_chunks, len(geoms))))
+    x = np.full(len(geoms), np.nan)
+    y = np.full(len(geoms), np.nan)
+    kept = np.zeros(len(geoms), dtype=bool)
+    # executor.map yields results in submission order
+    for rows, (px, py, pk) in zip(parts, executor.map(_centroid_chunk, [wkb[r] for r in parts])):
+        kept[rows] = pk
+        x[rows[pk]] = px
+        y[rows[pk]] = py
+    return shapely.points(x[kept], y[kept]), kept
+
+
+def _field(attrs, name):
+    """Column of attrs, or all None if the layer lacks it (as get_val returns None)."""
+    if name in attrs.columns:
+        return attrs[name]
+    return pd.Series([None] * len(attrs), dtype=object)
+
+
+def derive_fields(attrs):
+    """cls_purpose, qty_cmd, qty_cmd_log and qty_flag for a batch of parcel attributes."""
+    qty_cmd, qty_flag = sum_quantities(_field(attrs, 'Quantity'), _field(attrs, 'Quantity_Units'))
+    return pd.DataFrame({
+        'cls_purpose': classify_purposes(_field(attrs, 'App_Purpose_Name'), MISSING_TOKENS),
+        'qty_cmd': qty_cmd,
+        'qty_cmd_log': log_quantities(qty_cmd),
+        'qty_flag': qty_flag,
+    })
+
+
+def compute_centroids(attrs, geoms, keys=None, wkb=None, executor=None, chunks=1):
+    """
+    Build the centroid output for one batch of parcels.
+    keys: source fingerprint keys (SourceFingerprints.keys), written as HASH_FIELD.
+    wkb/executor/chunks: compute the centroids from the WKB in this process
+    pool, in chunks.
+    Returns (out_df: NEW_FIELDS [+ HASH_FIELD] + original fields, points, counts).
+    """
+    if executor is not None and len(geoms):
+        if wkb is None:
+            wkb = shapely.to_wkb(geoms)
+        points, kept = polygon_centroids_parallel(geoms, wkb, executor, chunks)
+    else:
+        points, kept = polygon_centroids(geoms)
+    attrs = attrs.loc[kept].reset_index(drop=True)
+
+    out = derive_fields(attrs)
+    if keys is not None:
+        out[HASH_FIELD] = np.asarray(keys, dtype=object)[kept]
+    renamed = attrs.rename(columns={c: str(c)[:MAX_FIELD_NAME] for c in attrs.columns})
+    out = pd.concat([out, renamed], axis=1)
+
+    counts = {'total': len(kept), 'success': int(kept.sum()), 'null_geometry': int((~kept).sum())}
+    return out, points, counts
+
+
+# ============================================================
+# WRITING
+# ============================================================
+
+def _geo_metadata(crs):
+    column = {'encoding': 'WKB', 'geometry_types': ['Point']}
+    if crs is not None:
+        if pyproj is None:
+            raise ImportError("GeoParquet output with a CRS requires pyproj")
+        column['crs'] = pyproj.CRS.from_user_input(crs).to_json_dict()
+    return {'version': '1.0.0', 'primary_column': 'geometry', 'columns': {'geometry': column}}
+
+
+class CentroidWriter:
+    """
+    Write centroid batches to GeoParquet (.parquet/.geoparquet, one row group
+    per batch) or append them to a GeoPackage layer.
+    append: add to the existing GeoPackage layer instead of replacing it.
+    schema: Arrow schema for GeoParquet output (default: from the first batch).
+    """
+
+    def __init__(self, output_path, crs, layer=None, append=False, schema=None):
+        self.output_path = output_path
+        self.crs = crs
+        self.layer = layer or OUTPUT_LAYER
+        self.parquet = str(output_path).lower().endswith(PARQUET_EXTENSIONS)
+        if self.parquet and pa is None:
+            raise ImportError("GeoParquet output requires pyarrow")
+        if not self.parquet and pyogrio is None:
+            raise ImportError("GeoPackage output requires pyogrio")
+        self.writer = pq.ParquetWriter(output_path, schema) if schema is not None else None
+        self.started = append
+
+    def _parquet_table(self, out_df, wkb):
+        schema = None
+        if self.writer is not None:
+            schema = pa.schema([f for f in self.writer.schema if f.name != 'geometry'])
+        table = pa.Table.from_pandas(out_df, schema=schema, preserve_index=False)
+        if schema is None:
+            # All-null columns in the first batch would fix the type to null
+            table = table.cast(pa.schema([pa.field(f.name, pa.string()) if pa.types.is_null(f.type)
+                                          else f for f in table.schema]))
+        table = table.append_column('geometry', pa.array(wkb, pa.binary()))
+        return table.replace_schema_metadata(
+            {b'geo': json.dumps(_geo_metadata(self.crs)).encode('utf-8')})
+
+    def write(self, out_df, points):
+        wkb = shapely.to_wkb(points)
+        if self.parquet:
+            table = self._parquet_table(out_df, wkb)
+            if self.writer is None:
+                self.writer = pq.ParquetWriter(self.output_path, table.schema)
+            self.writer.write_table(table)
+        else:
+            field_data = [out_df[c].to_numpy(dtype=object) if out_df[c].dtype == object
+                          or pd.api.types.is_string_dtype(out_df[c]) else out_df[c].to_numpy()
+                          for c in out_df.columns]
+            pyogrio.raw.write(self.output_path, wkb, field_data, list(out_df.columns),
+                              layer=self.layer, driver='GPKG', geometry_type='Point',
+                              crs=self.crs, append=self.started)
+        self.started = True
+
+    def copy_from(self, path, drop_keys):
+        """
+        Append the rows of an existing GeoParquet output (same schema) whose
+        HASH_FIELD is not in drop_keys, batch by batch. Returns rows copied.
+        """
+        source = pq.ParquetFile(path)
+        drop = pa.array(sorted(drop_keys), pa.string())
+        copied = 0
+        for batch in source.iter_batches():
+            table = pa.Table.from_batches([batch])
+            table = table.filter(pc.invert(pc.is_in(table.column(HASH_FIELD), value_set=drop)))
+            if table.num_rows == 0:
+                continue
+            self.writer.write_table(table.cast(self.writer.schema))
+            copied += table.num_rows
+        return copied
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+# ============================================================
+# SUMMARY
+# ============================================================
+
+class CentroidSummary:
+    """
+    Purpose/flag counts and qty_cmd / qty_cmd_log statistics, accumulated
+    while centroids are written (per row with add() or per batch with
+    add_batch()), so the output never has to be read back.
+    """
+
+    def __init__(self):
+        self.purposes = Counter()
+        self.flags = Counter()
+        self.qty = StreamingStats()
+        self.qty_log = StreamingStats()
+
+    def add(self, cls_purpose, qty_cmd, qty_cmd_log, qty_flag):
+        self.purposes[cls_purpose if cls_purpose else UNKNOWN_PURPOSE] += 1
+        self.flags[qty_flag if qty_flag else 'unknown'] += 1
+        self.qty.add(qty_cmd)
+        self.qty_log.add(qty_cmd_log)
+
+    def add_batch(self, out_df):
+        self.purposes.update(out_df['cls_purpose'].fillna(UNKNOWN_PURPOSE).replace('', UNKNOWN_PURPOSE)
+                             .value_counts(sort=False).to_dict())
+        self.flags.update(out_df['qty_flag'].fillna('unknown').replace('', 'unknown')
+                          .value_counts(sort=False).to_dict())
+        self.qty.add_many(out_df['qty_cmd'].to_numpy(dtype=float, na_value=np.nan))
+        self.qty_log.add_many(out_df['qty_cmd_log'].to_numpy(dtype=float, na_value=np.nan))
+
+    def print(self, counts, output_count, output_path):
+        print(f"\n{'='*60}")
+        print(f"PROCESSING SUMMARY")
+        print(f"{'='*60}")
+        print(f"Input polygons:     {counts['total']}")
+        print(f"Output centroids:   {output_count}")
+        print(f"Null geometry:      {counts['null_geometry']}")
+
+        print(f"\n--- Purpose Classification ---")
+        for p, c in self.purposes.most_common():
+            print(f"  {p}: {c}")
+
+        print(f"\n--- Quantity Flag ---")
+        for f, c in self.flags.most_common():
+            print(f"  {f}: {c}")
+
+        print(f"\n--- Quantity Stats (CMD) ---")
+        if self.qty.count:
+            print(f"  Records with valid qty: {self.qty.count}")
+            print(f"  Records with NULL qty:  {self.qty.nulls}")
+            print(f"  Min:    {self.qty.min:.4f}")
+            print(f"  Max:    {self.qty.max:.4f}")
+            print(f"  Mean:   {self.qty.mean:.4f}")
+            print(f"  Median: {self.qty.quantile(0.5):.4f} (approx.)")
+
+        print(f"\n--- Quantity Stats (Log10) ---")
+        if self.qty_log.count:
+            print(f"  Records with valid log: {self.qty_log.count}")
+            print(f"  Min:    {self.qty_log.min:.4f}")
+            print(f"  Max:    {self.qty_log.max:.4f}")
+            print(f"  Mean:   {self.qty_log.mean:.4f}")
+
+        print(f"\nOutput saved to: {output_path}")
+
+
+# ============================================================
+# DELTA REFRESH (per-feature fingerprints)
+# ============================================================
+# Each centroid stores the fingerprint key of its source feature in
+# HASH_FIELD. A delta run fingerprints the source again and compares keys:
+#   - key already in the output -> unchanged, nothing is computed or written
+#   - key not in the output     -> new or edited feature, centroid inserted
+#   - output key not in source  -> removed or edited feature, centroid deleted
+# An edited parcel is therefore an update done as delete + insert. Changing
+# the normalization rules or the source schema changes every key, so the
+# next delta run replaces everything.
+
+def _hash_key(columns):
+    """16-character hash key over the normalization rules and the attribute columns."""
+    rules = repr((sorted(UNIT_CONVERSIONS.items()), NON_VOLUMETRIC_UNITS, PARCEL_UNITS, MISSING_TOKENS,
+                  MULTI_COMMERCIAL, MULTI_NO_COMMERCIAL, NEW_FIELDS, [str(c) for c in columns]))
+    return hashlib.md5(rules.encode('utf-8')).hexdigest()[:16]
+
+
+class SourceFingerprints:
+    """
+    Fingerprint keys of source features over their attributes and geometry
+    WKB. Keys are unique within a run: the k-th repeat of an identical
+    feature gets a '-k' suffix, so duplicates match one to one between runs.
+    """
+
+    def __init__(self):
+        self.seen = Counter()
+        self.keys_seen = set()
+
+    def keys(self, attrs, wkb):
+        """Object array of keys for one batch, in row order."""
+        content = attrs.reset_index(drop=True).copy()
+        # arcpy returns SHAPE@WKB as bytearray, which cannot be hashed
+        content['__geometry__'] = pd.Series([None if w is None else bytes(w) for w in wkb], dtype=object)
+        hashes = pd.Series(pd.util.hash_pandas_object(
+            content, index=False, hash_key=_hash_key(attrs.columns)).to_numpy(dtype=np.uint64))
+
+        repeat = hashes.groupby(hashes, sort=False).cumcount().to_numpy() \
+            + hashes.map(self.seen).fillna(0).to_numpy(dtype=np.int64)
+        self.seen.update(hashes.value_counts(sort=False).to_dict())
+
+        keys = np.array([f"{h:016x}" if k == 0 else f"{h:016x}-{k}"
+                         for h, k in zip(hashes.tolist(), repeat.tolist())], dtype=object)
+        self.keys_seen.update(keys)
+        return keys
+
+
+def in_output(keys, output_keys):
+    """Boolean mask: fingerprint key is already in the output."""
+    return np.fromiter((k in output_keys for k in keys), dtype=bool, count=len(keys))
+
+
+def output_fields(input_path, layer=None):
+    """Attribute fields of the centroid output for a parcel layer, in output order."""
+    if str(input_path).lower().endswith(PARQUET_EXTENSIONS):
+        geom_col = _parquet_geo(input_path)[0]
+        names = [n for n in pq.read_schema(input_path).names if n != geom_col]
+    else:
+        if pyogrio is None:
+            raise ImportError("Reading a GDB/GPKG layer requires pyogrio")
+        names = list(pyogrio.read_info(input_path, layer=layer)['fields'])
+    names = [str(n)[:MAX_FIELD_NAME] for n in names if str(n).upper() not in SKIP_FIELDS]
+    return NEW_FIELDS + [HASH_FIELD] + names
+
+
+def read_output_keys(output_path, layer=None, fields=None):
+    """
+    Fingerprint keys stored in an existing output, or None when it cannot be
+    refreshed: no output yet, or its fields differ from fields (written before
+    HASH_FIELD existed, or the source schema changed).
+    """
+    if not os.path.exists(output_path):
+        return None
+    if str(output_path).lower().endswith(PARQUET_EXTENSIONS):
+        existing = [n for n in pq.read_schema(output_path).names if n != 'geometry']
+        if HASH_FIELD not in existing or (fields is not None and existing != list(fields)):
+            return None
+        column = pq.read_table(output_path, columns=[HASH_FIELD]).column(HASH_FIELD)
+    else:
+        if pyogrio is None:
+            raise ImportError("Reading a GeoPackage layer requires pyogrio")
+        layer = layer or OUTPUT_LAYER
+        if layer not in pyogrio.list_layers(output_path)[:, 0]:
+            return None
+        existing = list(pyogrio.read_info(output_path, layer=layer)['fields'])
+        if HASH_FIELD not in existing or (fields is not None and existing != list(fields)):
+            return None
+        column = pyogrio.read_arrow(output_path, layer=layer, columns=[HASH_FIELD],
+                                    read_geometry=False)[1].column(HASH_FIELD)
+    return set(column.to_pylist())
+
+
+def delete_gpkg_keys(output_path, layer, keys):
+    """Delete the GeoPackage rows whose HASH_FIELD is in keys. Returns rows deleted."""
+    with closing(sqlite3.connect(output_path)) as con:
+        con.execute("CREATE TEMP TABLE stale_keys (k TEXT PRIMARY KEY)")
+        con.executemany("INSERT INTO stale_keys VALUES (?)", ((k,) for k in keys))
+        cur = con.execute(f'DELETE FROM "{layer}" WHERE "{HASH_FIELD}" IN (SELECT k FROM stale_keys)')
+        con.commit()
+        return cur.rowcount
+
+
+def print_delta_report(counts):
+    print(f"\n--- Delta Refresh ---")
+    print(f"  Unchanged:                   {counts['unchanged']}")
+    print(f"  Inserted (new or edited):    {counts['inserted']}")
+    print(f"  Deleted (removed or edited): {counts['deleted']}")
+
+
+# ============================================================
+# MAIN PROCESSING
+# ============================================================
+
+def run_centroids(input_path, output_path, layer=None, output_layer=None,
+                  batch_size=DEFAULT_BATCH_SIZE, delta=False, workers=None):
+    """
+    Read parcel polygons batch by batch, compute centroids and derived
+    fields column-wise, and append each batch to the output.
+
+    delta: refresh an existing output instead of rebuilding it. Only the
+           centroids of new, edited and removed parcels are inserted or
+           deleted (GeoPackage: in place; GeoParquet cannot be edited, so
+           the kept rows are copied into a new file without recomputing them).
+           Falls back to a full build when there is no fingerprinted output.
+           Only delta runs fingerprint the source and write HASH_FIELD.
+    workers: if > 1, compute each batch's centroids in this many processes.
+    """
+    print(f"Reading: {input_path}" + (f" (layer {layer})" if layer else ''))
+    crs = parcel_crs(input_path, layer)
+    print(f"Spatial reference: {crs}")
+
+    output_keys = None
+    if delta:
+        output_keys = read_output_keys(output_path, output_layer, output_fields(input_path, layer))
+    refresh = output_keys is not None
+    if delta:
+        print(f"Delta: {len(output_keys)} centroids in {output_path}" if refresh
+              else f"Delta: no matching fingerprinted output at {output_path}, building everything")
+    parquet = str(output_path).lower().endswith(PARQUET_EXTENSIONS)
+    target = '.tmp'.join(os.path.splitext(output_path)) if refresh and parquet else output_path
+    schema = pq.read_schema(output_path) if refresh and parquet else None
+
+    counts = Counter()
+    summary = CentroidSummary()
+    fingerprints = SourceFingerprints() if delta else None
+    writer = CentroidWriter(target, crs, output_layer, append=refresh and not parquet, schema=schema)
+    executor = None
+    if workers and workers > 1:
+        print(f"Computing centroids with {workers} worker processes")
+        executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        for attrs, geoms, wkb in iter_parcel_batches(input_path, layer, batch_size):
+            keys = fingerprints.keys(attrs, wkb) if delta else None
+            batch_total = len(attrs)
+            if refresh:
+                unchanged = in_output(keys, output_keys)
+                # Unchanged centroids are not rewritten, only counted in the summary
+                summary.add_batch(derive_fields(attrs.loc[unchanged]))
+                counts['unchanged'] += int(unchanged.sum())
+                counts['success'] += int(unchanged.sum())
+                attrs, geoms, wkb, keys = (attrs.loc[~unchanged], geoms[~unchanged],
+                                           wkb[~unchanged], keys[~unchanged])
+
+            out_df, points, batch_counts = compute_centroids(
+                attrs, geoms, keys, wkb, executor, (workers or 1) * CHUNKS_PER_WORKER)
+            if len(out_df) or not refresh:
+                writer.write(out_df, points)
+            summary.add_batch(out_df)
+            batch_counts['total'] = batch_total
+            counts.update(batch_counts)
+            counts['inserted'] += batch_counts['success']
+            print(f"  Processed {counts['total']} features...")
+
+        if refresh:
+            stale = output_keys - fingerprints.keys_seen
+            if parquet:
+                writer.copy_from(output_path, stale)
+                counts['deleted'] = len(stale)
+            else:
+                counts['deleted'] = delete_gpkg_keys(output_path, writer.layer, stale) if stale else 0
+    finally:
+        writer.close()
+        if executor is not None:
+            executor.shutdown()
+    if target != output_path:
+        os.replace(target, output_path)
+
+    summary.print(counts, counts['success'], output_path)
+    if refresh:
+        print_delta_report(counts)
+    return dict(counts)
@@ -0,0 +1,138 @@
+"""
+GWELLS Coordinate Recovery
+==========================
+Recovers locations for EUGW well rows that came out of process_eugw with
+coord_status 'no_coordinates' or 'invalid_coordinates', by looking up their
+Well Tag Numbers in a local GWELLS extract.
+
+Input:  GWELLS extract (CSV or Parquet), e.g. the GWELLS data export well.csv
+        (well_tag_number, latitude_Decdeg, longitude_Decdeg) or a BCGW export
+        of GW_WATER_WELLS_WRBC_SVW (WELL_TAG_NUMBER, LATITUDE, LONGITUDE).
+        Column names are matched case-insensitively.
+
+The extract is loaded once into a hash index on the normalized WTN
+(integer string, same rule as total_withdrawal_raster.normalize_wtn).
+All recoverable rows are then resolved in one batch join:
+  - every WTN on the parcel is tried, in Well_Tag_Number order; first hit wins
+  - GWELLS points outside the BC bounding box are ignored
+  - recovered rows get coord_status 'recovered_gwells' and pt_well_tag is set
+    to the WTN that supplied the location
+"""
+
+import numpy as np
+import pandas as pd
+
+
+RECOVERABLE_STATUS = ('no_coordinates', 'invalid_coordinates')
+RECOVERED_STATUS = 'recovered_gwells'
+# Rows with a usable location: shared by the QA coverage, the AOI check
+# and the well point export
+LOCATED_STATUS = ('valid', RECOVERED_STATUS)
+
+WTN_FIELDS = ('well_tag_number', 'wtn')
+LAT_FIELDS = ('latitude_decdeg', 'latitude', 'lat')
+LON_FIELDS = ('longitude_decdeg', 'longitude', 'lon', 'long')
+
+
+# ============================================================
+# WTN NORMALIZATION
+# ============================================================
+
+def normalize_wtns(values):
+    """
+    Vectorized normalize_wtn: '12345', '12345.0', 12345.0 -> '12345'.
+    Unparsable, missing or zero values become ''.
+    """
+    num = pd.to_numeric(pd.Series(values, dtype=object).astype(str).str.strip(),
+                        errors='coerce').to_numpy(dtype=float)
+    ok = np.isfinite(num) & (num != 0)
+    out = np.full(len(num), '', dtype=object)
+    out[ok] = num[ok].astype(np.int64).astype(str)
+    return out
+
+
+# ============================================================
+# GWELLS INDEX
+# ============================================================
+
+def _find_column(columns, candidates):
+    lookup = {str(c).lower(): c for c in columns}
+    for name in candidates:
+        if name in lookup:
+            return lookup[name]
+    raise KeyError(f"None of {candidates} found in GWELLS columns")
+
+
+def load_gwells_index(gwells_file):
+    """
+    Load a GWELLS extract into a DataFrame indexed (hash index) by normalized
+    WTN with float64 'lat'/'lon' columns. Only valid BC locations are kept;
+    the first record wins for duplicate WTNs.
+    """
+    if str(gwells_file).lower().endswith('.parquet'):
+        raw = pd.read_parquet(gwells_file)
+    else:
+        header = pd.read_csv(gwells_file, nrows=0).columns
+        cols = [_find_column(header, WTN_FIELDS),
+                _find_column(header, LAT_FIELDS),
+                _find_column(header, LON_FIELDS)]
+        raw = pd.read_csv(gwells_file, usecols=cols, dtype=str, low_memory=False)
+
+    wtn_col = _find_column(raw.columns, WTN_FIELDS)
+    lat_col = _find_column(raw.columns, LAT_FIELDS)
+    lon_col = _find_column(raw.columns, LON_FIELDS)
+
+    lat = pd.to_numeric(raw[lat_col], errors='coerce').to_numpy(dtype=float)
+    lon = pd.to_numeric(raw[lon_col], errors='coerce').to_numpy(dtype=float)
+    lon = np.where(lon > 0, -lon, lon)
+
+    index = pd.DataFrame({'wtn': normalize_wtns(raw[wtn_col]), 'lat': lat, 'lon': lon})
+    valid = (index['wtn'] != '') & (index['lat'] > 48) & (index['lat'] < 60) & \
+            (index['lon'] > -140) & (index['lon'] < -114)
+    index = index[valid].drop_duplicates('wtn').set_index('wtn')
+    print(f"GWELLS index: {len(index)} wells with valid locations from {gwells_file}")
+    return index
+
+
+# ============================================================
+# RECOVERY
+# ============================================================
+
+def recover_coordinates(out_df, gwells_index):
+    """
+    Fill pt_latitude/pt_longitude for recoverable rows from the GWELLS index.
+    Returns (out_df, n_recovered). out_df is modified in place.
+    """
+    status = out_df['coord_status'].to_numpy(dtype=object)
+    rows = np.flatnonzero(np.isin(status, RECOVERABLE_STATUS))
+    if len(rows) == 0:
+        return out_df, 0
+
+    # Candidate WTNs per row, in parcel order; fall back to pt_well_tag
+    if 'Well_Tag_Number' in out_df.columns:
+        tags = out_df['Well_Tag_Number'].iloc[rows]
+        tags = tags.where(tags.notna(), out_df['pt_well_tag'].iloc[rows])
+    else:
+        tags = out_df['pt_well_tag'].iloc[rows]
+    tags = pd.Series(tags.to_numpy(dtype=object), index=rows)
+    exploded = tags.dropna().astype(str).str.replace(',', ';', regex=False) \
+        .str.split(';').explode()
+
+    candidates = pd.DataFrame({'row': exploded.index.to_numpy(dtype=np.int64),
+                               'wtn': normalize_wtns(exploded.to_numpy(dtype=object))})
+    candidates = candidates[candidates['wtn'] != '']
+
+    # One hash lookup for every candidate, keep the first hit per row
+    pos = gwells_index.index.get_indexer(candidates['wtn'])
+    hits = candidates[pos >= 0].assign(pos=pos[pos >= 0]).drop_duplicates('row')
+    if hits.empty:
+        return out_df, 0
+
+    target = hits['row'].to_numpy()
+    loc = hits['pos'].to_numpy()
+    col = out_df.columns.get_loc
+    out_df.iloc[target, col('pt_latitude')] = gwells_index['lat'].to_numpy()[loc]
+    out_df.iloc[target, col('pt_longitude')] = gwells_index['lon'].to_numpy()[loc]
+    out_df.iloc[target, col('pt_well_tag')] = hits['wtn'].to_numpy()
+    out_df.iloc[target, col('coord_status')] = RECOVERED_STATUS
+    return out_df, len(target)
@@ -0,0 +1,214 @@
+"""
+EUGW Ingest Cache
+=================
+Reads the EUGW parcel workbook once and keeps a local binary sidecar, so
+later runs skip pd.read_excel over the UNC share.
+
+The sidecar lives in a local cache folder (EUGW_INGEST_CACHE, default
+~/.cache/eugw_ingest), one per workbook and Excel engine (calamine and
+openpyxl can type the same cell differently). It is checked against the
+workbook's size, mtime and SHA-256 recorded when it was written:
+  - size and mtime match the sidecar metadata   -> load the sidecar
+  - size matches but mtime changed              -> hash the workbook; reuse
+                                                   the sidecar if the hash matches
+  - anything else                               -> re-read the workbook
+The metadata is written only with a new sidecar, never on a hit.
+
+Sidecar format is Arrow IPC (Feather, memory-mapped on load). If a
+workbook has mixed-type columns that Arrow cannot round-trip exactly
+(e.g. Well_Tag_Number holding numbers and text), a pickle sidecar is
+written instead, so cached runs always see the same DataFrame as
+pd.read_excel.
+
+Excel is read with python-calamine when it is installed (much faster than
+openpyxl), otherwise with openpyxl.
+"""
+
+import os
+import json
+import hashlib
+import importlib.util
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # falls back to pickle sidecars
+    pa = feather = None
+
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    'EUGW_INGEST_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'eugw_ingest'))
+
+HASH_BLOCK = 1024 * 1024
+
+
+# ============================================================
+# HELPERS
+# ============================================================
+
+def excel_engine():
+    """Fastest available Excel reader: 'calamine' if installed, else 'openpyxl'."""
+    if importlib.util.find_spec('python_calamine') is not None:
+        return 'calamine'
+    return 'openpyxl'
+
+
+def file_sha256(path):
+    """SHA-256 of a file, read in 1 MB blocks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def sidecar_paths(input_file, cache_dir=None, engine=None):
+    """(data_path_without_extension, metadata_path) for a workbook's sidecar read by engine."""
+    cache_dir = cache_dir or DEFAULT_CACHE_DIR
+    engine = engine or excel_engine()
+    source = os.path.abspath(str(input_file))
+    stem = os.path.splitext(os.path.basename(source))[0]
+    tag = hashlib.sha1(source.lower().encode('utf-8')).hexdigest()[:12]
+    base = os.path.join(cache_dir, f"{stem}-{engine}-{tag}")
+    return base, base + '.json'
+
+
+def _read_meta(meta_path):
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path) as f:
+        return json.load(f)
+
+
+def _write_meta(meta_path, meta):
+    tmp = meta_path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp, meta_path)
+
+
+def _valid_sidecar(input_file, meta, engine):
+    """Return the metadata if the sidecar still matches the workbook and engine, else None."""
+    if meta is None or meta.get('engine') != engine or not os.path.exists(meta['data_path']):
+        return None
+    stat = os.stat(input_file)
+    if stat.st_size != meta['size']:
+        return None
+    if stat.st_mtime_ns == meta['mtime_ns']:
+        return meta
+    if file_sha256(input_file) != meta['sha256']:
+        return None
+    return meta
+
+
+def _arrow_round_trips(df, path):
+    """Write df as Feather and check it reads back identical."""
+    try:
+        feather.write_feather(df, path)
+        back = feather.read_feather(path, memory_map=True)
+        pd.testing.assert_frame_equal(back, df, check_dtype=True)
+        return True
+    except (pa.ArrowException, AssertionError, TypeError, ValueError):
+        if os.path.exists(path):
+            os.remove(path)
+        return False
+
+
+def write_sidecar(df, input_file, cache_dir=None, sha256=None, engine=None):
+    """Store df (read with engine) as the sidecar for input_file. Returns the metadata dict."""
+    engine = engine or excel_engine()
+    base, meta_path = sidecar_paths(input_file, cache_dir, engine)
+    os.makedirs(os.path.dirname(base), exist_ok=True)
+
+    if feather is not None and _arrow_round_trips(df, base + '.feather'):
+        fmt, data_path = 'feather', base + '.feather'
+    else:
+        fmt, data_path = 'pickle', base + '.pkl'
+        df.to_pickle(data_path)
+
+    # Drop a sidecar of the other format left by an earlier build
+    for ext in ('.feather', '.pkl'):
+        if base + ext != data_path and os.path.exists(base + ext):
+            os.remove(base + ext)
+
+    stat = os.stat(input_file)
+    meta = {
+        'source': os.path.abspath(str(input_file)),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'sha256': sha256 or file_sha256(input_file),
+        'engine': engine,
+        'format': fmt,
+        'data_path': data_path,
+        'rows': len(df),
+        'columns': [str(c) for c in df.columns],
+    }
+    _write_meta(meta_path, meta)
+    return meta
+
+
+def _load_sidecar(meta):
+    if meta['format'] == 'feather':
+        return feather.read_feather(meta['data_path'], memory_map=True)
+    return pd.read_pickle(meta['data_path'])
+
+
+# ============================================================
+# PUBLIC API
+# ============================================================
+
+def read_parcels(input_file, use_cache=True, cache_dir=None, engine=None):
+    """
+    Read the EUGW parcel table, from the local sidecar when it is current.
+    On a miss the workbook is read with the fastest available Excel engine
+    (or `engine`) and a new sidecar is written. CSV/Parquet inputs are read
+    directly and never cached.
+    """
+    lower = str(input_file).lower()
+    if lower.endswith('.csv'):
+        return pd.read_csv(input_file)
+    if lower.endswith('.parquet'):
+        return pd.read_parquet(input_file)
+
+    engine = engine or excel_engine()
+    meta_path = sidecar_paths(input_file, cache_dir, engine)[1]
+    if use_cache:
+        meta = _valid_sidecar(input_file, _read_meta(meta_path), engine)
+        if meta is not None:
+            print(f"Ingest cache hit: {meta['data_path']} ({meta['format']})")
+            return _load_sidecar(meta)
+
+    print(f"Reading workbook with {engine}")
+    df = pd.read_excel(input_file, engine=engine)
+
+    if use_cache:
+        try:
+            meta = write_sidecar(df, input_file, cache_dir, engine=engine)
+            print(f"Ingest cache written: {meta['data_path']} ({meta['format']})")
+        except OSError as e:
+            print(f"  Warning: could not write ingest cache: {e}")
+    return df
+
+
+def iter_cached_chunks(input_file, chunk_size, cache_dir=None, engine=None):
+    """
+    Yield chunks of a current Feather sidecar without loading it all
+    (memory-mapped, one slice at a time). Returns None if there is no
+    usable Feather sidecar, so the caller can stream the workbook instead.
+    """
+    engine = engine or excel_engine()
+    meta_path = sidecar_paths(input_file, cache_dir, engine)[1]
+    meta = _valid_sidecar(input_file, _read_meta(meta_path), engine)
+    if meta is None or meta['format'] != 'feather':
+        return None
+
+    table = feather.read_table(meta['data_path'], memory_map=True)
+    print(f"Ingest cache hit: {meta['data_path']} (streaming {table.num_rows} rows)")
+
+    def chunks():
+        for start in range(0, table.num_rows, chunk_size):
+            yield table.slice(start, chunk_size).to_pandas()
+
+    return chunks()
@@ -0,0 +1,142 @@
+"""
+EUGW Run Instrumentation
+========================
+Per-stage wall time, throughput and peak memory for the EUGW processing
+scripts, written as a JSON run report so performance can be compared
+across data refreshes.
+
+Usage:
+    profiler = RunProfiler()
+    with profiler.stage('expand', rows=len(df)):
+        ...
+    for chunk in profiler.timed_iter(chunks, 'read'):
+        ...
+    profiler.write_report(path, run={...})
+
+A stage that runs more than once (e.g. once per chunk in streaming mode)
+accumulates its time and rows. peak_rss_mb is the process high-water mark
+at the end of the stage (psutil peak working set on Windows, getrusage
+ru_maxrss elsewhere); it only grows, so the stage where it jumps is the
+one that raised peak memory.
+"""
+
+import os
+import sys
+import json
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None if unavailable."""
+    if psutil is not None:
+        info = psutil.Process().memory_info()
+        peak = getattr(info, 'peak_wset', None)
+        if peak is not None:
+            return peak / 1024 ** 2
+    if resource is not None:
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is bytes on macOS, KB on Linux
+        return maxrss / 1024 ** 2 if sys.platform == 'darwin' else maxrss / 1024
+    return None
+
+
+def current_rss_mb():
+    """Current resident set size in MB (needs psutil), or None."""
+    if psutil is None:
+        return None
+    return psutil.Process().memory_info().rss / 1024 ** 2
+
+
+def report_path_for(output_file):
+    """JSON run report path next to the output: <output stem>_run_report.json."""
+    return os.path.splitext(str(output_file))[0] + '_run_report.json'
+
+
+class RunProfiler:
+    """Collects per-stage timing and memory for one run."""
+
+    def __init__(self):
+        self.started = datetime.now()
+        self.t0 = time.perf_counter()
+        self.stages = {}
+
+    def _record(self, name):
+        if name not in self.stages:
+            self.stages[name] = {'seconds': 0.0, 'rows': 0, 'calls': 0,
+                                 'peak_rss_mb': None, 'rss_mb': None}
+        return self.stages[name]
+
+    @contextmanager
+    def stage(self, name, rows=0):
+        """Time a block; add rows processed (can also be set via the yielded dict)."""
+        record = self._record(name)
+        live = {'rows': rows}
+        start = time.perf_counter()
+        try:
+            yield live
+        finally:
+            record['seconds'] += time.perf_counter() - start
+            record['rows'] += live['rows']
+            record['calls'] += 1
+            record['peak_rss_mb'] = peak_rss_mb()
+            record['rss_mb'] = current_rss_mb()
+
+    def timed_iter(self, iterable, name):
+        """Yield from iterable, timing each next() as stage `name` (rows = len(item))."""
+        it = iter(iterable)
+        while True:
+            with self.stage(name) as live:
+                item = next(it, None)
+                if item is not None:
+                    live['rows'] = len(item)
+            if item is None:
+                return
+            yield item
+
+    def summary(self):
+        """Stage metrics with rows_per_s, in the order stages first ran."""
+        out = {}
+        for name, r in self.stages.items():
+            out[name] = {
+                'seconds': round(r['seconds'], 4),
+                'rows': r['rows'],
+                'rows_per_s': round(r['rows'] / r['seconds'], 1) if r['seconds'] > 0 and r['rows'] else None,
+                'calls': r['calls'],
+                'peak_rss_mb': round(r['peak_rss_mb'], 1) if r['peak_rss_mb'] is not None else None,
+                'rss_mb': round(r['rss_mb'], 1) if r['rss_mb'] is not None else None,
+            }
+        return out
+
+    def print_table(self):
+        print(f"\n--- Run Timing ---")
+        for name, m in self.summary().items():
+            rate = f"{m['rows_per_s']:>12,.0f} rows/s" if m['rows_per_s'] else f"{'':>19}"
+            peak = f"{m['peak_rss_mb']:>9.1f} MB peak" if m['peak_rss_mb'] is not None else ''
+            print(f"  {name:<18} {m['seconds']:>9.3f} s  {rate}  {peak}")
+        print(f"  {'total':<18} {time.perf_counter() - self.t0:>9.3f} s")
+
+    def write_report(self, path, run=None):
+        """Write the JSON run report. `run` holds run parameters and results."""
+        report = {
+            'started': self.started.isoformat(timespec='seconds'),
+            'finished': datetime.now().isoformat(timespec='seconds'),
+            'total_seconds': round(time.perf_counter() - self.t0, 4),
+            'peak_rss_mb': round(peak_rss_mb(), 1) if peak_rss_mb() is not None else None,
+            'run': run or {},
+            'stages': self.summary(),
+        }
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2, default=str)
+        return path
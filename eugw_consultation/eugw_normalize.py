@@ -0,0 +1,179 @@
+"""
+EUGW Normalization
+==================
+Single definition of the quantity-unit conversion and purpose
+classification rules used by every EUGW script:
+  - process_eugw_parcels_to_wells.py (row and vectorized engines)
+  - process_eugw_centroids.py / eugw_centroids.py
+  - total_withdrawal_raster.py (licence volumes)
+
+Unit conversion is table-driven (UNIT_CONVERSIONS, keyed by the lower-case,
+stripped unit). Each rule is an operation and a constant, applied exactly
+as the scripts always did (qty / 365.0, not qty * (1/365)), so results are
+bit-identical to the scalar code:
+  cmd, m3/day    -> as-is
+  cmy, m3/year   -> / 365
+  cms            -> * 86400
+  Sel, kW        -> not a volume (NON_VOLUMETRIC_UNITS), no conversion
+  anything else  -> no conversion
+
+Each script keeps the units it has always accepted; any other unit is left
+unconverted:
+  PARCEL_UNITS   cmd, cmy, cms              EUGW parcels (wells, centroids)
+  LICENCE_UNITS  cmd, m3/day, cmy, m3/year  licence volumes (withdrawal raster)
+
+Every rule has a scalar form (quantity_to_cmd, classify_purpose_list) for
+row-by-row code and an array form (quantities_to_cmd, units_to_cmd,
+classify_purposes) that parses each distinct token once and converts
+whole columns at a time.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+# ============================================================
+# RULE TABLES
+# ============================================================
+
+UNIT_CONVERSIONS = {
+    # unit (lower case): (operation, constant)
+    'cmd': ('mul', 1.0),
+    'm3/day': ('mul', 1.0),
+    'cmy': ('div', 365.0),
+    'm3/year': ('div', 365.0),
+    'cms': ('mul', 86400.0),
+}
+
+NON_VOLUMETRIC_UNITS = ('sel', 'kw')
+
+# Units each caller converts (keys of UNIT_CONVERSIONS)
+PARCEL_UNITS = ('cmd', 'cmy', 'cms')
+LICENCE_UNITS = ('cmd', 'm3/day', 'cmy', 'm3/year')
+
+UNKNOWN_PURPOSE = 'Unknown'
+MULTI_COMMERCIAL = 'Multi-purpose (includes Commercial)'
+MULTI_NO_COMMERCIAL = 'Multi-purpose (no Commercial)'
+
+
+def _apply(rule, qty):
+    op, constant = rule
+    return qty * constant if op == 'mul' else qty / constant
+
+
+def _rule(unit, accepted):
+    """Conversion rule of a raw unit string, None if it is not in accepted."""
+    unit = str(unit).strip().lower()
+    return UNIT_CONVERSIONS[unit] if unit in accepted else None
+
+
+# ============================================================
+# SCALAR API
+# ============================================================
+
+def quantity_to_cmd(qty, unit, accepted=PARCEL_UNITS):
+    """
+    Convert one quantity to CMD. qty is parsed with float(); returns None
+    when it does not parse or the unit is not one of accepted.
+    """
+    try:
+        value = float(qty)
+    except (ValueError, TypeError):
+        return None
+    rule = _rule(unit, accepted)
+    if rule is None:
+        return None
+    return _apply(rule, value)
+
+
+def classify_purpose_list(purposes):
+    """Classify a parcel from its list of purpose names (at least one)."""
+    if len(purposes) == 1:
+        return purposes[0]
+    if any('commercial' in p.lower() for p in purposes):
+        return MULTI_COMMERCIAL
+    return MULTI_NO_COMMERCIAL
+
+
+# ============================================================
+# ARRAY API
+# ============================================================
+
+def parse_floats(tokens):
+    """
+    float() of every token, parsing each distinct token once.
+    Returns (values with NaN where parsing failed, parsed mask).
+    """
+    codes, uniques = pd.factorize(np.asarray(tokens, dtype=object), use_na_sentinel=False)
+    values = np.full(len(uniques), np.nan)
+    parsed = np.zeros(len(uniques), dtype=bool)
+    for i, token in enumerate(uniques):
+        try:
+            values[i] = float(token)
+            parsed[i] = True
+        except (ValueError, TypeError):
+            pass
+    return values[codes], parsed[codes]
+
+
+def _unit_rules(units, accepted):
+    """(codes, rule per distinct unit or None) for an array of raw unit strings."""
+    codes, uniques = pd.factorize(np.asarray(units, dtype=object), use_na_sentinel=False)
+    rules = [_rule(u, accepted) for u in uniques]
+    return codes, rules
+
+
+def convertible_units(units, accepted=PARCEL_UNITS):
+    """Boolean mask: unit is one of accepted."""
+    codes, rules = _unit_rules(units, accepted)
+    known = np.array([r is not None for r in rules], dtype=bool)
+    return known[codes] if len(known) else np.zeros(len(codes), dtype=bool)
+
+
+def units_to_cmd(values, units, accepted=PARCEL_UNITS):
+    """Convert float quantities to CMD by their units; NaN where the unit is not one of accepted."""
+    values = np.asarray(values, dtype=float)
+    codes, rules = _unit_rules(units, accepted)
+    out = np.full(len(values), np.nan)
+    for code, rule in enumerate(rules):
+        if rule is not None:
+            sel = codes == code
+            out[sel] = _apply(rule, values[sel])
+    return out
+
+
+def quantities_to_cmd(qty, units, accepted=PARCEL_UNITS):
+    """Array form of quantity_to_cmd; NaN where the quantity or unit does not convert."""
+    values, parsed = parse_floats(qty)
+    cmd = units_to_cmd(values, units, accepted)
+    cmd[~parsed] = np.nan
+    return cmd
+
+
+def classify_purposes(values, unknown_tokens=()):
+    """
+    Classify a column of comma-separated purpose strings, each distinct
+    string once. Null values, and values whose stripped text is in
+    unknown_tokens, are 'Unknown'. Returns an object array.
+    """
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object), use_na_sentinel=False)
+    return _classify_distinct(pd.Series(uniques, dtype=object), unknown_tokens)[codes]
+
+
+def _classify_distinct(values, unknown_tokens):
+    text = values.astype(str)
+    unknown = values.isna().to_numpy()
+    if unknown_tokens:
+        unknown = unknown | text.str.strip().isin(unknown_tokens).to_numpy()
+
+    parts = text.str.split(',')
+    single = (parts.str.len() == 1).to_numpy()
+    # 'commercial' has no comma, so searching the whole string equals searching each part
+    commercial = text.str.lower().str.contains('commercial', regex=False).to_numpy()
+
+    return np.select(
+        [unknown, single, commercial],
+        [np.array(UNKNOWN_PURPOSE, dtype=object),
+         parts.str[0].str.strip().to_numpy(dtype=object),
+         np.array(MULTI_COMMERCIAL, dtype=object)],
+        default=np.array(MULTI_NO_COMMERCIAL, dtype=object))
@@ -0,0 +1,95 @@
+"""
+EUGW Parse Cache
+================
+Bounded LRU memoization for the EUGW field parsers.
+
+The same Quantity / Quantity_Units strings and App_Purpose_Name combinations
+repeat thousands of times in an EUGW export, so the scalar parsers in
+process_eugw_parcels_to_wells.py are wrapped with @memoize_parser and only
+parse each distinct input once. Only the row-wise engine calls them; the
+column-wise paths (the vectorized engine and eugw_centroids.py) get the
+same effect without a cache, because eugw_normalize's array functions
+factorize each column and parse every distinct token or purpose string
+once (parse_floats, units_to_cmd, classify_purposes).
+
+Missing values (None / NaN) and unhashable arguments bypass the cache.
+Call print_cache_report() at the end of a run to see hits and misses.
+Counters are per process: parsers called inside worker processes keep
+their own caches and are not included in the parent's report.
+"""
+
+import math
+from functools import lru_cache, wraps
+
+DEFAULT_MAXSIZE = 65536
+
+# Registered wrappers, keyed by "module.parser", for reporting
+_PARSERS = {}
+
+
+def _is_missing(value):
+    """True for None and float NaN (NaN never compares equal, so it cannot be cached)."""
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def memoize_parser(func=None, maxsize=DEFAULT_MAXSIZE):
+    """
+    Decorator: wrap a parser in a bounded LRU cache.
+    Results are shared between callers, so parsers must not return values
+    the caller mutates. Usable as @memoize_parser or @memoize_parser(maxsize=N).
+    """
+    def decorate(func):
+        cached = lru_cache(maxsize=maxsize, typed=True)(func)
+
+        @wraps(func)
+        def wrapper(*args):
+            if any(_is_missing(a) for a in args):
+                return func(*args)
+            try:
+                hash(args)
+            except TypeError:
+                return func(*args)
+            return cached(*args)
+
+        wrapper.cache_info = cached.cache_info
+        wrapper.cache_clear = cached.cache_clear
+        _PARSERS[f"{func.__module__}.{func.__name__}"] = wrapper
+        return wrapper
+
+    if func is not None:
+        return decorate(func)
+    return decorate
+
+
+def cache_report():
+    """Return {"module.parser": {'hits', 'misses', 'size', 'maxsize'}} for every memoized parser."""
+    report = {}
+    for name, wrapper in _PARSERS.items():
+        info = wrapper.cache_info()
+        report[name] = {
+            'hits': info.hits,
+            'misses': info.misses,
+            'size': info.currsize,
+            'maxsize': info.maxsize,
+        }
+    return report
+
+
+def print_cache_report():
+    """Print hit/miss counts and hit rate for every memoized parser that was called."""
+    print(f"\n--- Parse Cache ---")
+    used = {name: r for name, r in cache_report().items() if r['hits'] + r['misses'] > 0}
+    if not used:
+        print("  (no cached parser calls)")
+        return
+    for name, r in used.items():
+        calls = r['hits'] + r['misses']
+        rate = 100.0 * r['hits'] / calls
+        print(f"  {name.split('.')[-1]}: {r['hits']} hits, {r['misses']} misses "
+              f"({rate:.1f}% hit rate, {r['size']}/{r['maxsize']} entries)")
+
+
+def clear_caches():
+    """Empty every parser cache and reset its counters."""
+    for wrapper in _PARSERS.values():
+        wrapper.cache_clear()
@@ -0,0 +1,163 @@
+"""
+EUGW QA Report
+==============
+Data-quality metrics for a process_eugw run, computed in one vectorized
+pass per chunk and written as JSON (<output stem>_qa.json) so data drops
+can be compared automatically.
+
+Per chunk, the three category fields (coord_status, classified_purpose,
+quantity_flag) are counted together with a single grouped count, folded
+into one running Counter, and the finite quantity_cmd values are folded
+into one StreamingStats per quantity_flag (see eugw_stats.py), so memory
+does not grow with the number of rows or chunks. Quantiles come from the log-bucketed sketch and are within 1% of
+the exact value; the sketch only holds bucket counts, so streaming runs
+give the same quantiles as a single pass over the whole table.
+
+Metrics:
+  - rows / parcels / wells per parcel
+  - coverage: share of rows with a usable location, a CMD quantity, a
+    Well Tag Number and a classified purpose
+  - counts by coord_status, classified_purpose and quantity_flag
+  - quantity_cmd distribution: count, sum, mean, min, quantiles, max,
+    plus the same per quantity_flag (quantiles approximate, see above)
+"""
+
+import os
+import json
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from eugw_gwells import LOCATED_STATUS
+from eugw_stats import StreamingStats
+
+
+QA_FIELDS = ['coord_status', 'classified_purpose', 'quantity_flag']
+QUANTILES = [0.05, 0.25, 0.5, 0.75, 0.95, 0.99]
+
+
+def qa_path_for(output_file):
+    """QA report path next to the output: <output stem>_qa.json."""
+    return os.path.splitext(str(output_file))[0] + '_qa.json'
+
+
+def _quantity_stats(stats):
+    """count/sum/mean/min/quantiles/max of a StreamingStats (None when empty)."""
+    out = {'count': stats.count}
+    if stats.count == 0:
+        for key in ['sum', 'mean', 'min'] + [f"p{int(q * 100):02d}" for q in QUANTILES] + ['max']:
+            out[key] = None
+        return out
+    out['sum'] = stats.total
+    out['mean'] = stats.mean
+    out['min'] = stats.min
+    for q in QUANTILES:
+        out[f"p{int(q * 100):02d}"] = stats.quantile(q)
+    out['max'] = stats.max
+    return out
+
+
+class QAReport:
+    """Running QA accumulator: update() once per chunk, metrics() at the end."""
+
+    def __init__(self):
+        self.parcels = 0
+        self.rows = 0
+        self.with_tag = 0
+        self.joint = Counter()  # running counts over QA_FIELDS (null -> None)
+        self.quantity = StreamingStats()
+        self.quantity_by_flag = {}
+
+    def update(self, parcels_df, out_df):
+        """Add one chunk's parcels and well rows."""
+        self.parcels += len(parcels_df)
+        self.rows += len(out_df)
+        if len(out_df) == 0:
+            return
+
+        sizes = out_df.groupby(QA_FIELDS, dropna=False, sort=False).size()
+        for key, n in zip(sizes.index, sizes.to_numpy()):
+            self.joint[tuple(None if pd.isna(k) else k for k in key)] += int(n)
+
+        qty = out_df['quantity_cmd'].to_numpy(dtype=float, na_value=np.nan)
+        finite = np.isfinite(qty)
+        qty = qty[finite]
+        self.quantity.add_many(qty)
+
+        flags = out_df['quantity_flag'].to_numpy(dtype=object)[finite]
+        codes, labels = pd.factorize(flags, use_na_sentinel=False)
+        order = np.argsort(codes, kind='stable')
+        bounds = np.searchsorted(codes[order], np.arange(len(labels) + 1))
+        for j, label in enumerate(labels):
+            stats = self.quantity_by_flag.setdefault(str(label), StreamingStats())
+            stats.add_many(qty[order[bounds[j]:bounds[j + 1]]])
+
+        tags = out_df['pt_well_tag']
+        self.with_tag += int((tags.notna() & (tags.astype(str).str.strip() != '')).sum())
+
+    def _joint(self):
+        if not self.joint:
+            return pd.Series(dtype='int64')
+        index = pd.MultiIndex.from_tuples(list(self.joint), names=QA_FIELDS)
+        return pd.Series(list(self.joint.values()), index=index, dtype='int64')
+
+    def metrics(self):
+        """All QA metrics as a JSON-serializable dict."""
+        joint = self._joint()
+        counts = {}
+        for i, field in enumerate(QA_FIELDS):
+            if joint.empty:
+                counts[field] = {}
+                continue
+            by = joint.groupby(level=i, dropna=False).sum().sort_values(ascending=False, kind='stable')
+            counts[field] = {('null' if pd.isna(k) else str(k)): int(v) for k, v in by.items()}
+
+        by_flag = {label: _quantity_stats(stats) for label, stats in self.quantity_by_flag.items()}
+
+        rows = self.rows
+        located = sum(counts['coord_status'].get(s, 0) for s in LOCATED_STATUS)
+        classified = rows - counts['classified_purpose'].get('Unknown', 0) \
+            - counts['classified_purpose'].get('null', 0)
+
+        def pct(n):
+            return round(100.0 * n / rows, 2) if rows else None
+
+        return {
+            'parcels': self.parcels,
+            'rows': rows,
+            'wells_per_parcel': round(rows / self.parcels, 4) if self.parcels else None,
+            'coverage_pct': {
+                'located': pct(located),
+                'quantity_cmd': pct(self.quantity.count),
+                'well_tag': pct(self.with_tag),
+                'classified_purpose': pct(classified),
+            },
+            'counts': counts,
+            'quantity_cmd': _quantity_stats(self.quantity),
+            'quantity_cmd_by_flag': by_flag,
+        }
+
+    def print_table(self, metrics=None):
+        """Compact console table of the coverage and quantity metrics."""
+        m = metrics or self.metrics()
+        print(f"\n--- QA Coverage ---")
+        for name, value in m['coverage_pct'].items():
+            print(f"  {name:<20} {value if value is not None else 'n/a':>8}%")
+
+        print(f"\n--- Quantity Stats (CMD) ---")
+        keys = ['count', 'mean', 'min', 'p05', 'p25', 'p50', 'p75', 'p95', 'p99', 'max']
+        table = {'all': m['quantity_cmd']}
+        table.update(m['quantity_cmd_by_flag'])
+        frame = pd.DataFrame({name: [stats[k] for k in keys] for name, stats in table.items()},
+                             index=keys).T.astype(float)
+        frame['count'] = frame['count'].astype('int64')
+        with pd.option_context('display.float_format', '{:,.2f}'.format, 'display.width', 120):
+            print(frame.to_string())
+
+    def write_json(self, path, run=None, metrics=None):
+        """Write the metrics (plus optional run info) as JSON."""
+        report = {'run': run or {}, 'qa': metrics or self.metrics()}
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2, default=str)
+        return path
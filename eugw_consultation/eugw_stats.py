@@ -0,0 +1,152 @@
+"""
+EUGW Streaming Statistics
+=========================
+Single-pass summary statistics for the EUGW processing scripts, updated
+while rows are written instead of re-reading the output afterwards.
+
+  - StreamingStats: count, nulls, min, max, mean and approximate quantiles
+    of a numeric field, in constant memory
+  - QuantileSketch: log-bucketed quantile sketch (DDSketch-style); every
+    quantile it returns is within RELATIVE_ACCURACY (1%) of the true value
+    of the nearest-rank element, and its size grows with the log of the
+    value range, not with the number of rows
+
+Values can be added one at a time (cursor loops) or as numpy arrays
+(column-wise backends); both give the same result.
+"""
+
+import math
+from collections import Counter
+
+import numpy as np
+
+
+RELATIVE_ACCURACY = 0.01
+MIN_INDEXABLE = 1e-12   # |x| below this counts as zero
+
+
+class QuantileSketch:
+    """Approximate quantiles with a relative-error guarantee."""
+
+    def __init__(self, relative_accuracy=RELATIVE_ACCURACY):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.positive = Counter()
+        self.negative = Counter()
+        self.zeros = 0
+        self.count = 0
+
+    def _keys(self, values):
+        """
+        Bucket keys of an array of positive values: key k holds
+        (gamma**(k-1), gamma**k]. The key is estimated with np.log and then
+        settled against the bucket edges, so it does not depend on the last
+        bit of the log. add() and add_many() both go through here.
+        """
+        keys = np.ceil(np.log(values) / self.log_gamma).astype(np.int64)
+        first = int(keys.min()) - 1
+        edges = np.array([self.gamma ** k for k in range(first, int(keys.max()) + 1)])
+        return keys + (values > edges[keys - first]) - (values <= edges[keys - first - 1])
+
+    def _value(self, key):
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def add(self, x):
+        """Add one finite value."""
+        if x > MIN_INDEXABLE:
+            self.positive[int(self._keys(np.array([x], dtype=float))[0])] += 1
+        elif x < -MIN_INDEXABLE:
+            self.negative[int(self._keys(np.array([-x], dtype=float))[0])] += 1
+        else:
+            self.zeros += 1
+        self.count += 1
+
+    def add_many(self, values):
+        """Add an array of finite values."""
+        values = np.asarray(values, dtype=float)
+        for store, part in ((self.positive, values[values > MIN_INDEXABLE]),
+                            (self.negative, -values[values < -MIN_INDEXABLE])):
+            if len(part):
+                keys, n = np.unique(self._keys(part), return_counts=True)
+                store.update(dict(zip(keys.tolist(), n.tolist())))
+        self.zeros += int((np.abs(values) <= MIN_INDEXABLE).sum())
+        self.count += len(values)
+
+    def merge(self, other):
+        """Fold another sketch (same accuracy) into this one."""
+        self.positive.update(other.positive)
+        self.negative.update(other.negative)
+        self.zeros += other.zeros
+        self.count += other.count
+
+    def quantile(self, q):
+        """Approximate q-quantile (nearest rank), or None if empty."""
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        for key in sorted(self.negative, reverse=True):
+            seen += self.negative[key]
+            if seen > rank:
+                return -self._value(key)
+        seen += self.zeros
+        if seen > rank:
+            return 0.0
+        for key in sorted(self.positive):
+            seen += self.positive[key]
+            if seen > rank:
+                return self._value(key)
+        return self._value(max(self.positive))
+
+
+class StreamingStats:
+    """count / nulls / min / max / mean / quantiles of a numeric field in one pass."""
+
+    def __init__(self, relative_accuracy=RELATIVE_ACCURACY):
+        self.count = 0
+        self.nulls = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.sketch = QuantileSketch(relative_accuracy)
+
+    def add(self, value):
+        """Add one value; None and NaN count as nulls."""
+        if value is None or value != value:
+            self.nulls += 1
+            return
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None or value < self.min else self.min
+        self.max = value if self.max is None or value > self.max else self.max
+        if math.isfinite(value):
+            self.sketch.add(value)
+
+    def add_many(self, values):
+        """Add an array of values; NaN counts as null."""
+        values = np.asarray(values, dtype=float)
+        valid = values[~np.isnan(values)]
+        self.nulls += len(values) - len(valid)
+        if len(valid) == 0:
+            return
+        self.count += len(valid)
+        self.total += float(valid.sum())
+        lo, hi = float(valid.min()), float(valid.max())
+        self.min = lo if self.min is None else min(self.min, lo)
+        self.max = hi if self.max is None else max(self.max, hi)
+        self.sketch.add_many(valid[np.isfinite(valid)])
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def quantile(self, q):
+        return self.sketch.quantile(q)
+
+    def summary(self, quantiles=(0.25, 0.5, 0.75, 0.95)):
+        """Plain dict of the statistics (quantiles keyed p25, p50, ...)."""
+        out = {'count': self.count, 'nulls': self.nulls, 'min': self.min,
+               'max': self.max, 'mean': self.mean}
+        for q in quantiles:
+            out[f"p{int(q * 100):02d}"] = self.quantile(q)
+        return out
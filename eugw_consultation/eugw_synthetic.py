@@ -0,0 +1,178 @@
+"""
+Synthetic EUGW Parcel Generator
+===============================
+Builds EUGW-like parcel tables at any scale for benchmarking
+process_eugw_parcels_to_wells.py without the network-share workbook.
+
+The generated rows cover the cases the well expansion has to handle:
+  - single and multi-well parcels (comma-separated lat/lon)
+  - single and multi-quantity parcels, including quantity/well count mismatches
+  - mixed units: cmd, cmy, cms, Sel, kW, blank, and the odd upper-case unit
+  - single and multi-purpose applications, with and without Commercial
+  - missing coordinates, 'None'/'nan' tokens, out-of-BC and unparsable coordinates
+  - Well_Tag_Number separated by ';' or ',', with 0 and blank tags
+
+Usage:
+  python eugw_synthetic.py 100000 synthetic_eugw_100k.csv
+  (output format from the extension: .csv, .parquet or .xlsx)
+"""
+
+import sys
+import numpy as np
+import pandas as pd
+
+
+PURPOSES = [
+    'Irrigation',
+    'Commercial Enterprise',
+    'Waterworks Local Provider',
+    'Domestic',
+    'Stockwatering',
+    'Industrial',
+    'Livestock & Animal: Stockwatering',
+    'Lawn, Fairway & Garden',
+]
+
+UNITS = ['cmd', 'cmy', 'cms', 'Sel', 'kW', '', 'CMY']
+UNIT_WEIGHTS = [0.30, 0.50, 0.02, 0.04, 0.04, 0.05, 0.05]
+
+BAD_COORD_TOKENS = ['None', 'nan', '', 'n/a']
+
+
+def _join(parts, sep=','):
+    return sep.join(parts)
+
+
+def generate_eugw_parcels(n_rows, seed=0):
+    """
+    Return a DataFrame of n_rows synthetic EUGW parcels with the columns
+    process_eugw reads plus a few wide text attributes.
+    """
+    rng = np.random.default_rng(seed)
+
+    # Wells per parcel: mostly 1, long tail of multi-well parcels, some none
+    n_wells = rng.choice([0, 1, 2, 3, 4, 6], size=n_rows,
+                         p=[0.08, 0.62, 0.15, 0.08, 0.05, 0.02])
+    lat = rng.uniform(48.3, 59.8, size=(n_rows, 6)).round(6)
+    lon = rng.uniform(-139.5, -114.2, size=(n_rows, 6)).round(6)
+    coord_kind = rng.choice(['ok', 'bad_token', 'outside', 'text'], size=(n_rows, 6),
+                            p=[0.93, 0.03, 0.03, 0.01])
+    missing_kind = rng.choice(['nan', 'none_str', 'blank'], size=n_rows, p=[0.7, 0.2, 0.1])
+
+    # Quantities: one per parcel, one per well, or an unrelated count
+    qty_mode = rng.choice(['single', 'per_well', 'mismatch', 'missing'], size=n_rows,
+                          p=[0.60, 0.20, 0.12, 0.08])
+    qty_vals = rng.lognormal(mean=5.0, sigma=2.0, size=(n_rows, 7)).round(2)
+    unit_idx = rng.choice(len(UNITS), size=(n_rows, 7), p=UNIT_WEIGHTS)
+    unit_mode = rng.choice(['one', 'each', 'short'], size=n_rows, p=[0.75, 0.15, 0.10])
+
+    # Purposes: single, or 2-3 combined
+    n_purposes = rng.choice([0, 1, 2, 3], size=n_rows, p=[0.03, 0.75, 0.17, 0.05])
+    purpose_idx = rng.integers(0, len(PURPOSES), size=(n_rows, 3))
+
+    tag_vals = rng.integers(1000, 130000, size=(n_rows, 6))
+    tag_sep = rng.choice(['; ', ',', ';'], size=n_rows)
+    tag_zero = rng.random(size=(n_rows, 6)) < 0.05
+
+    lat_col, lon_col, qty_col, unit_col, purpose_col, tag_col = [], [], [], [], [], []
+    for i in range(n_rows):
+        w = n_wells[i]
+
+        # --- coordinates ---
+        if w == 0:
+            kind = missing_kind[i]
+            lat_col.append(np.nan if kind == 'nan' else ('None' if kind == 'none_str' else ''))
+            lon_col.append(np.nan if kind == 'nan' else ('None' if kind == 'none_str' else ''))
+        else:
+            lats, lons = [], []
+            for j in range(w):
+                kind = coord_kind[i, j]
+                if kind == 'ok':
+                    lats.append(str(lat[i, j]))
+                    lons.append(str(lon[i, j]))
+                elif kind == 'bad_token':
+                    lats.append(BAD_COORD_TOKENS[j % len(BAD_COORD_TOKENS)])
+                    lons.append(str(lon[i, j]))
+                elif kind == 'outside':
+                    lats.append(str(round(lat[i, j] - 10.0, 6)))
+                    lons.append(str(lon[i, j]))
+                else:
+                    lats.append(f"{lat[i, j]}N")
+                    lons.append(str(lon[i, j]))
+            lat_col.append(_join(lats, ', '))
+            lon_col.append(_join(lons, ', '))
+
+        # --- quantities and units ---
+        mode = qty_mode[i]
+        if mode == 'missing':
+            qty_col.append(np.nan)
+            unit_col.append(np.nan)
+        else:
+            if mode == 'single':
+                nq = 1
+            elif mode == 'per_well':
+                nq = max(w, 1)
+            else:
+                nq = max(w, 1) + 1
+            qty_col.append(_join([str(q) for q in qty_vals[i, :nq]]))
+            if unit_mode[i] == 'one':
+                nu = 1
+            elif unit_mode[i] == 'each':
+                nu = nq
+            else:
+                nu = max(nq - 1, 1)
+            unit_col.append(_join([UNITS[u] for u in unit_idx[i, :nu]]))
+
+        # --- purposes ---
+        npur = n_purposes[i]
+        if npur == 0:
+            purpose_col.append(np.nan)
+        else:
+            purpose_col.append(_join([PURPOSES[p] for p in purpose_idx[i, :npur]], ', '))
+
+        # --- well tags ---
+        if w == 0 and tag_zero[i, 0]:
+            tag_col.append(np.nan)
+        else:
+            tags = ['0' if tag_zero[i, j] else str(tag_vals[i, j]) for j in range(max(w, 1))]
+            tag_col.append(tag_sep[i].join(tags))
+
+    return pd.DataFrame({
+        'EUGW_ID': np.arange(1, n_rows + 1),
+        'File_Number': [f"EUGW-{seed:02d}-{i:07d}" for i in range(n_rows)],
+        'Applicant_Name': rng.choice(['Synthetic Farms Ltd.', 'Example Water Co.',
+                                      'Test Holdings', 'Demo Ranch'], size=n_rows),
+        'App_Purpose_Name': purpose_col,
+        'Quantity': qty_col,
+        'Quantity_Units': unit_col,
+        'Well_Latitude': lat_col,
+        'Well_Longitude': lon_col,
+        'Well_Tag_Number': tag_col,
+        'AQUIFER_IDS': [f"{a}" for a in rng.integers(1, 1500, size=n_rows)],
+        'Parcel_Area_m2': rng.lognormal(mean=9.0, sigma=1.5, size=n_rows).round(1),
+        'Notes': rng.choice(['', 'Historical use declared', 'Use since 1990; well log attached',
+                             'Multiple wells on parcel'], size=n_rows),
+    })
+
+
+def write_parcels(df, path):
+    """Write a parcel table as CSV, Parquet or Excel based on the extension."""
+    lower = str(path).lower()
+    if lower.endswith('.parquet'):
+        df.to_parquet(path, index=False)
+    elif lower.endswith('.xlsx'):
+        df.to_excel(path, index=False)
+    else:
+        df.to_csv(path, index=False)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3:
+        print("Usage: python eugw_synthetic.py <n_rows> <output.csv|.parquet|.xlsx> [seed]")
+        sys.exit(1)
+    n = int(sys.argv[1])
+    out = sys.argv[2]
+    seed = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+    parcels = generate_eugw_parcels(n, seed)
+    write_parcels(parcels, out)
+    print(f"Wrote {len(parcels)} synthetic parcels to {out}")
@@ -0,0 +1,237 @@
+"""
+EUGW Well Points - Open-Source Converter
+========================================
+arcpy-free version of process_eugw_parcels_to_wells_convert_csv_to_fc.py.
+Writes the located well points of a process_eugw output (CSV or Parquet,
+wide or normalized layout) as a BC Albers point layer in one pass:
+
+  - the input is streamed in blocks of block_rows rows, and the
+    coord_status filter is pushed down into the scan (CSV blocks are
+    filtered as they are parsed, Parquet also skips row groups by their
+    statistics), so rejected rows are never materialized
+  - each block's pt_longitude/pt_latitude are reprojected from WGS84 to
+    EPSG:3005 in one vectorized pyproj call
+  - each block is appended straight to a GeoPackage layer or GeoParquet
+    (the same writer as the centroid output); memory stays bounded by one
+    block, plus the parcels table for a normalized input
+  - progress is reported in rows per second
+
+Replaces MakeXYEventLayer -> CopyFeatures (in_memory) -> MakeFeatureLayer
+(where clause) -> Project, i.e. four copies of the data.
+
+Like the arcpy backend, only rows with coord_status 'valid' are exported
+by default. Rows placed by GWELLS recovery ('recovered_gwells') are left
+out so both backends write the same features from the same CSV; pass
+statuses=eugw_gwells.LOCATED_STATUS to include them.
+
+CSV carries no types: the coordinates and quantity_cmd are read as float64
+and every other column as text, so all rows get the same schema (mixed
+fields such as Well_Tag_Number are never mis-typed). Parquet columns keep
+their types.
+
+Usage:
+    from eugw_well_points import convert_well_points
+    convert_well_points('existing_use_groundwater_extracted_well_points.csv',
+                        'EUGW_Well_Points.gpkg')
+"""
+
+import os
+import csv
+import time
+from functools import lru_cache
+
+import numpy as np
+import shapely
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pacsv = ds = pq = None
+
+try:
+    import pyproj
+except ImportError:
+    pyproj = None
+
+from eugw_centroids import CentroidWriter
+from process_eugw_parcels_to_wells import (PARCEL_ID, PARQUET_EXTENSIONS, parcels_path_for,
+                                           join_wells_to_parcels)
+
+
+SOURCE_CRS = 'EPSG:4326'
+TARGET_CRS = 'EPSG:3005'
+OUTPUT_LAYER = 'EUGW_Well_Points'
+VALID_STATUS = ('valid',)
+FLOAT_COLS = ['pt_latitude', 'pt_longitude', 'quantity_cmd']
+GEOMETRY_COLS = ('geometry',)
+DEFAULT_BLOCK_ROWS = 100000
+
+
+# ============================================================
+# READING
+# ============================================================
+
+def _is_parquet(path):
+    return str(path).lower().endswith(PARQUET_EXTENSIONS)
+
+
+def csv_header(path):
+    """Column names from the first line of a CSV."""
+    with open(path, newline='', encoding='utf-8') as f:
+        return next(csv.reader(f))
+
+
+def csv_format(path, int_cols=()):
+    """Arrow CSV format: FLOAT_COLS as float64, int_cols as int64, everything else as text."""
+    types = {}
+    for name in csv_header(path):
+        if name in FLOAT_COLS:
+            types[name] = pa.float64()
+        elif name in int_cols:
+            types[name] = pa.int64()
+        else:
+            types[name] = pa.string()
+    return ds.CsvFileFormat(convert_options=pacsv.ConvertOptions(
+        column_types=types, strings_can_be_null=True))
+
+
+def status_filter(statuses):
+    """Dataset filter expression: coord_status in statuses."""
+    return ds.field('coord_status').isin(list(statuses))
+
+
+def well_dataset(input_path):
+    """Arrow dataset over a wells CSV or Parquet file."""
+    if pa is None:
+        raise ImportError("Reading well points requires pyarrow")
+    if _is_parquet(input_path):
+        return ds.dataset(input_path, format='parquet')
+    return ds.dataset(input_path, format=csv_format(input_path, int_cols=(PARCEL_ID,)))
+
+
+def read_parcels_table(parcels_path):
+    """Parcels table of a normalized output (CSV text columns + integer parcel_id)."""
+    if _is_parquet(parcels_path):
+        return pq.read_table(parcels_path).to_pandas()
+    fmt = csv_format(parcels_path, int_cols=(PARCEL_ID,))
+    return ds.dataset(parcels_path, format=fmt).to_table().to_pandas()
+
+
+def wide_view(wells, parcels):
+    """
+    Well rows with their parcel fields: normalized wells (parcel_id, no parcel
+    fields) are joined to the parcels table; wide rows are returned as they are.
+    """
+    if parcels is None:
+        return wells
+    return join_wells_to_parcels(wells, parcels)
+
+
+def well_parcels(input_path, parcels_path=None):
+    """Parcels table when input_path is a normalized wells table, else None."""
+    if PARCEL_ID not in well_dataset(input_path).schema.names:
+        return None
+    parcels_path = parcels_path or parcels_path_for(input_path)
+    if not os.path.exists(parcels_path):
+        return None
+    print(f"Normalized layout: joining parcels from {parcels_path}")
+    return read_parcels_table(parcels_path)
+
+
+def _well_scanner(dataset, statuses, block_rows):
+    columns = [c for c in dataset.schema.names if c not in GEOMETRY_COLS]
+    return dataset.scanner(columns=columns, filter=status_filter(statuses), batch_size=block_rows)
+
+
+def read_located_wells(input_path, statuses=VALID_STATUS, parcels_path=None):
+    """
+    Read the well rows whose coord_status is in statuses, with the filter
+    applied during the scan. Returns a wide DataFrame (no geometry column).
+    """
+    wells = _well_scanner(well_dataset(input_path), statuses, DEFAULT_BLOCK_ROWS).to_table().to_pandas()
+    return wide_view(wells, well_parcels(input_path, parcels_path))
+
+
+def iter_located_wells(input_path, statuses=VALID_STATUS, parcels_path=None,
+                       block_rows=DEFAULT_BLOCK_ROWS):
+    """
+    Stream the well rows whose coord_status is in statuses as wide
+    DataFrames of about block_rows rows. The scanner yields one batch per
+    parsed CSV block (about 1 MB) or Parquet row group; filtered batches are
+    gathered until block_rows rows are buffered.
+    """
+    parcels = well_parcels(input_path, parcels_path)
+    buffered, n_buffered = [], 0
+    for batch in _well_scanner(well_dataset(input_path), statuses, block_rows).to_batches():
+        if batch.num_rows:
+            buffered.append(batch)
+            n_buffered += batch.num_rows
+        if n_buffered >= block_rows:
+            yield wide_view(pa.Table.from_batches(buffered).to_pandas(), parcels)
+            buffered, n_buffered = [], 0
+    if n_buffered:
+        yield wide_view(pa.Table.from_batches(buffered).to_pandas(), parcels)
+
+
+# ============================================================
+# REPROJECTION
+# ============================================================
+
+@lru_cache(maxsize=None)
+def _transformer(source_crs, target_crs):
+    return pyproj.Transformer.from_crs(source_crs, target_crs, always_xy=True)
+
+
+def reproject_points(lon, lat, source_crs=SOURCE_CRS, target_crs=TARGET_CRS):
+    """Reproject coordinate arrays in one vectorized pyproj call. Returns (x, y)."""
+    if pyproj is None:
+        raise ImportError("Reprojecting well points requires pyproj")
+    return _transformer(source_crs, target_crs).transform(np.asarray(lon, dtype=float),
+                                                          np.asarray(lat, dtype=float))
+
+
+def well_points(wells, target_crs=TARGET_CRS):
+    """
+    Point geometries in target_crs for rows with both coordinates.
+    Returns (wells with coordinates, shapely points).
+    """
+    lon = wells['pt_longitude'].to_numpy(dtype=float, na_value=np.nan)
+    lat = wells['pt_latitude'].to_numpy(dtype=float, na_value=np.nan)
+    located = np.isfinite(lon) & np.isfinite(lat)
+    x, y = reproject_points(lon[located], lat[located], target_crs=target_crs)
+    return wells[located].reset_index(drop=True), shapely.points(x, y)
+
+
+# ============================================================
+# MAIN PROCESSING
+# ============================================================
+
+def convert_well_points(input_path, output_path, layer=OUTPUT_LAYER, statuses=VALID_STATUS,
+                        parcels_path=None, target_crs=TARGET_CRS, block_rows=DEFAULT_BLOCK_ROWS):
+    """
+    Write the wells of input_path whose coord_status is in statuses as a
+    point layer in target_crs (GeoPackage layer, or GeoParquet by extension),
+    block_rows input rows at a time. Returns the number of points written.
+    """
+    print(f"Reading: {input_path} (coord_status in {list(statuses)})")
+    start = time.perf_counter()
+    written = 0
+
+    writer = CentroidWriter(output_path, target_crs, layer)
+    try:
+        for wells in iter_located_wells(input_path, statuses, parcels_path, block_rows):
+            wells, points = well_points(wells, target_crs)
+            writer.write(wells, points)
+            written += len(wells)
+            elapsed = time.perf_counter() - start
+            print(f"  Written {written:,} points ({written / elapsed if elapsed else 0:,.0f} rows/s)")
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"Done. {written} features exported to {layer} ({target_crs}): {output_path} "
+          f"in {elapsed:.1f} s ({written / elapsed if elapsed else 0:,.0f} rows/s)")
+    return written
@@ -0,0 +1,850 @@
+"""
+EUGW Total Withdrawal Raster - Open-Source Backend
+==================================================
+arcpy-free version of total_withdrawal_raster.py for the Linux compute
+nodes: geopandas reads and writes the layers, shapely does the geometry
+and rasterio writes the density rasters. Same steps, rules and field
+values as the arcpy script:
+
+  1. lookups: licensed CMD per WTN, GWELLS WTN -> AQUIFER_ID, aquifer MATERIAL
+  2. EUGW volume subtraction (dedup) and aquifer assignment
+  3. licence CMD and aquifer assignment (SOURCE_NAME, else the aquifer
+     polygons the point is within, from one bulk STRtree query)
+  4. combined wells
+  5. total CMD per aquifer
+  6. withdrawal density (CMD/km2) per aquifer polygon
+  7. split by material (Sand/Gravel, Bedrock)
+  8. density rasters, PolygonToRaster with MAXIMUM_COMBINED_AREA and
+     density_cmd_km2 as the priority field: a cell takes the highest
+     positive density among the aquifers overlapping it (the priority
+     field wins over the cell assignment); cells overlapped only by
+     zero-density aquifers take the density covering the largest combined
+     area. Overlap means a positive intersection area; Esri does not
+     document how much of a cell a feature must cover to count, so cells
+     on aquifer edges may differ from the arcpy raster. The grid is cut
+     into TILE_SIZE tiles burnt independently (in a process pool with
+     workers > 1) and written window by window, so memory is bounded by a
+     few tiles at any extent
+  9. Excel attribute table
+
+Feature classes become layers of one GeoPackage (same names), rasters are
+GeoTIFFs (<name>.tif) and the Excel workbook is unchanged.
+
+Usage:
+    from eugw_withdrawal import run_withdrawal
+    run_withdrawal(GDB, 'withdrawal.gpkg', 'rasters_folder', 'aquifer_withdrawal_density.xlsx')
+"""
+
+import os
+import math
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import shapely
+
+try:
+    import geopandas as gpd
+except ImportError:
+    gpd = None
+
+try:
+    import rasterio
+    from rasterio.transform import from_origin
+    from rasterio.windows import Window
+except ImportError:
+    rasterio = from_origin = Window = None
+
+from eugw_normalize import quantities_to_cmd, LICENCE_UNITS
+
+
+EUGW_LAYER = 'hmn_eugw_centroids'
+LICENCES_LAYER = 'hmn_groundwater_licences'
+AQUIFERS_LAYER = 'hmn_aquifers'
+GWELLS_LAYER = 'hmn_gwells'
+
+COMBINED_LAYER = 'hmn_out_combined_wells'
+AQUIFERS_OUT_LAYER = 'hmn_out_aquifers_withdrawal_density'
+AQ_SAND_LAYER = 'hmn_out_aquifers_density_sand_gravel'
+AQ_ROCK_LAYER = 'hmn_out_aquifers_density_bedrock'
+RAS_SAND = 'hmn_out_density_sand_gravel_30m'
+RAS_ROCK = 'hmn_out_density_bedrock_30m'
+
+COMBINED_FIELDS = ['well_tag', 'quantity_cmd', 'resolved_aq_id', 'aq_source', 'source', 'dedup_flag']
+EXPORT_FIELDS = ['AQUIFER_ID', 'MATERIAL', 'total_cmd', 'area_km2', 'density_cmd_km2']
+EXPORT_SKIP = ('OBJECTID', 'SHAPE', 'SHAPE_LENGTH', 'SHAPE_AREA', 'GLOBALID', 'GEOMETRY')
+
+CELL_SIZE = 30
+NODATA = -9999.0
+TILE_SIZE = 1024                 # raster tile side, in cells (about 4 MB of float32)
+TILES_IN_FLIGHT_PER_WORKER = 2   # queued tiles per worker process; bounds memory
+
+
+# ============================================================
+# PARSING RULES (shared with total_withdrawal_raster.py)
+# ============================================================
+
+def normalize_wtn(value):
+    """Normalize a Well Tag Number to integer string."""
+    if value is None:
+        return ""
+    try:
+        return str(int(float(value)))
+    except (ValueError, TypeError):
+        return ""
+
+
+def parse_wtns(wtn_str):
+    """Parse semicolon-separated well tag numbers into normalized strings."""
+    if wtn_str is None:
+        return []
+    raw = str(wtn_str).replace(',', ';')
+    wtns = []
+    for t in raw.split(';'):
+        n = normalize_wtn(t.strip())
+        if n:
+            wtns.append(n)
+    return wtns
+
+
+def parse_aquifer_ids(aq_str):
+    """Parse comma-separated aquifer IDs into list of integers."""
+    if aq_str is None:
+        return []
+    ids = []
+    for part in str(aq_str).replace(';', ',').split(','):
+        part = part.strip()
+        if part:
+            try:
+                ids.append(int(float(part)))
+            except (ValueError, TypeError):
+                continue
+    return ids
+
+
+def parse_source_name_aquifer(source_name):
+    """
+    Try to extract aquifer ID from SOURCE_NAME.
+    Returns int aquifer ID if short and numeric, else None.
+    """
+    if source_name is None:
+        return None
+    s = str(source_name).strip()
+    if len(s) > 5:
+        return None
+    try:
+        return int(float(s))
+    except (ValueError, TypeError):
+        return None
+
+
+def _value(v):
+    """Cursor-style value: NaN/NA (geopandas NULL) becomes None."""
+    return None if v is None or (not isinstance(v, str) and pd.isna(v)) else v
+
+
+# ============================================================
+# READING / WRITING
+# ============================================================
+
+def read_layer(gdb, layer):
+    """Read one layer of the GDB (or GeoPackage) as a GeoDataFrame."""
+    if gpd is None:
+        raise ImportError("The open withdrawal backend requires geopandas")
+    return gpd.read_file(gdb, layer=layer)
+
+
+def _geometries(df):
+    """Geometry column as an object array of shapely geometries (None for NULL)."""
+    return np.asarray(df.geometry.values, dtype=object)
+
+
+def _column(df, name):
+    """Column as an object array of cursor-style values (None for NULL or a missing field)."""
+    if name not in df.columns:
+        return np.full(len(df), None, dtype=object)
+    return np.array([_value(v) for v in df[name].to_numpy(dtype=object)], dtype=object)
+
+
+def write_layer(df, output_gpkg, layer, crs):
+    """Write a DataFrame with a geometry column as a GeoPackage layer."""
+    gdf = gpd.GeoDataFrame(df, geometry='geometry', crs=crs)
+    gdf.to_file(output_gpkg, layer=layer, driver='GPKG')
+
+
+# ============================================================
+# STEP 1: LOOKUPS
+# ============================================================
+
+def licence_volumes(wtn, qty, unit):
+    """
+    Licensed CMD per normalized WTN, summed in record order.
+    Returns (dict WTN -> CMD, records used, records skipped).
+    """
+    lic_wtns = pd.Series(wtn, dtype=object).map(lambda v: normalize_wtn(_value(v))).to_numpy(dtype=object)
+    lic_cmd = quantities_to_cmd(pd.Series(qty, dtype=object), pd.Series(unit, dtype=object),
+                                LICENCE_UNITS)
+    lic_ok = (lic_wtns != "") & ~np.isnan(lic_cmd)
+
+    wtn_codes, wtn_uniques = pd.factorize(lic_wtns[lic_ok])
+    wtn_totals = np.zeros(len(wtn_uniques))
+    np.add.at(wtn_totals, wtn_codes, lic_cmd[lic_ok])
+    licence_total = int(lic_ok.sum())
+    return dict(zip(wtn_uniques, wtn_totals.tolist())), licence_total, len(lic_wtns) - licence_total
+
+
+def gwells_aquifers(wtn, aquifer_id):
+    """WTN -> AQUIFER_ID from GWELLS (later records win, as the cursor loop)."""
+    gwells_aq = {}
+    for w, a in zip(wtn, aquifer_id):
+        w, a = normalize_wtn(_value(w)), _value(a)
+        if w and a is not None:
+            try:
+                gwells_aq[w] = int(float(a))
+            except (ValueError, TypeError):
+                continue
+    return gwells_aq
+
+
+def aquifer_materials(aquifer_id, material):
+    """AQUIFER_ID -> stripped MATERIAL ('' when empty)."""
+    aq_material = {}
+    for a, m in zip(aquifer_id, material):
+        a, m = _value(a), _value(m)
+        if a is not None:
+            aq_material[int(a)] = str(m).strip() if m else ""
+    return aq_material
+
+
+# ============================================================
+# TABLE HELPERS
+# ============================================================
+
+def explode_list(values, sep, alt_sep):
+    """
+    Split a column of delimited strings (alt_sep also separates) into
+    (row position, token) pairs, tokens in their order; NULL rows give none.
+    """
+    s = pd.Series(np.asarray(values, dtype=object))
+    s = s[s.notna()].astype(str).str.replace(alt_sep, sep, regex=False).str.split(sep).explode()
+    return s.index.to_numpy(dtype=np.int64), s.to_numpy(dtype=object)
+
+
+def map_distinct(tokens, func):
+    """func of every token, calling it once per distinct token."""
+    codes, uniques = pd.factorize(np.asarray(tokens, dtype=object), use_na_sentinel=False)
+    mapped = np.empty(len(uniques), dtype=object)
+    mapped[:] = [func(t) for t in uniques]
+    return mapped[codes]
+
+
+def join_runs(rec, tokens, sep, n):
+    """
+    sep.join of the tokens of each record, rec sorted (as explode_list
+    returns it); records without tokens get ''.
+    """
+    out = np.full(n, "", dtype=object)
+    if len(rec):
+        starts = np.flatnonzero(np.r_[True, rec[1:] != rec[:-1]])
+        ends = np.r_[starts[1:], len(rec)].tolist()
+        tokens = list(tokens)
+        out[rec[starts]] = [sep.join(tokens[i:j]) for i, j in zip(starts.tolist(), ends)]
+    return out
+
+
+def _aquifer_token(part):
+    """parse_aquifer_ids rule for one token: int, or None when it is skipped."""
+    part = part.strip()
+    if not part:
+        return None
+    try:
+        return int(float(part))
+    except (ValueError, TypeError):
+        return None
+
+
+def resolve_overlaps(point, aquifer_id, material, prefix):
+    """
+    One aquifer per point from its (point, aquifer) matches, in aquifer
+    order: a single match is used as is; with several, the first whose
+    material contains 'sand' (shallow), else the first.
+    material: lower-case material per match.
+    Returns a DataFrame indexed by point with resolved_aq_id and aq_source.
+    """
+    matches = pd.DataFrame({'point': point, 'aq': aquifer_id,
+                            'sand': pd.Series(material, dtype=object).str.contains('sand', regex=False)
+                            .fillna(False).to_numpy(dtype=bool)})
+    grouped = matches.groupby('point', sort=False)
+    n = grouped.size()
+    first = grouped['aq'].first()
+    shallow = matches[matches['sand']].groupby('point', sort=False)['aq'].first().reindex(n.index)
+
+    resolved = shallow.fillna(first).where(n > 1, first).astype('int64')
+    source = np.where(n == 1, f"{prefix}_single",
+                      np.where(shallow.notna(), f"{prefix}_resolved_shallow_" + n.astype(str) + "_ids",
+                               f"{prefix}_resolved_first_" + n.astype(str) + "_ids"))
+    return pd.DataFrame({'resolved_aq_id': resolved, 'aq_source': source}, index=n.index)
+
+
+# ============================================================
+# POINT-IN-AQUIFER JOIN
+# ============================================================
+
+def aquifer_tree(geoms):
+    """STRtree over the aquifer polygons (NULL shapes are not indexed); build once per run."""
+    return shapely.STRtree(np.asarray(geoms, dtype=object))
+
+
+def points_in_aquifers(tree, points):
+    """
+    (point, aquifer) positions of every point within an aquifer polygon,
+    one bulk tree query for all points (SpatialJoin JOIN_ONE_TO_MANY,
+    WITHIN). Sorted by point, then aquifer order.
+    """
+    point, aq = tree.query(np.asarray(points, dtype=object), predicate='within')
+    order = np.lexsort((aq, point))
+    return point[order], aq[order]
+
+
+def join_aquifers(tree, points, aquifer_id, material, prefix):
+    """
+    One aquifer per point from the polygons it is within (resolve_overlaps);
+    polygons without an AQUIFER_ID are not matches.
+    aquifer_id, material: per polygon, in tree order.
+    Returns a DataFrame indexed by point position with resolved_aq_id and
+    aq_source, for the points with a match.
+    """
+    point, aq = points_in_aquifers(tree, points)
+    ids = np.asarray(aquifer_id, dtype=object)[aq]
+    has_id = np.array([_value(a) is not None for a in ids], dtype=bool)
+    point, aq = point[has_id], aq[has_id]
+    if len(point) == 0:
+        return pd.DataFrame({'resolved_aq_id': pd.Series(dtype='int64'),
+                             'aq_source': pd.Series(dtype=object)})
+    material = [str(m).lower() if _value(m) else "" for m in np.asarray(material, dtype=object)[aq]]
+    return resolve_overlaps(point, np.array([int(a) for a in ids[has_id]], dtype=np.int64),
+                            material, prefix)
+
+
+# ============================================================
+# STEP 2: EUGW VOLUME SUBTRACTION AND AQUIFER ASSIGNMENT
+# ============================================================
+
+def dedup_eugw(wtn, qty_cmd, aquifer_ids, licence_cmd_by_wtn, gwells_aq, aq_material):
+    """
+    Volume subtraction and aquifer assignment of EUGW records as table
+    operations: the WTN lists are exploded to one row per (record, WTN),
+    joined to the licence volumes and GWELLS aquifers and aggregated back
+    per record; AQUIFER_IDS lists are exploded the same way.
+    Same values as the per-record rules (parse_wtns, parse_aquifer_ids):
+      - licensed volume: sum over the matched WTNs in order (repeats count)
+      - no match: full qty_cmd, 'no_licence_match'
+      - matched: qty_cmd - licensed, dropped when <= 0, else 'reduced_by_<wtns>'
+      - aquifer: first WTN found in GWELLS ('gwells_wtn_<wtn>'), else the
+        AQUIFER_IDS list resolved as resolve_overlaps ('eugw_attribute_*')
+    Returns (kept records: COMBINED_FIELDS indexed by input position, counts).
+    """
+    qty = np.array(qty_cmd, dtype=float)
+    n = len(qty)
+
+    # One row per (record, WTN), WTNs in list order
+    rec, wtns = explode_list(wtn, ';', ',')
+    wtns = map_distinct(wtns, lambda t: normalize_wtn(t.strip()))
+    valid = wtns != ""
+    rec, wtns = rec[valid], wtns[valid]
+    wtn_rows = pd.DataFrame({'rec': rec, 'wtn': wtns})
+
+    # --- Volume subtraction ---
+    vol = wtn_rows['wtn'].map(licence_cmd_by_wtn).to_numpy(dtype=float)
+    matched = ~np.isnan(vol)
+    licensed_vol = np.zeros(n)
+    np.add.at(licensed_vol, rec[matched], vol[matched])
+    has_match = np.bincount(rec[matched], minlength=n) > 0
+
+    original_cmd = np.where(np.isnan(qty), 0.0, qty)
+    adjusted_cmd = np.where(has_match, original_cmd - licensed_vol, original_cmd)
+    dropped = has_match & (adjusted_cmd <= 0)
+    keep = ~dropped
+
+    flag = np.full(n, "no_licence_match", dtype=object)
+    matched_wtns = join_runs(rec[matched], wtns[matched], ',', n)
+    flag[has_match] = "reduced_by_" + matched_wtns[has_match]
+    well_tag = join_runs(rec, wtns, '; ', n)
+
+    # --- Aquifer assignment ---
+    resolved_aq = np.full(n, None, dtype=object)
+    aq_src = np.full(n, "", dtype=object)
+
+    # Priority 1: GWELLS lookup (first WTN with an entry)
+    wtn_rows['aq'] = wtn_rows['wtn'].map(gwells_aq)
+    gwells_hits = wtn_rows[wtn_rows['aq'].notna()].drop_duplicates('rec')
+    hit = gwells_hits['rec'].to_numpy()
+    resolved_aq[hit] = gwells_hits['aq'].astype('int64').tolist()
+    aq_src[hit] = ("gwells_wtn_" + gwells_hits['wtn']).to_numpy(dtype=object)
+    from_gwells = np.zeros(n, dtype=bool)
+    from_gwells[hit] = True
+
+    # Priority 2: AQUIFER_IDS attribute
+    rest = np.flatnonzero(~from_gwells & keep)
+    rec, ids = explode_list(np.asarray(aquifer_ids, dtype=object)[rest], ',', ';')
+    ids = map_distinct(ids, _aquifer_token)
+    valid = np.array([a is not None for a in ids], dtype=bool)
+    rec, ids = rest[rec[valid]], ids[valid].astype(np.int64)
+    from_attribute = np.zeros(n, dtype=bool)
+    if len(rec):
+        material = [aq_material.get(a, "").lower() for a in ids.tolist()]
+        resolved = resolve_overlaps(rec, ids, material, 'eugw_attribute')
+        hit = resolved.index.to_numpy()
+        resolved_aq[hit] = resolved['resolved_aq_id'].tolist()
+        aq_src[hit] = resolved['aq_source'].to_numpy(dtype=object)
+        from_attribute[hit] = True
+
+    counts = Counter({
+        'no_match': int((~has_match).sum()),
+        'reduced': int((has_match & keep).sum()),
+        'dropped': int(dropped.sum()),
+        'kept': int(keep.sum()),
+        'aq_gwells': int((from_gwells & keep).sum()),
+        'aq_attribute': int(from_attribute.sum()),
+        'aq_none': int((keep & ~from_gwells & ~from_attribute).sum()),
+    })
+
+    kept = np.flatnonzero(keep)
+    out = pd.DataFrame({
+        'well_tag': well_tag[kept],
+        'quantity_cmd': adjusted_cmd[kept],
+        'resolved_aq_id': pd.array(resolved_aq[kept].tolist(), dtype='Int64'),
+        'aq_source': aq_src[kept],
+        'source': "EUGW",
+        'dedup_flag': flag[kept],
+    }, index=kept)
+    return out, counts
+
+
+def adjust_eugw(eugw, licence_cmd_by_wtn, gwells_aq, aq_material):
+    """
+    Subtract licensed volumes from the EUGW points and assign aquifers (dedup_eugw).
+    eugw: (Geo)DataFrame with geometry, Well_Tag_Number, qty_cmd, AQUIFER_IDS.
+    Returns (kept points: geometry + COMBINED_FIELDS, counts).
+    """
+    geoms = _geometries(eugw)
+    has_shape = np.array([g is not None for g in geoms], dtype=bool)
+    out, counts = dedup_eugw(_column(eugw, 'Well_Tag_Number')[has_shape],
+                             _column(eugw, 'qty_cmd')[has_shape],
+                             _column(eugw, 'AQUIFER_IDS')[has_shape],
+                             licence_cmd_by_wtn, gwells_aq, aq_material)
+    out.insert(0, 'geometry', geoms[has_shape][out.index.to_numpy()])
+    return out.reset_index(drop=True), counts
+
+
+# ============================================================
+# STEP 3: LICENCE AQUIFER ASSIGNMENT
+# ============================================================
+
+def licence_points(lic):
+    """
+    Licences with a CMD volume, aquifer from SOURCE_NAME where it is an ID.
+    Returns (points: geometry + COMBINED_FIELDS, counts).
+    """
+    cmd = quantities_to_cmd(pd.Series(_column(lic, 'QUANTITY'), dtype=object),
+                            pd.Series(_column(lic, 'QUANTITY_UNITS'), dtype=object),
+                            LICENCE_UNITS)
+    ok = ~np.isnan(cmd)
+    aq = [parse_source_name_aquifer(s) for s in _column(lic, 'SOURCE_NAME')[ok]]
+
+    out = pd.DataFrame({
+        'geometry': _geometries(lic)[ok],
+        'well_tag': [normalize_wtn(w) for w in _column(lic, 'WELL_TAG_NUMBER')[ok]],
+        'quantity_cmd': cmd[ok],
+        'resolved_aq_id': pd.array(aq, dtype='Int64'),
+        'aq_source': ['licence_source_name' if a else '' for a in aq],
+        'source': 'LICENCE',
+        'dedup_flag': '',
+    })
+    counts = {'converted': int(ok.sum()), 'skipped': int((~ok).sum()),
+              'aq_source_name': sum(1 for a in aq if a)}
+    counts['needs_sj'] = counts['converted'] - counts['aq_source_name']
+    return out, counts
+
+
+def join_licence_aquifers(licences, licence_crs, aquifers):
+    """
+    Aquifer for licences without one: aquifer polygons each point is within,
+    overlaps resolved by resolve_overlaps (join_aquifers).
+    Updates licences in place; returns the number assigned.
+    """
+    need = np.flatnonzero(licences['resolved_aq_id'].isna().to_numpy())
+    if len(need) == 0:
+        return 0
+
+    points = gpd.GeoSeries(licences['geometry'].to_numpy()[need], crs=licence_crs).to_crs(aquifers.crs)
+    resolved = join_aquifers(aquifer_tree(_geometries(aquifers)), np.asarray(points.values, dtype=object),
+                             _column(aquifers, 'AQUIFER_ID'), _column(aquifers, 'MATERIAL'),
+                             'licence_spatial_join')
+    rows = need[resolved.index.to_numpy()]
+    licences.loc[rows, 'resolved_aq_id'] = resolved['resolved_aq_id'].to_numpy()
+    licences.loc[rows, 'aq_source'] = resolved['aq_source'].to_numpy()
+    return len(rows)
+
+
+# ============================================================
+# STEPS 5-7: TOTALS, DENSITY, MATERIAL SPLIT
+# ============================================================
+
+def aquifer_totals(combined):
+    """Total quantity_cmd per resolved aquifer ID."""
+    assigned = combined[combined['resolved_aq_id'].notna()]
+    totals = assigned.groupby(assigned['resolved_aq_id'].astype('int64'))['quantity_cmd'].sum()
+    return {int(k): (v if v else 0) for k, v in totals.items()}
+
+
+def aquifer_density(aquifers, aq_totals):
+    """Copy of the aquifers with total_cmd, area_km2 and density_cmd_km2 (rounded as the arcpy script)."""
+    out = aquifers.copy()
+    area_km2 = shapely.area(_geometries(out)) / 1_000_000.0
+    total, area, density = [], [], []
+    for aq_id, a in zip(_column(out, 'AQUIFER_ID'), area_km2.tolist()):
+        t = aq_totals.get(int(aq_id) if aq_id is not None else None, 0)
+        total.append(t)
+        area.append(round(a, 4))
+        density.append(round(t / a if a > 0 else 0, 4))
+    out['total_cmd'] = np.array(total, dtype=float)
+    out['area_km2'] = np.array(area, dtype=float)
+    out['density_cmd_km2'] = np.array(density, dtype=float)
+    return out
+
+
+def split_by_material(aquifers):
+    """(Sand and Gravel aquifers, Bedrock aquifers) by MATERIAL LIKE '%Sand%'/'%Gravel%' and '%Bedrock%'."""
+    material = aquifers['MATERIAL'].astype(object).where(aquifers['MATERIAL'].notna(), None)
+    text = material.fillna('').astype(str)
+    sand = material.notna() & (text.str.contains('Sand', regex=False) | text.str.contains('Gravel', regex=False))
+    rock = material.notna() & text.str.contains('Bedrock', regex=False)
+    return aquifers[sand.to_numpy()], aquifers[rock.to_numpy()]
+
+
+# ============================================================
+# STEP 8: RASTERIZATION (MAXIMUM COMBINED AREA)
+# ============================================================
+
+def raster_grid(bounds, cell_size):
+    """(x_min, y_max, n_rows, n_cols) of the grid covering bounds, anchored at its top-left corner."""
+    xmin, ymin, xmax, ymax = bounds
+    n_cols = max(1, int(math.ceil((xmax - xmin) / cell_size)))
+    n_rows = max(1, int(math.ceil((ymax - ymin) / cell_size)))
+    return xmin, ymax, n_rows, n_cols
+
+
+def cell_coverage(geom, x0, y0, cell_size, n_rows, n_cols):
+    """
+    Area of a polygon inside each cell of a grid window whose top-left
+    corner is (x0, y0). Returns (flat cell indices, areas) of the cells it
+    covers with a positive area.
+
+    Cells crossed by the polygon boundary get their exact intersection area.
+    They all lie in the 3x3 neighbourhood of the cells holding the boundary
+    vertices once the boundary is segmentized to the cell size. Every other
+    cell is either inside (full cell area) or outside, decided by its centre.
+    """
+    empty = np.empty(0, dtype=np.int64), np.empty(0)
+    gxmin, gymin, gxmax, gymax = geom.bounds
+    c0 = max(0, int(math.floor((gxmin - x0) / cell_size)))
+    c1 = min(n_cols, int(math.ceil((gxmax - x0) / cell_size)))
+    r0 = max(0, int(math.floor((y0 - gymax) / cell_size)))
+    r1 = min(n_rows, int(math.ceil((y0 - gymin) / cell_size)))
+    if c0 >= c1 or r0 >= r1:
+        return empty
+    h, w = r1 - r0, c1 - c0
+
+    # Cells that may touch the boundary
+    coords = shapely.get_coordinates(shapely.segmentize(shapely.boundary(geom), cell_size))
+    vc = np.floor((coords[:, 0] - x0) / cell_size).astype(np.int64) - c0
+    vr = np.floor((y0 - coords[:, 1]) / cell_size).astype(np.int64) - r0
+    edge = np.zeros((h + 2, w + 2), dtype=bool)
+    for dr in (-1, 0, 1):
+        for dc in (-1, 0, 1):
+            edge[np.clip(vr + dr + 1, 0, h + 1), np.clip(vc + dc + 1, 0, w + 1)] = True
+    edge = edge[1:-1, 1:-1]
+
+    shapely.prepare(geom)
+    rows, cols = np.nonzero(edge)
+    boxes = shapely.box(x0 + (c0 + cols) * cell_size, y0 - (r0 + rows + 1) * cell_size,
+                        x0 + (c0 + cols + 1) * cell_size, y0 - (r0 + rows) * cell_size)
+    edge_area = shapely.area(shapely.intersection(geom, boxes))
+
+    rows_in, cols_in = np.nonzero(~edge)
+    inside = shapely.contains_xy(geom, x0 + (c0 + cols_in + 0.5) * cell_size,
+                                 y0 - (r0 + rows_in + 0.5) * cell_size)
+
+    cells = np.concatenate([(r0 + rows) * n_cols + c0 + cols,
+                            (r0 + rows_in[inside]) * n_cols + c0 + cols_in[inside]])
+    areas = np.concatenate([edge_area, np.full(int(inside.sum()), cell_size * cell_size)])
+    positive = areas > 0
+    return cells[positive], areas[positive]
+
+
+def burn_polygons(geoms, values, x0, y0, cell_size, n_rows, n_cols, priorities=None):
+    """
+    Rasterize polygons into a grid window with PolygonToRaster's rules:
+      - with priorities, a cell gets the value of the overlapping polygon
+        with the largest positive priority, whatever the cell assignment
+        (as Esri documents the priority field)
+      - cells where no overlapping polygon has a positive priority, or all
+        cells without priorities, get the value whose polygons cover the
+        largest combined area of the cell (MAXIMUM_COMBINED_AREA; ties go
+        to the higher value)
+    A polygon overlaps a cell when their intersection has a positive area.
+    Cells no polygon covers are NODATA. Returns a float32 (n_rows, n_cols) array.
+    """
+    if priorities is None:
+        priorities = np.zeros(len(values))
+    cells, vals, prios, areas = [], [], [], []
+    for geom, value, priority in zip(geoms, values, priorities):
+        if geom is None or geom.is_empty:
+            continue
+        c, a = cell_coverage(geom, x0, y0, cell_size, n_rows, n_cols)
+        cells.append(c)
+        areas.append(a)
+        vals.append(np.full(len(c), value, dtype=float))
+        prios.append(np.full(len(c), priority, dtype=float))
+
+    grid = np.full(n_rows * n_cols, NODATA, dtype=np.float32)
+    if cells:
+        cover = pd.DataFrame({'cell': np.concatenate(cells), 'value': np.concatenate(vals),
+                              'priority': np.concatenate(prios), 'area': np.concatenate(areas)})
+        top = cover.groupby('cell', sort=False)['priority'].transform('max')
+        cover = cover[(top <= 0) | (cover['priority'] == top)]
+        combined = cover.groupby(['cell', 'value'], sort=False)['area'].sum().reset_index()
+        best = combined.sort_values(['cell', 'area', 'value'], ascending=[True, False, False],
+                                    kind='stable').drop_duplicates('cell')
+        grid[best['cell'].to_numpy()] = best['value'].to_numpy(dtype=np.float32)
+    return grid.reshape(n_rows, n_cols)
+
+
+def raster_tiles(n_rows, n_cols, tile_size):
+    """(row, col, height, width) of the tiles covering an n_rows x n_cols grid, row by row."""
+    return [(r, c, min(tile_size, n_rows - r), min(tile_size, n_cols - c))
+            for r in range(0, n_rows, tile_size) for c in range(0, n_cols, tile_size)]
+
+
+def _burn_tile(wkb, values, priorities, bounds, cell_size, n_rows, n_cols):
+    """
+    Worker entry point: burn_polygons of one tile. The polygons are clipped
+    to the tile first, so large aquifers cost only their part inside it.
+    """
+    geoms = shapely.clip_by_rect(shapely.from_wkb(wkb), *bounds)
+    return burn_polygons(geoms, values, bounds[0], bounds[3], cell_size, n_rows, n_cols, priorities)
+
+
+def iter_density_tiles(geoms, values, x0, y0, cell_size, n_rows, n_cols,
+                       tile_size=TILE_SIZE, executor=None, in_flight=1, priorities=None):
+    """
+    Rasterize polygons tile by tile (same cell rules as burn_polygons over
+    the whole grid). Yields (row, col, tile array) in tile order.
+    Each tile gets the WKB of the polygons whose bounding box touches it, from
+    an STRtree query; with an executor, at most in_flight tiles are queued,
+    so memory stays bounded by a few tiles whatever the extent.
+    """
+    geoms = np.asarray(geoms, dtype=object)
+    values = np.asarray(values, dtype=float)
+    priorities = np.zeros(len(values)) if priorities is None else np.asarray(priorities, dtype=float)
+    wkb = shapely.to_wkb(geoms)
+    tree = shapely.STRtree(geoms)
+
+    def task(tile):
+        r, c, h, w = tile
+        bounds = (x0 + c * cell_size, y0 - (r + h) * cell_size,
+                  x0 + (c + w) * cell_size, y0 - r * cell_size)
+        idx = np.sort(tree.query(shapely.box(*bounds)))
+        return wkb[idx], values[idx], priorities[idx], bounds, cell_size, h, w
+
+    tiles = raster_tiles(n_rows, n_cols, tile_size)
+    if executor is None:
+        for tile in tiles:
+            yield tile[0], tile[1], _burn_tile(*task(tile))
+        return
+
+    pending = deque()
+    for tile in tiles:
+        pending.append((tile, executor.submit(_burn_tile, *task(tile))))
+        if len(pending) >= in_flight:
+            done, future = pending.popleft()
+            yield done[0], done[1], future.result()
+    while pending:
+        done, future = pending.popleft()
+        yield done[0], done[1], future.result()
+
+
+def write_density_raster(aquifers, output_path, cell_size=CELL_SIZE, field='density_cmd_km2',
+                         priority_field='density_cmd_km2', tile_size=TILE_SIZE, executor=None,
+                         workers=1):
+    """
+    Rasterize aquifer polygons by field (priority_field first, then maximum
+    combined area; see burn_polygons) to a tiled GeoTIFF, written tile by
+    tile; tiles are burnt in executor's processes when given.
+    """
+    if rasterio is None:
+        raise ImportError("Writing rasters requires rasterio")
+    geoms = _geometries(aquifers)
+    x0, y0, n_rows, n_cols = raster_grid(shapely.total_bounds(geoms), cell_size)
+    profile = dict(driver='GTiff', height=n_rows, width=n_cols, count=1, dtype='float32',
+                   crs=aquifers.crs, transform=from_origin(x0, y0, cell_size, cell_size),
+                   nodata=NODATA, compress='deflate', tiled=True, BIGTIFF='IF_SAFER')
+    n_tiles = len(raster_tiles(n_rows, n_cols, tile_size))
+    with rasterio.open(output_path, 'w', **profile) as dst:
+        for i, (r, c, grid) in enumerate(iter_density_tiles(
+                geoms, aquifers[field].to_numpy(dtype=float), x0, y0, cell_size, n_rows, n_cols,
+                tile_size, executor, workers * TILES_IN_FLIGHT_PER_WORKER,
+                aquifers[priority_field].to_numpy(dtype=float)), 1):
+            dst.write(grid, 1, window=Window(c, r, grid.shape[1], grid.shape[0]))
+            if i % 100 == 0 or i == n_tiles:
+                print(f"    Tiles written: {i}/{n_tiles}")
+    return output_path
+
+
+# ============================================================
+# STEP 9: EXCEL EXPORT
+# ============================================================
+
+def export_excel(aquifers, output_xlsx):
+    """Aquifer attributes (EXPORT_FIELDS first) sorted by density, as the arcpy script."""
+    extra = [c for c in aquifers.columns
+             if c not in EXPORT_FIELDS and str(c).upper() not in EXPORT_SKIP]
+    df = pd.DataFrame(aquifers[[c for c in EXPORT_FIELDS if c in aquifers.columns] + extra])
+    df = df.sort_values('density_cmd_km2', ascending=False).reset_index(drop=True)
+    for col in ['total_cmd', 'area_km2', 'density_cmd_km2']:
+        if col in df.columns:
+            df[col] = df[col].round(4)
+    df.to_excel(output_xlsx, index=False, sheet_name='Aquifer Withdrawal Density')
+    return df
+
+
+# ============================================================
+# MAIN PROCESSING
+# ============================================================
+
+def run_withdrawal(gdb, output_gpkg, raster_folder, output_xlsx, cell_size=CELL_SIZE,
+                   workers=None, tile_size=TILE_SIZE):
+    """
+    Run steps 1-9 on the layers of gdb; returns the aquifer density table.
+    workers: if > 1, rasterize the tiles in this many processes.
+    """
+    print("=" * 60)
+    print("TOTAL SYSTEM WITHDRAWALS RASTER (open backend)")
+    print("=" * 60)
+
+    eugw = read_layer(gdb, EUGW_LAYER)
+    lic = read_layer(gdb, LICENCES_LAYER)
+    aquifers = read_layer(gdb, AQUIFERS_LAYER)
+    gwells = read_layer(gdb, GWELLS_LAYER)
+
+    # ---------------- Step 1 ----------------
+    print("\n--- Step 1: Building lookups ---")
+    print("  Building licence volume lookup (WTN -> CMD)...")
+    licence_cmd_by_wtn, licence_total, licence_skipped = licence_volumes(
+        _column(lic, 'WELL_TAG_NUMBER'), _column(lic, 'QUANTITY'), _column(lic, 'QUANTITY_UNITS'))
+    print(f"    Licence records processed: {licence_total}")
+    print(f"    Licence records skipped: {licence_skipped}")
+    print(f"    Unique WTNs with volumes: {len(licence_cmd_by_wtn)}")
+
+    print("  Building GWELLS lookup (WTN -> AQUIFER_ID)...")
+    gwells_aq = gwells_aquifers(_column(gwells, 'WELL_TAG_NUMBER'), _column(gwells, 'AQUIFER_ID'))
+    print(f"    GWELLS WTN->aquifer entries: {len(gwells_aq)}")
+
+    print("  Building aquifer material lookup...")
+    aq_material = aquifer_materials(_column(aquifers, 'AQUIFER_ID'), _column(aquifers, 'MATERIAL'))
+    print(f"    Aquifers in lookup: {len(aq_material)}")
+
+    # ---------------- Step 2 ----------------
+    print("\n--- Step 2: Processing EUGW - volume subtraction & aquifer assignment ---")
+    eugw_adjusted, c = adjust_eugw(eugw, licence_cmd_by_wtn, gwells_aq, aq_material)
+    print(f"  EUGW total: {len(eugw)}")
+    print(f"  EUGW no licence match (kept full): {c['no_match']}")
+    print(f"  EUGW reduced (partial licence): {c['reduced']}")
+    print(f"  EUGW dropped (fully licensed): {c['dropped']}")
+    print(f"  EUGW kept: {c['kept']}")
+    print(f"  Aquifer from GWELLS: {c['aq_gwells']}")
+    print(f"  Aquifer from EUGW attribute: {c['aq_attribute']}")
+    print(f"  No aquifer assigned: {c['aq_none']}")
+
+    # ---------------- Step 3 ----------------
+    print("\n--- Step 3: Processing licences - aquifer assignment ---")
+    licences, c = licence_points(lic)
+    print(f"  Licences converted: {c['converted']}")
+    print(f"  Licences skipped: {c['skipped']}")
+    print(f"  Aquifer from SOURCE_NAME: {c['aq_source_name']}")
+    print(f"  Needing spatial join: {c['needs_sj']}")
+    if c['needs_sj'] > 0:
+        print(f"  Running spatial join for {c['needs_sj']} licences...")
+        assigned = join_licence_aquifers(licences, lic.crs, aquifers)
+        print(f"  Aquifer from spatial join: {assigned}")
+
+    # ---------------- Step 4 ----------------
+    print("\n--- Step 4: Combining adjusted EUGW + Licences ---")
+    licences['geometry'] = np.asarray(gpd.GeoSeries(licences['geometry'], crs=lic.crs)
+                                      .to_crs(eugw.crs).values, dtype=object)
+    combined = pd.concat([eugw_adjusted, licences], ignore_index=True)
+    write_layer(combined, output_gpkg, COMBINED_LAYER, eugw.crs)
+    print(f"  Combined wells: {len(combined)}")
+    print(f"  With aquifer: {int(combined['resolved_aq_id'].notna().sum())}")
+    print(f"  Without aquifer: {int(combined['resolved_aq_id'].isna().sum())}")
+
+    # ---------------- Step 5 ----------------
+    print("\n--- Step 5: Calculating total withdrawal per aquifer ---")
+    aq_totals = aquifer_totals(combined)
+    print(f"  Aquifers with withdrawals: {len(aq_totals)}")
+
+    # ---------------- Step 6 ----------------
+    print("\n--- Step 6: Calculating withdrawal density (CMD/km2) ---")
+    aq_out = aquifer_density(aquifers, aq_totals)
+    write_layer(aq_out, output_gpkg, AQUIFERS_OUT_LAYER, aquifers.crs)
+
+    print(f"  Top 10 aquifers by density:")
+    top = aq_out[aq_out['density_cmd_km2'] > 0].sort_values('density_cmd_km2', ascending=False, kind='stable')
+    for aq_id, dens, total in top[['AQUIFER_ID', 'density_cmd_km2', 'total_cmd']].head(10).itertuples(index=False):
+        print(f"    Aquifer {aq_id}: {dens:.2f} CMD/km2  (total: {total:.2f} CMD)")
+
+    # ---------------- Step 7 ----------------
+    print("\n--- Step 7: Splitting aquifers by material type ---")
+    sand, rock = split_by_material(aq_out)
+    write_layer(sand, output_gpkg, AQ_SAND_LAYER, aquifers.crs)
+    print(f"  Sand and Gravel aquifers: {len(sand)}")
+    write_layer(rock, output_gpkg, AQ_ROCK_LAYER, aquifers.crs)
+    print(f"  Bedrock aquifers: {len(rock)}")
+    other_count = len(aq_out) - len(sand) - len(rock)
+    if other_count > 0:
+        print(f"  Other/unclassified material: {other_count}")
+
+    # ---------------- Step 8 ----------------
+    print(f"\n--- Step 8: Converting to rasters ({cell_size}m) ---")
+    executor = None
+    if workers and workers > 1:
+        print(f"  Rasterizing {tile_size}x{tile_size} cell tiles with {workers} worker processes")
+        executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        for label, subset, name in [('Sand & Gravel', sand, RAS_SAND), ('Bedrock', rock, RAS_ROCK)]:
+            if len(subset) > 0:
+                path = write_density_raster(subset, os.path.join(raster_folder, f"{name}.tif"),
+                                            cell_size, tile_size=tile_size, executor=executor,
+                                            workers=workers or 1)
+                print(f"  {label} raster: {path}")
+            else:
+                print(f"  No {label} aquifers - skipping raster")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    # ---------------- Step 9 ----------------
+    print(f"\n--- Step 9: Exporting aquifer attributes to Excel ---")
+    df = export_excel(aq_out, output_xlsx)
+    print(f"  Excel exported: {output_xlsx}")
+    print(f"  Rows: {len(df)}")
+
+    print(f"\n{'=' * 60}")
+    print("DONE")
+    print(f"{'=' * 60}")
+    print(f"  Layers (GeoPackage):     {output_gpkg}")
+    print(f"  Rasters:                 {raster_folder}")
+    print(f"  Excel:                   {output_xlsx}")
+    return aq_out
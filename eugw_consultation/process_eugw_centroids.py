@@ -20,14 +20,43 @@ Purpose Classification (same as process_eugw_to_wells.py):
 Quantity Handling:
   - All quantities converted to CMD (cubic meters per day)
   - Multi-quantity parcels: summed to single total per parcel
-  - Units: cmd (as-is), cmy (÷365), cms (×86400), Sel/kW (NaN)
+  - Units: cmd/m3/day (as-is), cmy/m3/year (÷365), cms (×86400), Sel/kW (NaN)
+    (shared rule table in eugw_normalize.py)
   - qty_cmd_log: log10(qty_cmd + 1) for kernel density weighting (reduces skew)
+
+Backends:
+  - 'arcpy': reads BATCH_SIZE features per cursor batch into a DataFrame,
+             derives the fields column-wise (eugw_centroids.derive_fields) and
+             writes the point feature class to OUTPUT_GDB
+  - 'open':  arcpy-free column-wise version (eugw_centroids.py), reads the
+             layer with pyogrio and writes OUTPUT_OPEN (GeoPackage or GeoParquet);
+             WORKERS > 1 computes the centroids of each batch in a process pool
+  BACKEND = None uses arcpy when it is installed, otherwise the open backend.
+
+Delta refresh (DELTA = True):
+  Every centroid of a delta run stores src_hash, the fingerprint of its
+  source parcel (attributes + geometry). A delta run keeps the existing
+  output and its schema, inserts centroids only for new or edited parcels
+  and deletes those of removed or edited parcels; unchanged parcels are not
+  rewritten. Without a fingerprinted output (first run, output of a full
+  build, changed source fields) the output is rebuilt in full. Full builds
+  (DELTA = False) skip the fingerprint pass and write no src_hash.
 """
 
-import arcpy
 import os
 import sys
-import math
+from itertools import islice
+
+import pandas as pd
+
+try:
+    import arcpy
+except ImportError:  # Linux processing nodes: use the open backend
+    arcpy = None
+
+from eugw_centroids import (run_centroids, derive_fields, CentroidSummary, SourceFingerprints,
+                            in_output, print_delta_report, NEW_FIELDS,
+                            HASH_FIELD, HASH_FIELD_LENGTH, MAX_FIELD_NAME)
 
 # ============================================================
 # CONFIGURATION
@@ -38,130 +67,55 @@ INPUT_LAYER = "EUGW_Master_Spatial"
 OUTPUT_GDB = r"W:\srm\gss\projects\gr_2026_227_eugw_consultation_support\work\data.gdb"
 OUTPUT_FC = "EUGW_Parcel_Centroids"
 
-# Full paths
-INPUT_FC = os.path.join(INPUT_GDB, INPUT_LAYER)
-OUTPUT_PATH = os.path.join(OUTPUT_GDB, OUTPUT_FC)
-
-
-# ============================================================
-# UNIT CONVERSION
-# ============================================================
-
-def convert_single_qty_to_cmd(qty_str, unit_str):
-    """Convert a single quantity value to CMD."""
-    try:
-        qty = float(qty_str)
-    except (ValueError, TypeError):
-        return None
-
-    unit = str(unit_str).strip().lower()
-    if unit == 'cmd':
-        return qty
-    elif unit == 'cmy':
-        return qty / 365.0
-    elif unit == 'cms':
-        return qty * 86400.0
-    elif unit in ('sel', 'kw'):
-        return None
-    else:
-        return None
-
-
-def parse_and_sum_quantities(qty_str, unit_str):
-    """
-    Parse potentially comma-separated quantities and units.
-    Returns (total_cmd, quantity_flag).
-    """
-    if qty_str is None or unit_str is None:
-        return (None, 'no_quantity')
+# Open backend output (.gpkg, or .parquet for GeoParquet)
+OUTPUT_OPEN = r"W:\srm\gss\projects\gr_2026_227_eugw_consultation_support\work\EUGW_Parcel_Centroids.gpkg"
 
-    qty_str = str(qty_str).strip()
-    unit_str = str(unit_str).strip()
+# 'arcpy', 'open', or None to pick arcpy when available
+BACKEND = None
 
-    if qty_str in ('', 'None', 'nan'):
-        return (None, 'no_quantity')
+# Features read, transformed and written per batch
+BATCH_SIZE = 50000
 
-    qtys = [q.strip() for q in qty_str.split(',')]
-    units = [u.strip() for u in unit_str.split(',')]
+# Refresh the existing output from source fingerprints instead of rebuilding it
+DELTA = False
 
-    while len(units) < len(qtys):
-        units.append(units[-1])
+# Open backend: processes computing centroids (None = single process)
+WORKERS = None
 
-    cmd_values = []
-    has_unconvertible = False
-    for q, u in zip(qtys, units):
-        val = convert_single_qty_to_cmd(q, u)
-        if val is not None:
-            cmd_values.append(val)
-        else:
-            has_unconvertible = True
-
-    if not cmd_values:
-        return (None, 'unconvertible_units')
-
-    total = sum(cmd_values)
-
-    if len(qtys) == 1:
-        flag = 'direct'
-    else:
-        flag = 'summed'
-    if has_unconvertible:
-        flag += '_partial_unconvertible'
-
-    return (total, flag)
+# Full paths
+INPUT_FC = os.path.join(INPUT_GDB, INPUT_LAYER)
+OUTPUT_PATH = os.path.join(OUTPUT_GDB, OUTPUT_FC)
 
 
 # ============================================================
-# PURPOSE CLASSIFICATION
+# MAIN PROCESSING
 # ============================================================
 
-def classify_purpose(purpose_str):
-    """Classify purpose for symbology."""
-    if purpose_str is None or str(purpose_str).strip() in ('', 'None', 'nan'):
-        return 'Unknown'
-
-    purposes = [p.strip() for p in str(purpose_str).split(',')]
-
-    if len(purposes) == 1:
-        return purposes[0]
-
-    has_commercial = any('commercial' in p.lower() for p in purposes)
-    if has_commercial:
-        return 'Multi-purpose (includes Commercial)'
-    else:
-        return 'Multi-purpose (no Commercial)'
-
+def _cursor_values(column):
+    """Column values for insertRow: NaN becomes None (NULL)."""
+    values = column.to_numpy(dtype=object)
+    values[pd.isna(column).to_numpy()] = None
+    return values
 
-# ============================================================
-# MAIN PROCESSING
-# ============================================================
 
 def main():
-    arcpy.env.overwriteOutput = True
-
-    # Validate input
-    if not arcpy.Exists(INPUT_FC):
-        print(f"ERROR: Input not found: {INPUT_FC}")
+    backend = BACKEND or ('arcpy' if arcpy is not None else 'open')
+    if backend == 'open':
+        run_centroids(INPUT_GDB, OUTPUT_OPEN, layer=INPUT_LAYER, output_layer=OUTPUT_FC,
+                      delta=DELTA, workers=WORKERS)
+        return
+    if arcpy is None:
+        print("ERROR: BACKEND is 'arcpy' but arcpy is not installed")
         sys.exit(1)
+    main_arcpy()
 
-    print(f"Reading: {INPUT_FC}")
-    input_count = int(arcpy.GetCount_management(INPUT_FC)[0])
-    print(f"Input features: {input_count}")
-
-    # Get input spatial reference
-    sr = arcpy.Describe(INPUT_FC).spatialReference
-    print(f"Spatial reference: {sr.name}")
-
-    # Get all field names from input (exclude shape fields)
-    input_fields = []
-    skip_types = ['Geometry', 'OID', 'Blob', 'Raster']
-    for f in arcpy.ListFields(INPUT_FC):
-        if f.type not in skip_types and f.name.upper() not in ('SHAPE', 'SHAPE_LENGTH', 'SHAPE_AREA'):
-            input_fields.append(f)
 
-    # -------------------------------------------------------
-    # Create output feature class (point)
-    # -------------------------------------------------------
+def create_output_fc(sr, input_fields, fingerprint=False):
+    """
+    (Re)create the output point feature class with the derived fields, the
+    fingerprint field (delta runs only) and the original fields.
+    Returns [(input name, output name)] of the original fields added.
+    """
     print(f"\nCreating output: {OUTPUT_PATH}")
     if arcpy.Exists(OUTPUT_PATH):
         arcpy.Delete_management(OUTPUT_PATH)
@@ -180,6 +134,8 @@ def main():
         ('qty_cmd_log', 'DOUBLE', None),
         ('qty_flag', 'TEXT', 50),
     ]
+    if fingerprint:
+        new_fields.append((HASH_FIELD, 'TEXT', HASH_FIELD_LENGTH))
     for fname, ftype, flength in new_fields:
         if flength:
             arcpy.AddField_management(OUTPUT_PATH, fname, ftype, field_length=flength)
@@ -191,8 +147,8 @@ def main():
     for f in input_fields:
         out_name = f.name
         # Truncate field names > 64 chars for shapefile compatibility
-        if len(out_name) > 64:
-            out_name = out_name[:64]
+        if len(out_name) > MAX_FIELD_NAME:
+            out_name = out_name[:MAX_FIELD_NAME]
         try:
             if f.type == 'String':
                 arcpy.AddField_management(OUTPUT_PATH, out_name, 'TEXT', field_length=f.length)
@@ -209,141 +165,150 @@ def main():
             original_field_names.append((f.name, out_name))
         except Exception as e:
             print(f"  Warning: Could not add field '{out_name}': {e}")
+    return original_field_names
+
+
+def read_output_keys(input_fields):
+    """
+    Fingerprint keys in the existing output, or None when it cannot be
+    refreshed (missing, no HASH_FIELD, or fields differ from the source).
+    """
+    if not arcpy.Exists(OUTPUT_PATH):
+        return None
+    existing = {f.name for f in arcpy.ListFields(OUTPUT_PATH)}
+    expected = set(NEW_FIELDS) | {HASH_FIELD} | {f.name[:MAX_FIELD_NAME] for f in input_fields}
+    if not expected <= existing:
+        return None
+    with arcpy.da.SearchCursor(OUTPUT_PATH, [HASH_FIELD]) as cur:
+        return {row[0] for row in cur}
+
+
+def delete_output_keys(keys):
+    """Delete the output centroids whose HASH_FIELD is in keys. Returns rows deleted."""
+    deleted = 0
+    with arcpy.da.UpdateCursor(OUTPUT_PATH, [HASH_FIELD]) as cur:
+        for row in cur:
+            if row[0] in keys:
+                cur.deleteRow()
+                deleted += 1
+    return deleted
+
+
+def main_arcpy():
+    arcpy.env.overwriteOutput = True
+
+    # Validate input
+    if not arcpy.Exists(INPUT_FC):
+        print(f"ERROR: Input not found: {INPUT_FC}")
+        sys.exit(1)
+
+    print(f"Reading: {INPUT_FC}")
+    input_count = int(arcpy.GetCount_management(INPUT_FC)[0])
+    print(f"Input features: {input_count}")
+
+    # Get input spatial reference
+    sr = arcpy.Describe(INPUT_FC).spatialReference
+    print(f"Spatial reference: {sr.name}")
+
+    # Get all field names from input (exclude shape fields)
+    input_fields = []
+    skip_types = ['Geometry', 'OID', 'Blob', 'Raster']
+    for f in arcpy.ListFields(INPUT_FC):
+        if f.type not in skip_types and f.name.upper() not in ('SHAPE', 'SHAPE_LENGTH', 'SHAPE_AREA'):
+            input_fields.append(f)
 
     # -------------------------------------------------------
-    # Read input and write centroids
+    # Refresh the existing output, or create it
     # -------------------------------------------------------
-    # Build cursor field list for input
-    read_fields = ['SHAPE@'] + [f.name for f in input_fields]
-
-    # Build cursor field list for output
-    write_fields = ['SHAPE@', 'cls_purpose', 'qty_cmd', 'qty_cmd_log', 'qty_flag']
-    write_fields += [out_name for _, out_name in original_field_names]
+    output_keys = read_output_keys(input_fields) if DELTA else None
+    refresh = output_keys is not None
+    if refresh:
+        print(f"\nDelta: {len(output_keys)} centroids in {OUTPUT_PATH}")
+        original_field_names = [(f.name, f.name[:MAX_FIELD_NAME]) for f in input_fields]
+    else:
+        if DELTA:
+            print(f"\nDelta: no matching fingerprinted output at {OUTPUT_PATH}, building everything")
+        original_field_names = create_output_fc(sr, input_fields, fingerprint=DELTA)
 
-    # Find indices for key fields in read cursor
+    # -------------------------------------------------------
+    # Read input and write centroids, BATCH_SIZE features at a time
+    # -------------------------------------------------------
+    # SHAPE@XY is the feature centroid; SHAPE@AREA flags null/empty shapes;
+    # SHAPE@WKB feeds the fingerprint (delta runs only). No geometry objects
+    # are built per feature.
     field_names_list = [f.name for f in input_fields]
+    read_fields = ['SHAPE@XY', 'SHAPE@AREA'] + (['SHAPE@WKB'] if DELTA else []) + field_names_list
 
-    def get_val(row_values, field_name):
-        """Get value from row by field name."""
-        try:
-            idx = field_names_list.index(field_name) + 1  # +1 for SHAPE@
-            return row_values[idx]
-        except (ValueError, IndexError):
-            return None
+    # Build cursor field list for output
+    write_fields = ['SHAPE@XY', 'cls_purpose', 'qty_cmd', 'qty_cmd_log', 'qty_flag']
+    write_fields += [HASH_FIELD] if DELTA else []
+    write_fields += [out_name for _, out_name in original_field_names]
 
     print("\nProcessing...")
     counts = {
         'total': 0,
         'success': 0,
         'null_geometry': 0,
+        'unchanged': 0,
+        'inserted': 0,
+        'deleted': 0,
     }
+    summary = CentroidSummary()
+    fingerprints = SourceFingerprints() if DELTA else None
 
     with arcpy.da.InsertCursor(OUTPUT_PATH, write_fields) as insert_cur:
         with arcpy.da.SearchCursor(INPUT_FC, read_fields) as search_cur:
-            for row in search_cur:
-                counts['total'] += 1
-                shape = row[0]
-
-                # Get centroid
-                if shape is None or shape.area == 0:
-                    counts['null_geometry'] += 1
-                    continue
-
-                centroid = shape.centroid
-                point_geom = arcpy.PointGeometry(centroid, sr)
-
-                # Classify purpose
-                purpose_val = get_val(row, 'App_Purpose_Name')
-                cls_purpose = classify_purpose(purpose_val)
-
-                # Parse and sum quantities
-                qty_val = get_val(row, 'Quantity')
-                unit_val = get_val(row, 'Quantity_Units')
-                qty_cmd, qty_flag = parse_and_sum_quantities(qty_val, unit_val)
-
-                # Log10 transform for kernel density weighting
-                if qty_cmd is not None and qty_cmd > 0:
-                    qty_cmd_log = math.log10(qty_cmd + 1)
-                else:
-                    qty_cmd_log = None
-
-                # Build output row
-                out_row = [point_geom, cls_purpose, qty_cmd, qty_cmd_log, qty_flag]
-
-                # Copy original field values
-                for orig_name, out_name in original_field_names:
-                    val = get_val(row, orig_name)
-                    out_row.append(val)
-
-                insert_cur.insertRow(out_row)
-                counts['success'] += 1
-
-                if counts['total'] % 500 == 0:
-                    print(f"  Processed {counts['total']} features...")
+            while True:
+                # One batch of rows as columns (object dtype keeps cursor values as-is)
+                batch = pd.DataFrame(list(islice(search_cur, BATCH_SIZE)),
+                                     columns=read_fields, dtype=object)
+                if batch.empty:
+                    break
+                counts['total'] += len(batch)
+
+                if DELTA:
+                    batch['__key__'] = fingerprints.keys(batch[field_names_list], batch['SHAPE@WKB'])
+                if refresh:
+                    # Unchanged centroids stay as they are, only counted in the summary
+                    unchanged = in_output(batch['__key__'], output_keys)
+                    summary.add_batch(derive_fields(batch[unchanged]))
+                    counts['unchanged'] += int(unchanged.sum())
+                    counts['success'] += int(unchanged.sum())
+                    batch = batch[~unchanged].reset_index(drop=True)
+
+                area = pd.to_numeric(batch['SHAPE@AREA'], errors='coerce').fillna(0)
+                kept = batch['SHAPE@XY'].notna() & (area != 0)
+                counts['null_geometry'] += int((~kept).sum())
+                batch = batch[kept.to_numpy()].reset_index(drop=True)
+
+                # Derived fields for the whole batch at once
+                derived = derive_fields(batch)
+                summary.add_batch(derived)
+
+                columns = [batch['SHAPE@XY'].to_numpy(dtype=object)]
+                columns += [_cursor_values(derived[c]) for c in NEW_FIELDS]
+                if DELTA:
+                    columns += [batch['__key__'].to_numpy(dtype=object)]
+                columns += [batch[orig].to_numpy(dtype=object) for orig, _ in original_field_names]
+                for out_row in zip(*columns):
+                    insert_cur.insertRow(out_row)
+
+                counts['success'] += len(batch)
+                counts['inserted'] += len(batch)
+                print(f"  Processed {counts['total']} features...")
+
+    if refresh:
+        stale = output_keys - fingerprints.keys_seen
+        if stale:
+            print(f"\nDeleting {len(stale)} stale centroids...")
+            counts['deleted'] = delete_output_keys(stale)
 
     # -------------------------------------------------------
-    # Summary
+    # Summary (accumulated during the write pass)
     # -------------------------------------------------------
-    output_count = int(arcpy.GetCount_management(OUTPUT_PATH)[0])
-
-    print(f"\n{'='*60}")
-    print(f"PROCESSING SUMMARY")
-    print(f"{'='*60}")
-    print(f"Input polygons:     {counts['total']}")
-    print(f"Output centroids:   {output_count}")
-    print(f"Null geometry:      {counts['null_geometry']}")
-
-    # Quick stats on output
-    print(f"\n--- Purpose Classification ---")
-    purpose_counts = {}
-    with arcpy.da.SearchCursor(OUTPUT_PATH, ['cls_purpose']) as cur:
-        for r in cur:
-            p = r[0] if r[0] else 'Unknown'
-            purpose_counts[p] = purpose_counts.get(p, 0) + 1
-    for p, c in sorted(purpose_counts.items(), key=lambda x: -x[1]):
-        print(f"  {p}: {c}")
-
-    print(f"\n--- Quantity Flag ---")
-    flag_counts = {}
-    with arcpy.da.SearchCursor(OUTPUT_PATH, ['qty_flag']) as cur:
-        for r in cur:
-            f = r[0] if r[0] else 'unknown'
-            flag_counts[f] = flag_counts.get(f, 0) + 1
-    for f, c in sorted(flag_counts.items(), key=lambda x: -x[1]):
-        print(f"  {f}: {c}")
-
-    print(f"\n--- Quantity Stats (CMD) ---")
-    qty_values = []
-    null_count = 0
-    with arcpy.da.SearchCursor(OUTPUT_PATH, ['qty_cmd']) as cur:
-        for r in cur:
-            if r[0] is not None:
-                qty_values.append(r[0])
-            else:
-                null_count += 1
-    if qty_values:
-        print(f"  Records with valid qty: {len(qty_values)}")
-        print(f"  Records with NULL qty:  {null_count}")
-        print(f"  Min:    {min(qty_values):.4f}")
-        print(f"  Max:    {max(qty_values):.4f}")
-        print(f"  Mean:   {sum(qty_values)/len(qty_values):.4f}")
-        sorted_vals = sorted(qty_values)
-        median = sorted_vals[len(sorted_vals)//2]
-        print(f"  Median: {median:.4f}")
-
-    print(f"\n--- Quantity Stats (Log10) ---")
-    log_values = []
-    with arcpy.da.SearchCursor(OUTPUT_PATH, ['qty_cmd_log']) as cur:
-        for r in cur:
-            if r[0] is not None:
-                log_values.append(r[0])
-    if log_values:
-        print(f"  Records with valid log: {len(log_values)}")
-        print(f"  Min:    {min(log_values):.4f}")
-        print(f"  Max:    {max(log_values):.4f}")
-        print(f"  Mean:   {sum(log_values)/len(log_values):.4f}")
-
-    print(f"\nOutput saved to: {OUTPUT_PATH}")
+    summary.print(counts, counts['success'], OUTPUT_PATH)
+    if refresh:
+        print_delta_report(counts)
 
 
 if __name__ == '__main__':
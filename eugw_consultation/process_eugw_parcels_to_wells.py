@@ -6,7 +6,8 @@ with standardized quantities (CMD - cubic meters per day) and
 classified purposes for mapping.
 
 Input:  EUGW parcel-level Excel file (polygon export)
-Output: Well-level point CSV ready for GIS import
+Output: Well-level point CSV ready for GIS import, or GeoParquet
+        (typed columns + WKB point geometry) when the output ends in .parquet
 
 Purpose Classification:
   - Single-purpose applications: keep original purpose
@@ -21,51 +22,89 @@ Quantity Handling:
   - Single quantity + multiple wells: split equally
   - Multiple quantities matching well count: assign 1:1
   - Multiple quantities not matching: sum total per well
-  - Units: cmd (as-is), cmy (÷365), cms (×86400), Sel/kW (flagged, no conversion)
+  - Units: cmd/m3/day (as-is), cmy/m3/year (÷365), cms (×86400), Sel/kW (flagged,
+    no conversion); one rule table shared by all EUGW scripts (eugw_normalize.py)
 
 Coordinate Handling:
   - Rows with no valid coordinates are KEPT with NaN lat/lon
   - coord_status field indicates: 'valid', 'no_coordinates', 'invalid_coordinates'
   - These can later be recovered via GWELLS lookup using Well_Tag_Number or dropped
+  - With gwells_file set, that lookup runs as a built-in stage (eugw_gwells.py);
+    recovered rows get coord_status 'recovered_gwells'
+  - With aoi set (provincial boundary or project AOI), located rows are tested
+    against that polygon in one vectorized pass (eugw_aoi.py); points that pass
+    the BC bounding box but fall outside the polygon get 'outside_aoi'
+
+Engines:
+  - 'vectorized' (default): column-wise expansion of all parcels at once
+  - 'rowwise': original parcel-by-parcel loop, kept as the reference
+  Both produce an identical output CSV.
+
+Streaming:
+  - process_eugw(..., chunk_size=N) reads the workbook N parcels at a time,
+    appends each chunk's well rows to the CSV and keeps only running counters,
+    so memory stays flat for very large exports; streamed columns are read as
+    text, so the output does not depend on N
+  - process_eugw(..., workers=N) shards each chunk across N processes and
+    merges the results back in input order
+  - the workbook is read once into a local binary sidecar (eugw_ingest.py);
+    later runs load the sidecar instead of parsing Excel over the network
+  - process_eugw(..., incremental=True) stores a content hash per parcel next
+    to the output and on the next run re-expands only new or modified parcels
+
+Output Layout:
+  - 'wide' (default): one row per well with every parcel attribute repeated
+  - 'normalized': a parcels table (<output stem>_parcels<ext>, one row per
+    parcel with a parcel_id key) and a slim wells table holding only the
+    derived well fields and parcel_id; read_well_points() rejoins them into
+    the wide view
 """
 
 import pandas as pd
 import numpy as np
-import sys
 import os
+import json
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from eugw_parse_cache import memoize_parser, print_cache_report
+from eugw_normalize import (quantity_to_cmd, units_to_cmd, parse_floats,
+                            classify_purposes, classify_purpose_list, UNKNOWN_PURPOSE)
+from eugw_ingest import read_parcels, iter_cached_chunks
+from eugw_gwells import load_gwells_index, recover_coordinates
+from eugw_aoi import load_aoi, validate_coordinates
+from eugw_instrument import RunProfiler, report_path_for
+from eugw_qa import QAReport, qa_path_for
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute
+    import pyarrow.parquet as pq
+except ImportError:  # only needed for Parquet output
+    pa = pq = None
 
 
 # ============================================================
 # UNIT CONVERSION
 # ============================================================
 
+@memoize_parser
 def convert_single_qty_to_cmd(qty_str, unit_str):
-    """Convert a single quantity value to CMD based on its unit."""
-    try:
-        qty = float(qty_str)
-    except (ValueError, TypeError):
-        return np.nan
-
-    unit = str(unit_str).strip().lower()
-    if unit == 'cmd':
-        return qty
-    elif unit == 'cmy':
-        return qty / 365.0
-    elif unit == 'cms':
-        return qty * 86400.0
-    elif unit in ('sel', 'kw'):
-        return np.nan
-    else:
-        return np.nan
+    """Convert a single quantity value to CMD based on its unit (rules in eugw_normalize)."""
+    cmd = quantity_to_cmd(qty_str, unit_str)
+    return np.nan if cmd is None else cmd
 
 
+@memoize_parser
 def parse_and_convert_quantities(qty_str, unit_str):
     """
     Parse potentially comma-separated quantities and units.
-    Returns list of (quantity_cmd, original_unit) tuples.
+    Returns a tuple of (quantity_cmd, original_unit) pairs; the result is
+    cached and shared between calls, so it must be immutable.
     """
     if pd.isna(qty_str) or pd.isna(unit_str):
-        return []
+        return ()
 
     qtys = [q.strip() for q in str(qty_str).split(',')]
     units = [u.strip() for u in str(unit_str).split(',')]
@@ -78,7 +117,7 @@ def parse_and_convert_quantities(qty_str, unit_str):
         cmd_val = convert_single_qty_to_cmd(q, u)
         results.append((cmd_val, u))
 
-    return results
+    return tuple(results)
 
 
 # ============================================================
@@ -126,24 +165,17 @@ def parse_well_tags(tag_str):
 # PURPOSE CLASSIFICATION
 # ============================================================
 
+@memoize_parser
 def classify_purpose(purpose_str):
     """
     Classify purpose for symbology.
-    Returns (classified_purpose, is_multi, original_purposes_list)
+    Returns (classified_purpose, is_multi, original_purposes_tuple)
     """
     if pd.isna(purpose_str):
-        return ('Unknown', False, [])
+        return (UNKNOWN_PURPOSE, False, ())
 
-    purposes = [p.strip() for p in str(purpose_str).split(',')]
-
-    if len(purposes) == 1:
-        return (purposes[0], False, purposes)
-
-    has_commercial = any('commercial' in p.lower() for p in purposes)
-    if has_commercial:
-        return ('Multi-purpose (includes Commercial)', True, purposes)
-    else:
-        return ('Multi-purpose (no Commercial)', True, purposes)
+    purposes = tuple(p.strip() for p in str(purpose_str).split(','))
+    return (classify_purpose_list(purposes), len(purposes) > 1, purposes)
 
 
 # ============================================================
@@ -183,13 +215,280 @@ def get_quantity_info(qty_results):
 
 
 # ============================================================
-# MAIN PROCESSING
+# OUTPUT COLUMNS
 # ============================================================
 
-def process_eugw(input_file, output_file):
-    print(f"Reading: {input_file}")
-    df = pd.read_excel(input_file)
-    print(f"Input rows: {len(df)}")
+NEW_COLS = ['pt_latitude', 'pt_longitude', 'pt_well_tag',
+            'classified_purpose', 'quantity_cmd', 'quantity_flag', 'coord_status']
+
+# Run-assigned parcel key linking the slim wells table to the parcels table
+PARCEL_ID = 'parcel_id'
+
+
+def order_output_columns(out_df):
+    """Put the derived well fields first, followed by the original parcel fields."""
+    original_cols = [c for c in out_df.columns if c not in NEW_COLS]
+    return out_df[NEW_COLS + original_cols]
+
+
+# ============================================================
+# VECTORIZED EXPANSION
+# ============================================================
+# Column-wise equivalent of expand_parcels_rowwise(). Every delimited
+# field is exploded into a long (parcel, pos, token) table, the per-parcel
+# facts are gathered with bincount/merge, and the quantity/purpose rules
+# are applied with np.select over all well rows at once.
+
+def _tokens_to_float(tokens):
+    """Convert an array of string tokens to float64 (NaN if unparsable), parsing each distinct token once."""
+    return parse_floats(tokens)[0]
+
+
+def _explode_tokens(values, sep=',', alt_sep=None):
+    """
+    Split a column of delimited strings into one row per stripped token.
+    Returns DataFrame (parcel, pos, token); null cells produce no rows.
+    `values` must be indexed 0..n-1 by parcel position.
+    """
+    present = values[values.notna()]
+    if present.empty:
+        return pd.DataFrame({'parcel': np.array([], dtype=np.int64),
+                             'token': np.array([], dtype=object),
+                             'pos': np.array([], dtype=np.int64)})
+
+    text = present.map(str)
+    if alt_sep is not None:
+        text = text.str.replace(alt_sep, sep, regex=False)
+    tokens = text.str.split(sep).explode()
+
+    out = pd.DataFrame({
+        'parcel': tokens.index.to_numpy(dtype=np.int64),
+        'token': tokens.str.strip().to_numpy(dtype=object),
+    })
+    out['pos'] = out.groupby('parcel', sort=False).cumcount().to_numpy(dtype=np.int64)
+    return out
+
+
+def _lookup(table, parcel, pos, column, fill):
+    """Fetch table[column] at (parcel, pos) pairs, `fill` where there is no match."""
+    keys = pd.DataFrame({'parcel': parcel, 'pos': pos})
+    found = keys.merge(table[['parcel', 'pos', column]], on=['parcel', 'pos'], how='left')
+    values = found[column].to_numpy(dtype=object if isinstance(fill, str) else float, copy=True)
+    if isinstance(fill, str):
+        values[pd.isna(values)] = fill
+    return values
+
+
+def _vector_coordinates(lat, lon, n):
+    """
+    Explode lat/lon pairs and keep the ones inside the BC bounding box.
+    Returns (coords DataFrame [parcel, pos, lat, lon], n_coords per parcel).
+    """
+    both = lat.notna() & lon.notna()
+    lat_t = _explode_tokens(lat.where(both))
+    lon_t = _explode_tokens(lon.where(both))
+
+    # Inner merge on position reproduces zip() truncation to the shorter list
+    pairs = lat_t.merge(lon_t, on=['parcel', 'pos'], suffixes=('_lat', '_lon'))
+    pairs = pairs.sort_values(['parcel', 'pos'], kind='stable')
+
+    lat_f = _tokens_to_float(pairs['token_lat'])
+    lon_f = _tokens_to_float(pairs['token_lon'])
+    keep = (lat_f > 48) & (lat_f < 60) & (lon_f > -140) & (lon_f < -114)
+
+    coords = pd.DataFrame({
+        'parcel': pairs['parcel'].to_numpy()[keep],
+        'lat': lat_f[keep],
+        'lon': np.where(lon_f[keep] > 0, -lon_f[keep], lon_f[keep]),
+    })
+    coords['pos'] = coords.groupby('parcel', sort=False).cumcount().to_numpy(dtype=np.int64)
+    n_coords = np.bincount(coords['parcel'], minlength=n)
+    return coords, n_coords
+
+
+def _vector_well_tags(tags):
+    """Explode well tags, dropping blanks and '0', re-numbering the survivors."""
+    tag_t = _explode_tokens(tags, sep=';', alt_sep=',')
+    tag_t = tag_t[(tag_t['token'] != '') & (tag_t['token'] != '0')].copy()
+    tag_t['pos'] = tag_t.groupby('parcel', sort=False).cumcount().to_numpy(dtype=np.int64)
+    return tag_t
+
+
+def _vector_quantities(qty, units, n):
+    """
+    Explode quantities, pair each with its unit (last unit repeated) and convert to CMD.
+    Returns (qty DataFrame [parcel, pos, cmd], n_qtys, n_valid, total_cmd).
+    """
+    both = qty.notna() & units.notna()
+    q_t = _explode_tokens(qty.where(both))
+    u_t = _explode_tokens(units.where(both))
+
+    n_units = np.bincount(u_t['parcel'], minlength=n)
+    q_t['upos'] = np.minimum(q_t['pos'].to_numpy(), n_units[q_t['parcel'].to_numpy()] - 1)
+    q_t = q_t.merge(u_t.rename(columns={'pos': 'upos', 'token': 'unit'}),
+                    on=['parcel', 'upos'], how='left')
+
+    q = _tokens_to_float(q_t['token'])
+    cmd = units_to_cmd(q, q_t['unit'].to_numpy(dtype=object))
+
+    parcel = q_t['parcel'].to_numpy()
+    pos = q_t['pos'].to_numpy()
+    valid = ~np.isnan(cmd)
+    n_qtys = np.bincount(parcel, minlength=n)
+    n_valid = np.bincount(parcel[valid], minlength=n)
+
+    # Sum in list order, one token position at a time, so the float result
+    # matches the row engine's sum() exactly
+    total = np.zeros(n)
+    order = np.argsort(pos, kind='stable')
+    bounds = np.searchsorted(pos[order], np.arange(pos.max() + 2 if len(pos) else 1))
+    for k in range(len(bounds) - 1):
+        sel = order[bounds[k]:bounds[k + 1]]
+        sel = sel[valid[sel]]
+        total[parcel[sel]] += cmd[sel]
+    total[n_valid == 0] = np.nan
+
+    qty_table = pd.DataFrame({'parcel': parcel, 'pos': pos, 'cmd': cmd})
+    return qty_table, n_qtys, n_valid, total
+
+
+def _vector_purposes(purpose, n):
+    """
+    Explode purposes and classify each parcel.
+    Returns (purpose DataFrame [parcel, pos, token], classified, n_purposes).
+    """
+    p_t = _explode_tokens(purpose)
+    parcel = p_t['parcel'].to_numpy()
+    n_purposes = np.bincount(parcel, minlength=n)
+
+    classified = classify_purposes(purpose)
+    return p_t, classified, n_purposes
+
+
+def expand_parcels_vectorized(df, keep_columns=None):
+    """
+    Expand parcels to well rows with column-wise operations.
+    Produces the same rows, values and order as expand_parcels_rowwise().
+    keep_columns: original columns to carry onto each well row (default all).
+    Returns (out_df, counts).
+    """
+    df = df.reset_index(drop=True)
+    n = len(df)
+
+    lat, lon = df['Well_Latitude'], df['Well_Longitude']
+    tag_col = df['Well_Tag_Number'] if 'Well_Tag_Number' in df.columns \
+        else pd.Series(np.nan, index=df.index)
+
+    coords, n_coords = _vector_coordinates(lat, lon, n)
+    tag_t = _vector_well_tags(tag_col)
+    qty_t, n_qtys, n_valid, total = _vector_quantities(df['Quantity'], df['Quantity_Units'], n)
+    purpose_t, classified, n_purposes = _vector_purposes(df['App_Purpose_Name'], n)
+
+    missing_flag = np.full(n, '', dtype=object)
+    missing_flag[n_qtys == 0] = 'no_quantity'
+    missing_flag[(n_qtys > 0) & (n_valid == 0)] = 'unconvertible_units'
+
+    # ----------------------------------------------------------
+    # Parcels with coordinates: one row per coordinate pair
+    # ----------------------------------------------------------
+    p = coords['parcel'].to_numpy()
+    i = coords['pos'].to_numpy()
+
+    nw = n_coords[p]
+    nq = n_qtys[p]
+    npur = n_purposes[p]
+    multi = npur > 1
+    tot = total[p]
+    split = tot / nw
+    missing = missing_flag[p] != ''
+
+    cmd_i = _lookup(qty_t, p, i, 'cmd', np.nan)
+    purpose_i = _lookup(purpose_t, p, i, 'token', '')
+
+    conditions = [
+        missing,
+        ~multi & (nw == 1),
+        ~multi & (nq == nw),
+        ~multi,
+        multi & (nw == 1),
+        multi & (npur == nw) & ~np.isnan(cmd_i),
+        multi & (npur == nw),
+    ]
+    well_qty = np.select(conditions,
+                         [np.nan, tot, cmd_i, split, tot, cmd_i, split],
+                         default=split)
+    well_flag = np.select(conditions,
+                          [missing_flag[p], 'direct', 'matched_1to1', 'split_equal',
+                           'multi_purpose_summed', 'multi_purpose_matched',
+                           'multi_purpose_split'],
+                          default='multi_purpose_nonmatch_split').astype(object)
+    well_purpose = np.where(~missing & multi & (npur == nw), purpose_i, classified[p])
+
+    wells = pd.DataFrame({
+        'parcel': p,
+        'pt_latitude': coords['lat'].to_numpy(),
+        'pt_longitude': coords['lon'].to_numpy(),
+        'pt_well_tag': _lookup(tag_t, p, i, 'token', ''),
+        'classified_purpose': well_purpose,
+        'quantity_cmd': well_qty,
+        'quantity_flag': well_flag,
+        'coord_status': 'valid',
+    })
+
+    # ----------------------------------------------------------
+    # Parcels without coordinates: one row with NaN geometry
+    # ----------------------------------------------------------
+    no_coord = np.flatnonzero(n_coords == 0)
+    latlon_missing = (lat.isna() | lon.isna()).to_numpy()[no_coord]
+    nc_flag = missing_flag[no_coord].copy()
+    nc_flag[nc_flag == ''] = 'direct'
+
+    orphans = pd.DataFrame({
+        'parcel': no_coord,
+        'pt_latitude': np.nan,
+        'pt_longitude': np.nan,
+        'pt_well_tag': _lookup(tag_t, no_coord, np.zeros(len(no_coord), dtype=np.int64),
+                               'token', ''),
+        'classified_purpose': classified[no_coord],
+        'quantity_cmd': total[no_coord],
+        'quantity_flag': nc_flag,
+        'coord_status': np.where(latlon_missing, 'no_coordinates',
+                                 'invalid_coordinates').astype(object),
+    })
+
+    # ----------------------------------------------------------
+    # Interleave in parcel order and attach parcel attributes
+    # ----------------------------------------------------------
+    new = pd.concat([wells, orphans], ignore_index=True)
+    new = new.iloc[np.argsort(new['parcel'].to_numpy(), kind='stable')].reset_index(drop=True)
+
+    attrs = df.drop(columns=[c for c in NEW_COLS if c in df.columns])
+    if keep_columns is not None:
+        attrs = attrs[[c for c in keep_columns if c in attrs.columns]]
+    attrs = attrs.take(new['parcel'].to_numpy()).reset_index(drop=True)
+    out_df = order_output_columns(pd.concat([new.drop(columns='parcel'), attrs], axis=1))
+
+    counts = {
+        'no_coords': int(latlon_missing.sum()),
+        'invalid_coords': int((~latlon_missing).sum()),
+        'no_quantity': int((n_qtys == 0).sum()),
+        'unconvertible_units': int(((n_qtys > 0) & (n_valid == 0)).sum()),
+    }
+    return out_df, counts
+
+
+# ============================================================
+# ROW-BY-ROW EXPANSION (reference engine)
+# ============================================================
+
+def expand_parcels_rowwise(df, keep_columns=None):
+    """
+    Expand parcels to well rows one parcel at a time.
+    keep_columns: original columns to carry onto each well row (default all).
+    Returns (out_df, counts).
+    """
+    if keep_columns is not None:
+        keep_columns = [c for c in keep_columns if c in df.columns]
 
     output_rows = []
     counts = {
@@ -204,7 +503,10 @@ def process_eugw(input_file, output_file):
         well_tags = parse_well_tags(row.get('Well_Tag_Number', np.nan))
         qty_results = parse_and_convert_quantities(row['Quantity'], row['Quantity_Units'])
         classified_purpose, is_multi, purpose_list = classify_purpose(row['App_Purpose_Name'])
-        base_attrs = row.to_dict()
+        if keep_columns is None:
+            base_attrs = row.to_dict()
+        else:
+            base_attrs = {c: row[c] for c in keep_columns}
         cmd_values, total_cmd, has_valid_qty, all_unconvertible = get_quantity_info(qty_results)
 
         # Determine quantity flag for missing/unconvertible
@@ -320,40 +622,734 @@ def process_eugw(input_file, output_file):
                         'multi_purpose_nonmatch_split', 'valid'
                     ))
 
-    # ==========================================================
-    # BUILD OUTPUT
-    # ==========================================================
-    out_df = pd.DataFrame(output_rows)
+    out_df = order_output_columns(pd.DataFrame(output_rows))
+    return out_df, counts
+
+
+ENGINES = {
+    'vectorized': expand_parcels_vectorized,
+    'rowwise': expand_parcels_rowwise,
+}
+
+
+# ============================================================
+# SHARDED (MULTI-PROCESS) EXPANSION
+# ============================================================
+
+def _expand_shard(engine, keep_columns, shard):
+    """Worker entry point: expand one shard with the named engine."""
+    return ENGINES[engine](shard, keep_columns=keep_columns)
+
+
+def expand_parcels_sharded(df, executor, shards, engine='vectorized', keep_columns=None):
+    """
+    Split the parcel table into contiguous shards, expand them in a process
+    pool and merge the results back in the original row order.
+    Parcels are independent, so the output equals a single-process run.
+    Returns (out_df, counts).
+    """
+    n_shards = max(1, min(shards, len(df)))
+    bounds = np.linspace(0, len(df), n_shards + 1).astype(int)
+    parts = [df.iloc[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+
+    # executor.map yields results in submission order
+    results = list(executor.map(_expand_shard, [engine] * len(parts),
+                                [keep_columns] * len(parts), parts))
+
+    out_df = pd.concat([r[0] for r in results], ignore_index=True)
+    counts = {key: sum(r[1][key] for r in results) for key in results[0][1]}
+    return out_df, counts
 
-    new_cols = ['pt_latitude', 'pt_longitude', 'pt_well_tag',
-                'classified_purpose', 'quantity_cmd', 'quantity_flag', 'coord_status']
-    original_cols = [c for c in out_df.columns if c not in new_cols]
-    out_df = out_df[new_cols + original_cols]
 
-    out_df.to_csv(output_file, index=False)
+# ============================================================
+# INCREMENTAL RE-RUN (per-parcel fingerprints)
+# ============================================================
+
+HASH_COL = '_parcel_hash'
+SEQ_COL = '_parcel_seq'
+ROW_COL = '_parcel_row'
+
+
+def fingerprint_parcels(df):
+    """64-bit content hash of every parcel row over all of its columns except parcel_id."""
+    content = df.drop(columns=[PARCEL_ID], errors='ignore')
+    return pd.util.hash_pandas_object(content, index=False).to_numpy(dtype=np.uint64)
+
+
+def incremental_store_path(output_file):
+    """Fingerprint store kept next to the output file."""
+    return f"{output_file}.fingerprints.pkl"
+
+
+def _counts_from_rows(out_df):
+    """Rebuild the per-parcel counters from the first output row of each parcel."""
+    first = out_df[ROW_COL].to_numpy() == 0
+    status = out_df['coord_status'].to_numpy()
+    flag = out_df['quantity_flag'].to_numpy()
+    return {
+        'no_coords': int((first & (status == 'no_coordinates')).sum()),
+        'invalid_coords': int((first & (status == 'invalid_coordinates')).sum()),
+        'no_quantity': int((first & (flag == 'no_quantity')).sum()),
+        'unconvertible_units': int((first & (flag == 'unconvertible_units')).sum()),
+    }
+
+
+class IncrementalExpander:
+    """
+    Wrap an expand function so that parcels whose content hash matches a
+    parcel from the previous run reuse the stored well fields; only new or
+    modified parcels are expanded. Works per chunk, so it combines with the
+    streaming and multi-process modes. Call finish() after the last chunk
+    to save the new store and get the added/changed/removed report.
+
+    The store keeps the parcel hashes and, once per distinct hash, only the
+    derived well fields (NEW_COLS); parcel attributes are always taken from
+    the current chunk, so the store stays small next to the output.
+
+    expand:       engine function taking (df, keep_columns=...).
+    parcel_key:   optional ID column. Without it a modified parcel is reported
+                  as one added plus one removed, since content is the only identity.
+    keep_columns: original columns to carry onto each well row (default all).
+    """
+
+    def __init__(self, expand, store_path, parcel_key=None, keep_columns=None):
+        self.expand = expand
+        self.store_path = store_path
+        self.parcel_key = parcel_key
+        self.keep_columns = keep_columns
+        self.previous = None
+        self.offset = 0
+        self.columns = None
+        self.wells = []
+        self.stored = set()
+        self.parcels = []
+        self.reused = 0
+        self.expanded = 0
+
+        if os.path.exists(store_path):
+            self.previous = pd.read_pickle(store_path)
+            parcels = self.previous['parcels']
+            self.templates = self.previous['wells'][[HASH_COL, ROW_COL] + NEW_COLS] \
+                .drop_duplicates([HASH_COL, ROW_COL])
+            print(f"Incremental: loaded {len(parcels)} parcel fingerprints from {store_path}")
+        else:
+            print(f"Incremental: no fingerprint store at {store_path}, expanding everything")
+
+    def __call__(self, chunk):
+        chunk = chunk.reset_index(drop=True)
+        if self.columns is None:
+            self.columns = list(chunk.columns)
+
+        hashes = fingerprint_parcels(chunk)
+        first_seq = self.offset
+        seq = np.arange(first_seq, first_seq + len(chunk))
+        self.offset += len(chunk)
+
+        reuse = np.zeros(len(chunk), dtype=bool)
+        if self.previous is not None and self.previous['columns'] == list(chunk.columns):
+            reuse = np.isin(hashes, self.templates[HASH_COL].to_numpy())
+
+        pieces = []
+        if (~reuse).any() or len(chunk) == 0:
+            fresh, _ = self.expand(chunk[~reuse].assign(**{SEQ_COL: seq[~reuse]}),
+                                   keep_columns=[SEQ_COL])
+            fresh_seq = fresh[SEQ_COL].to_numpy()
+            fresh = fresh.assign(**{HASH_COL: hashes[fresh_seq - first_seq],
+                                    ROW_COL: fresh.groupby(SEQ_COL, sort=False).cumcount()})
+            pieces.append(fresh)
+        if reuse.any():
+            keys = pd.DataFrame({HASH_COL: hashes[reuse], SEQ_COL: seq[reuse]})
+            pieces.append(keys.merge(self.templates, on=HASH_COL, how='left'))
+
+        derived = pd.concat(pieces, ignore_index=True)
+        order = np.lexsort((derived[ROW_COL].to_numpy(), derived[SEQ_COL].to_numpy()))
+        derived = derived.iloc[order].reset_index(drop=True)
+
+        # Attributes (including this run's parcel_id) always come from the chunk
+        columns = self.keep_columns if self.keep_columns is not None else list(chunk.columns)
+        attrs = chunk[[c for c in columns if c in chunk.columns]]
+        attrs = attrs.iloc[derived[SEQ_COL].to_numpy() - first_seq].reset_index(drop=True)
+        out_df = pd.concat([derived[NEW_COLS], attrs], axis=1)
+
+        self.reused += int(reuse.sum())
+        self.expanded += int((~reuse).sum())
+        new = ~derived[HASH_COL].isin(self.stored).to_numpy()
+        self._store(derived[new])
+        parcels = pd.DataFrame({HASH_COL: hashes, SEQ_COL: seq})
+        if self.parcel_key:
+            parcels[self.parcel_key] = chunk[self.parcel_key].to_numpy()
+        self.parcels.append(parcels)
+
+        return out_df, _counts_from_rows(derived)
+
+    def _store(self, derived):
+        """Keep the well fields of the first parcel of each hash not stored yet."""
+        first = derived.drop_duplicates(HASH_COL)[[HASH_COL, SEQ_COL]]
+        wells = derived.merge(first, on=[HASH_COL, SEQ_COL])
+        self.wells.append(wells[[HASH_COL, ROW_COL] + NEW_COLS])
+        self.stored.update(first[HASH_COL].tolist())
+
+    def _changes(self, parcels):
+        """Compare this run's parcels with the previous run's."""
+        report = {'reused': self.reused, 'expanded': self.expanded,
+                  'added': len(parcels), 'changed': 0 if self.parcel_key else None,
+                  'removed': 0}
+        if self.previous is None:
+            return report
+
+        old = self.previous['parcels']
+        key = self.parcel_key
+        if key and key in old.columns:
+            old_hash = old.drop_duplicates(key).set_index(key)[HASH_COL]
+            new_hash = parcels.drop_duplicates(key).set_index(key)[HASH_COL]
+            common = new_hash.index.intersection(old_hash.index)
+            report['added'] = int((~new_hash.index.isin(old_hash.index)).sum())
+            report['removed'] = int((~old_hash.index.isin(new_hash.index)).sum())
+            report['changed'] = int((new_hash[common] != old_hash[common]).sum())
+        else:
+            report['added'] = int((~parcels[HASH_COL].isin(old[HASH_COL])).sum())
+            report['removed'] = int((~old[HASH_COL].isin(parcels[HASH_COL])).sum())
+        return report
 
-    # ==========================================================
-    # SUMMARY
-    # ==========================================================
+    def finish(self):
+        """Save the fingerprint store for the next run and return the change report."""
+        parcels = pd.concat(self.parcels, ignore_index=True) if self.parcels else \
+            pd.DataFrame({HASH_COL: np.array([], dtype=np.uint64),
+                          SEQ_COL: np.array([], dtype=np.int64)})
+        report = self._changes(parcels)
+
+        store = {
+            'columns': self.columns,
+            'parcels': parcels,
+            'wells': pd.concat(self.wells, ignore_index=True) if self.wells else
+                     pd.DataFrame(columns=[HASH_COL, ROW_COL] + NEW_COLS),
+        }
+        tmp_path = f"{self.store_path}.tmp"
+        pd.to_pickle(store, tmp_path)
+        os.replace(tmp_path, self.store_path)
+        return report
+
+
+# ============================================================
+# CHUNKED INPUT (streaming mode)
+# ============================================================
+
+def _excel_cell(value):
+    """Normalize an openpyxl cell value the same way pd.read_excel does."""
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def text_chunk(df):
+    """
+    Turn a typed chunk (a slice of the ingest sidecar) into text the way
+    iter_parcel_chunks reads the workbook: missing values stay NaN and
+    whole-number floats lose their .0, so a nullable integer column reads
+    '1' whether or not an earlier run left a sidecar.
+    """
+    df = df.copy()
+    for i in range(df.shape[1]):
+        column = df.iloc[:, i]
+        text = np.array([str(_excel_cell(v)) for v in column.to_numpy(dtype=object)], dtype=object)
+        text[column.isna().to_numpy()] = np.nan
+        df.isetitem(i, text)
+    return df
+
+
+def iter_parcel_chunks(input_file, chunk_size):
+    """
+    Yield the parcel table as DataFrames of at most chunk_size rows.
+
+    Excel is streamed with openpyxl in read-only mode, so only one chunk of
+    rows is held at a time. CSV input is read with pd.read_csv(chunksize=...).
+
+    Every column is read as text (blank cells as NaN, whole-number cells
+    without a trailing .0). Inferring types per chunk would make the output
+    depend on chunk_size: an integer column blank somewhere in one chunk
+    would turn float there only (5.0 in that chunk, 5 in the others), and a
+    typed Parquet schema would break on a later chunk's text. The single-pass
+    read infers types over the whole table, so the two modes can still
+    differ in how such columns are written.
+    """
+    if str(input_file).lower().endswith('.csv'):
+        yield from pd.read_csv(input_file, chunksize=chunk_size, dtype=str)
+        return
+
+    from openpyxl import load_workbook
+    from pandas.io.parsers import TextParser
+
+    wb = load_workbook(input_file, read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        header = [_excel_cell(v) for v in next(rows, ())]
+        width = len(header)
+
+        batch = []
+        blanks = []
+        for values in rows:
+            row = [_excel_cell(v) for v in values][:width]
+            row += [''] * (width - len(row))
+            # Blank rows only count when followed by data (read_excel drops trailing ones)
+            if all(v == '' for v in row):
+                blanks.append(row)
+                continue
+            batch.extend(blanks)
+            blanks = []
+            batch.append(row)
+            if len(batch) >= chunk_size:
+                yield TextParser([header] + batch, header=0, dtype=str).read()
+                batch = []
+        if batch:
+            yield TextParser([header] + batch, header=0, dtype=str).read()
+    finally:
+        wb.close()
+
+
+# ============================================================
+# SUMMARY
+# ============================================================
+
+def new_summary():
+    """Empty running summary, filled chunk by chunk with update_summary()."""
+    return {
+        'parcels': 0,
+        'rows': 0,
+        'counts': Counter(),
+        'qa': QAReport(),
+    }
+
+
+def update_summary(summary, parcels_df, out_df, counts):
+    """Add one chunk's parcels, output rows and counters to the running summary."""
+    summary['parcels'] += len(parcels_df)
+    summary['rows'] += len(out_df)
+    summary['counts'].update(counts)
+    summary['qa'].update(parcels_df, out_df)
+
+
+def _counter_table(counter, name):
+    """Format a {value: count} dict like Series.value_counts().to_string()."""
+    series = pd.Series(dict(counter), name='count', dtype='int64').rename_axis(name)
+    return series.sort_values(ascending=False, kind='stable').to_string()
+
+
+def print_summary(summary, output_file, qa=None, cache_report=False):
+    """
+    Print the run summary; qa is the QA metrics dict (computed if not given).
+    cache_report adds the parse cache hits/misses (only the row-wise engine
+    calls the memoized parsers).
+    """
+    counts = summary['counts']
+    qa = qa or summary['qa'].metrics()
     print(f"\n{'='*60}")
     print(f"PROCESSING SUMMARY")
     print(f"{'='*60}")
-    print(f"Input parcels:            {len(df)}")
-    print(f"Output rows:              {len(out_df)}")
+    print(f"Input parcels:            {summary['parcels']}")
+    print(f"Output rows:              {summary['rows']}")
     print(f"\n--- Coordinate Status ---")
-    print(out_df['coord_status'].value_counts().to_string())
+    print(_counter_table(qa['counts']['coord_status'], 'coord_status'))
     print(f"\n  no_coordinates:    {counts['no_coords']} (NaN lat/lon, Well_Latitude was empty)")
     print(f"  invalid_coords:    {counts['invalid_coords']} (lat/lon present but failed validation)")
+    if 'recovered_gwells' in counts:
+        print(f"  recovered_gwells:  {counts['recovered_gwells']} (located via GWELLS Well Tag Number)")
+    if 'outside_aoi' in counts:
+        print(f"  outside_aoi:       {counts['outside_aoi']} (inside the BC bounding box, outside the AOI polygon)")
     print(f"\n--- Purpose Classification ---")
-    print(out_df['classified_purpose'].value_counts().to_string())
+    print(_counter_table(qa['counts']['classified_purpose'], 'classified_purpose'))
     print(f"\n--- Quantity Flag ---")
-    print(out_df['quantity_flag'].value_counts().to_string())
-    print(f"\n--- Quantity Stats (CMD) ---")
-    valid_qty = out_df['quantity_cmd'].dropna()
+    print(_counter_table(qa['counts']['quantity_flag'], 'quantity_flag'))
+    summary['qa'].print_table(qa)
+    if cache_report:
+        print_cache_report()
+
+    changes = summary.get('incremental')
+    if changes:
+        changed = changes['changed'] if changes['changed'] is not None else 'n/a (no parcel key)'
+        print(f"\n--- Incremental Re-run ---")
+        print(f"  Parcels reused:    {changes['reused']}")
+        print(f"  Parcels expanded:  {changes['expanded']}")
+        print(f"  Added:             {changes['added']}")
+        print(f"  Changed:           {changed}")
+        print(f"  Removed:           {changes['removed']}")
 
     print(f"\nOutput saved to: {output_file}")
 
 
+# ============================================================
+# OUTPUT WRITERS (CSV / Parquet / GeoParquet)
+# ============================================================
+
+PARQUET_EXTENSIONS = ('.parquet', '.geoparquet')
+CATEGORICAL_COLS = ['classified_purpose', 'quantity_flag', 'coord_status']
+
+# GeoParquet 1.0 metadata. No "crs" member means OGC:CRS84 (WGS84 lon/lat).
+GEO_METADATA = {
+    'version': '1.0.0',
+    'primary_column': 'geometry',
+    'columns': {
+        'geometry': {'encoding': 'WKB', 'geometry_types': ['Point']},
+    },
+}
+
+
+def _point_wkb(lon, lat):
+    """
+    Build little-endian WKB points from lon/lat arrays without a geometry library.
+    Rows with a NaN coordinate get a null geometry.
+    """
+    lon = np.asarray(lon, dtype=float)
+    lat = np.asarray(lat, dtype=float)
+    n = len(lon)
+
+    wkb = np.empty(n, dtype=[('order', 'u1'), ('type', '<u4'), ('x', '<f8'), ('y', '<f8')])
+    wkb['order'] = 1
+    wkb['type'] = 1
+    wkb['x'] = lon
+    wkb['y'] = lat
+
+    offsets = np.arange(n + 1, dtype=np.int32) * wkb.dtype.itemsize
+    points = pa.Array.from_buffers(pa.binary(), n, [None, pa.py_buffer(offsets),
+                                                    pa.py_buffer(wkb.tobytes())])
+    has_point = pa.array(~(np.isnan(lon) | np.isnan(lat)))
+    return pa.compute.if_else(has_point, points, pa.scalar(None, pa.binary()))
+
+
+def _attribute_table(attrs, schema=None, as_text=False):
+    """
+    Convert the original parcel columns to Arrow. Mixed-type object columns
+    (e.g. Well_Tag_Number holding numbers and strings) are written as text.
+    When a schema from an earlier chunk is given the chunk is cast to it.
+
+    as_text writes every column except PARCEL_ID as string. Chunked runs use
+    it so the schema fixed by the first chunk cannot clash with a later one
+    (Notes blank in the first chunk, WTNs numeric until "81955;54733").
+    """
+    attrs = attrs.copy()
+    for col in attrs.columns:
+        if attrs[col].dtype == object or (as_text and col != PARCEL_ID):
+            attrs[col] = attrs[col].astype(str).where(attrs[col].notna(), None)
+    table = pa.Table.from_pandas(attrs, preserve_index=False)
+
+    fields = []
+    for field in table.schema:
+        if pa.types.is_null(field.type):
+            field = field.with_type(pa.string())
+        fields.append(field)
+    target = pa.schema(fields) if schema is None else schema
+    return table.cast(target)
+
+
+def well_table(out_df, schema=None, as_text=False):
+    """
+    Convert expanded well rows to an Arrow table with an explicit schema:
+    float64 coordinates and quantity, dictionary-encoded (categorical)
+    classified_purpose/quantity_flag/coord_status, the original parcel
+    fields (as text when as_text is set), and a WKB point geometry column.
+    """
+    columns = {
+        'pt_latitude': pa.array(out_df['pt_latitude'].to_numpy(dtype=float),
+                                pa.float64(), from_pandas=True),
+        'pt_longitude': pa.array(out_df['pt_longitude'].to_numpy(dtype=float),
+                                 pa.float64(), from_pandas=True),
+        'pt_well_tag': pa.array(out_df['pt_well_tag'].to_numpy(dtype=object), pa.string()),
+        'quantity_cmd': pa.array(out_df['quantity_cmd'].to_numpy(dtype=float),
+                                 pa.float64(), from_pandas=True),
+    }
+    for col in CATEGORICAL_COLS:
+        columns[col] = pa.array(out_df[col].to_numpy(dtype=object),
+                                pa.string()).dictionary_encode()
+
+    derived = [c for c in NEW_COLS]
+    attr_schema = None
+    if schema is not None:
+        attr_schema = pa.schema([f for f in schema if f.name not in derived + ['geometry']])
+    attrs = _attribute_table(out_df.drop(columns=derived), attr_schema, as_text)
+
+    names = derived + attrs.column_names + ['geometry']
+    arrays = [columns[c] for c in derived] + attrs.columns + \
+             [_point_wkb(out_df['pt_longitude'], out_df['pt_latitude'])]
+    table = pa.Table.from_arrays(arrays, names=names)
+    return table.replace_schema_metadata({b'geo': json.dumps(GEO_METADATA).encode('utf-8')})
+
+
+class CsvTableWriter:
+    """Write a table to CSV, appending chunk after chunk."""
+
+    def __init__(self, path):
+        self.path = path
+        self.started = False
+
+    def write(self, df):
+        df.to_csv(self.path, index=False,
+                  mode='a' if self.started else 'w', header=not self.started)
+        self.started = True
+
+    def close(self):
+        pass
+
+
+class ParquetTableWriter:
+    """
+    Write a table to Parquet, one row group per chunk, schema fixed by the
+    first chunk. Set as_text when chunks are read separately so the original
+    columns are all string and every chunk fits that schema.
+    """
+
+    def __init__(self, path, as_text=False):
+        if pa is None:
+            raise ImportError("Parquet output requires pyarrow")
+        self.path = path
+        self.as_text = as_text
+        self.writer = None
+
+    def _table(self, df, schema):
+        return _attribute_table(df, schema, self.as_text)
+
+    def write(self, df):
+        schema = self.writer.schema if self.writer is not None else None
+        table = self._table(df, schema)
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+class ParquetWellWriter(ParquetTableWriter):
+    """Write well rows to GeoParquet (typed columns + WKB point geometry)."""
+
+    def _table(self, df, schema):
+        return well_table(df, schema, self.as_text)
+
+
+def open_well_writer(output_file, as_text=False):
+    """Pick the writer from the output extension (.parquet/.geoparquet, else CSV)."""
+    if str(output_file).lower().endswith(PARQUET_EXTENSIONS):
+        return ParquetWellWriter(output_file, as_text)
+    return CsvTableWriter(output_file)
+
+
+def open_table_writer(output_file, as_text=False):
+    """Like open_well_writer, for tables without well geometry (e.g. the parcels table)."""
+    if str(output_file).lower().endswith(PARQUET_EXTENSIONS):
+        return ParquetTableWriter(output_file, as_text)
+    return CsvTableWriter(output_file)
+
+
+# ============================================================
+# NORMALIZED OUTPUT (parcels table + slim wells table)
+# ============================================================
+
+def parcels_path_for(output_file):
+    """Parcels table written next to the wells output: <stem>_parcels<ext>."""
+    stem, ext = os.path.splitext(str(output_file))
+    return f"{stem}_parcels{ext}"
+
+
+def join_wells_to_parcels(wells, parcels, keep_key=False):
+    """
+    Rebuild the wide one-row-per-well view from the normalized tables with a
+    single hash lookup of parcel_id. Columns come out in the wide layout
+    (derived well fields, then parcel fields), plus parcel_id if keep_key.
+    """
+    pos = pd.Index(parcels[PARCEL_ID]).get_indexer(wells[PARCEL_ID])
+    if (pos < 0).any():
+        raise KeyError(f"{int((pos < 0).sum())} wells reference a parcel_id not in the parcels table")
+
+    attrs = parcels.drop(columns=PARCEL_ID).take(pos).reset_index(drop=True)
+    derived = [c for c in NEW_COLS if c in wells.columns]
+    if keep_key:
+        derived = derived + [PARCEL_ID]
+    return pd.concat([wells[derived].reset_index(drop=True), attrs], axis=1)
+
+
+def read_well_points(wells_file, parcels_file=None, columns=None):
+    """
+    Load normalized output and return the wide view.
+    columns: parcel columns to attach (default all); with Parquet only those
+             columns are read from disk.
+    """
+    parcels_file = parcels_file or parcels_path_for(wells_file)
+    parcel_cols = None if columns is None else [PARCEL_ID] + [c for c in columns if c != PARCEL_ID]
+
+    if str(wells_file).lower().endswith(PARQUET_EXTENSIONS):
+        wells = pd.read_parquet(wells_file, columns=NEW_COLS + [PARCEL_ID])
+        parcels = pd.read_parquet(parcels_file, columns=parcel_cols)
+    else:
+        wells = pd.read_csv(wells_file, usecols=NEW_COLS + [PARCEL_ID])
+        parcels = pd.read_csv(parcels_file, usecols=parcel_cols)
+    return join_wells_to_parcels(wells, parcels)
+
+
+# ============================================================
+# MAIN PROCESSING
+# ============================================================
+
+def process_eugw(input_file, output_file, engine='vectorized', chunk_size=None,
+                 workers=None, incremental=False, parcel_key=None, ingest_cache=True,
+                 gwells_file=None, run_report=True, layout='wide', qa_report=True,
+                 aoi=None):
+    """
+    Expand the EUGW parcel export to well points and write them to
+    output_file: CSV, or GeoParquet when it ends in .parquet/.geoparquet.
+
+    chunk_size: if set, stream the input in chunks of this many parcels and
+                append each chunk's well rows to the output as it is expanded,
+                so memory stays flat regardless of input size.
+    workers:    if > 1, split each chunk (or the whole table) into this many
+                shards and expand them in a process pool.
+    incremental: reuse the well rows of parcels unchanged since the last run
+                 (fingerprints stored in <output_file>.fingerprints.pkl) and
+                 expand only new or modified parcels.
+    parcel_key:  ID column used to tell changed parcels from added/removed ones.
+    ingest_cache: load the workbook from a local binary sidecar when it is
+                  unchanged since the last read (see eugw_ingest.py).
+    gwells_file: local GWELLS extract; rows without usable coordinates are
+                 located by Well Tag Number (see eugw_gwells.py).
+    aoi:         provincial boundary / AOI (shp, gdb featureclass or shapely
+                 geometry); located rows outside it get coord_status
+                 'outside_aoi' (see eugw_aoi.py).
+    run_report:  write per-stage wall time, rows/s and peak RSS to
+                 <output stem>_run_report.json (see eugw_instrument.py).
+    layout:      'wide' repeats every parcel attribute on each well row;
+                 'normalized' writes parcel attributes once to
+                 <output stem>_parcels<ext> and only the derived well fields
+                 plus parcel_id to output_file (rejoin with read_well_points).
+    qa_report:   write coverage, category counts and quantity_cmd quantiles
+                 to <output stem>_qa.json (see eugw_qa.py).
+    """
+    if layout not in ('wide', 'normalized'):
+        raise ValueError(f"Unknown layout '{layout}' (use 'wide' or 'normalized')")
+    normalized = layout == 'normalized'
+
+    profiler = RunProfiler()
+
+    print(f"Reading: {input_file}")
+    if chunk_size:
+        print(f"Streaming in chunks of {chunk_size} parcels")
+        chunks = iter_cached_chunks(input_file, chunk_size) if ingest_cache else None
+        if chunks is not None:
+            chunks = map(text_chunk, chunks)
+        if chunks is None:
+            chunks = iter_parcel_chunks(input_file, chunk_size)
+        chunks = profiler.timed_iter(chunks, 'read')
+    else:
+        with profiler.stage('read') as stage:
+            df = read_parcels(input_file, use_cache=ingest_cache)
+            stage['rows'] = len(df)
+        print(f"Input rows: {len(df)}")
+        chunks = [df]
+
+    # Normalized runs only carry the key (and the WTNs GWELLS recovery needs)
+    # through expansion
+    keep_columns = None
+    if normalized:
+        keep_columns = [PARCEL_ID, 'Well_Tag_Number'] if gwells_file else [PARCEL_ID]
+
+    executor = None
+    if workers and workers > 1:
+        print(f"Expanding with {workers} worker processes")
+        executor = ProcessPoolExecutor(max_workers=workers)
+        expand = partial(expand_parcels_sharded, executor=executor,
+                         shards=workers, engine=engine)
+    else:
+        expand = ENGINES[engine]
+
+    if incremental:
+        expand = IncrementalExpander(expand, incremental_store_path(output_file),
+                                     parcel_key, keep_columns)
+    else:
+        expand = partial(expand, keep_columns=keep_columns)
+
+    gwells_index = None
+    if gwells_file:
+        with profiler.stage('gwells_index'):
+            gwells_index = load_gwells_index(gwells_file)
+
+    aoi_geom = None
+    if aoi is not None:
+        with profiler.stage('aoi_load'):
+            aoi_geom = load_aoi(aoi)
+
+    summary = new_summary()
+    # Chunks are typed one at a time, so a chunked Parquet run writes the
+    # original columns as text rather than trusting the first chunk's types
+    as_text = bool(chunk_size)
+    writer = open_well_writer(output_file, as_text)
+    parcels_writer = (open_table_writer(parcels_path_for(output_file), as_text)
+                      if normalized else None)
+
+    try:
+        for i, chunk in enumerate(chunks):
+            if normalized:
+                start = summary['parcels'] + 1
+                chunk.insert(0, PARCEL_ID, np.arange(start, start + len(chunk), dtype=np.int64))
+            with profiler.stage('expand', rows=len(chunk)):
+                out_df, counts = expand(chunk)
+            if gwells_index is not None:
+                with profiler.stage('gwells_recovery', rows=len(out_df)):
+                    out_df, recovered = recover_coordinates(out_df, gwells_index)
+                counts = dict(counts, recovered_gwells=recovered)
+            if aoi_geom is not None:
+                with profiler.stage('aoi_validation', rows=len(out_df)):
+                    out_df, outside = validate_coordinates(out_df, aoi_geom)
+                counts = dict(counts, outside_aoi=outside)
+            with profiler.stage('write', rows=len(out_df)):
+                if normalized:
+                    parcels_writer.write(chunk)
+                    writer.write(out_df[NEW_COLS + [PARCEL_ID]])
+                else:
+                    writer.write(out_df)
+            with profiler.stage('summary', rows=len(out_df)):
+                update_summary(summary, chunk, out_df, counts)
+            if chunk_size:
+                print(f"  Chunk {i + 1}: {summary['parcels']} parcels -> {summary['rows']} rows")
+    finally:
+        with profiler.stage('write'):
+            writer.close()
+            if parcels_writer is not None:
+                parcels_writer.close()
+        if executor is not None:
+            executor.shutdown()
+
+    if incremental:
+        with profiler.stage('incremental_store'):
+            summary['incremental'] = expand.finish()
+
+    with profiler.stage('qa', rows=summary['rows']):
+        qa = summary['qa'].metrics()
+    print_summary(summary, output_file, qa, cache_report=engine == 'rowwise')
+    if normalized:
+        print(f"Parcels table saved to: {parcels_path_for(output_file)}")
+    profiler.print_table()
+
+    run = {
+        'input_file': str(input_file),
+        'output_file': str(output_file),
+        'engine': engine,
+        'chunk_size': chunk_size,
+        'workers': workers,
+        'incremental': incremental,
+        'gwells_file': gwells_file,
+        'aoi': aoi if aoi is None or isinstance(aoi, str) else 'geometry',
+        'layout': layout,
+        'parcels': summary['parcels'],
+        'output_rows': summary['rows'],
+        'counts': dict(summary['counts']),
+    }
+    if qa_report:
+        qa_file = summary['qa'].write_json(qa_path_for(output_file), run=run, metrics=qa)
+        print(f"QA report: {qa_file}")
+    if run_report:
+        report_file = profiler.write_report(report_path_for(output_file), run=run)
+        print(f"Run report: {report_file}")
+
+
 if __name__ == '__main__':
     input_file = r'\\spatialfiles.bcgov\work\srm\gss\projects\gr_2026_227_eugw_consultation_support\work\existing_use_groundwater_polys_exported_from_gdb.xlsx'
     output_file = r'\\spatialfiles.bcgov\work\srm\gss\projects\gr_2026_227_eugw_consultation_support\work\existing_use_groundwater_extracted_well_points.csv'
@@ -1,35 +1,79 @@
 """
 Convert EUGW well points CSV to feature class.
 Only includes rows where coord_status = 'valid'.
+
+Backends:
+  - 'arcpy': XY event layer -> in_memory copy -> filtered layer -> Project
+             into OUTPUT_GDB
+  - 'open':  eugw_well_points.py; streams the CSV in blocks of BLOCK_ROWS
+             rows, filters during the read, reprojects each block WGS84 to
+             BC Albers with one pyproj call and appends it to OUTPUT_OPEN
+             (GeoPackage, or GeoParquet by extension). Memory stays
+             constant and progress is reported in rows/s. Also reads
+             Parquet and normalized (wells + parcels) outputs.
+  BACKEND = None uses arcpy when it is installed, otherwise the open backend.
 """
 
-import arcpy
 import os
+import sys
+
+try:
+    import arcpy
+except ImportError:  # Linux processing nodes: use the open backend
+    arcpy = None
+
+from eugw_well_points import convert_well_points
 
 # --- CONFIGURATION ---
 INPUT_CSV = r"\\spatialfiles.bcgov\srm\gss\projects\gr_2026_227_eugw_consultation_support\work\existing_use_groundwater_extracted_well_points.csv"
 OUTPUT_GDB = r"\\spatialfiles.bcgov\work\srm\gss\projects\gr_2026_227_eugw_consultation_support\work\data.gdb"
 OUTPUT_FC = "EUGW_Well_Points"
 
-SR_WGS84 = arcpy.SpatialReference(4326)
-SR_BCALBERS = arcpy.SpatialReference(3005)
+# Open backend output (.gpkg, or .parquet for GeoParquet)
+OUTPUT_OPEN = r"\\spatialfiles.bcgov\work\srm\gss\projects\gr_2026_227_eugw_consultation_support\work\EUGW_Well_Points.gpkg"
+
+# 'arcpy', 'open', or None to pick arcpy when available
+BACKEND = None
+
+# Open backend: rows read, reprojected and written per block
+BLOCK_ROWS = 100000
+
+
+def main_arcpy():
+    SR_WGS84 = arcpy.SpatialReference(4326)
+    SR_BCALBERS = arcpy.SpatialReference(3005)
+
+    arcpy.env.overwriteOutput = True
+
+    # Make XY Event Layer from CSV (WGS84)
+    arcpy.management.MakeXYEventLayer(INPUT_CSV, "pt_longitude", "pt_latitude", "temp_layer", SR_WGS84)
+
+    # Copy to in-memory FC to get OIDs
+    arcpy.management.CopyFeatures("temp_layer", "in_memory/temp_fc")
+
+    # Make feature layer with where clause to filter valid coords only
+    arcpy.management.MakeFeatureLayer("in_memory/temp_fc", "valid_layer", "coord_status = 'valid'")
 
-arcpy.env.overwriteOutput = True
+    # Project to BC Albers and export
+    arcpy.management.Project("valid_layer", os.path.join(OUTPUT_GDB, OUTPUT_FC), SR_BCALBERS)
 
-# Make XY Event Layer from CSV (WGS84)
-arcpy.management.MakeXYEventLayer(INPUT_CSV, "pt_longitude", "pt_latitude", "temp_layer", SR_WGS84)
+    # Cleanup
+    arcpy.management.Delete("in_memory/temp_fc")
 
-# Copy to in-memory FC to get OIDs
-arcpy.management.CopyFeatures("temp_layer", "in_memory/temp_fc")
+    count = arcpy.GetCount_management(os.path.join(OUTPUT_GDB, OUTPUT_FC))[0]
+    print(f"Done. {count} features exported to {OUTPUT_FC} (BC Albers EPSG:3005)")
 
-# Make feature layer with where clause to filter valid coords only
-arcpy.management.MakeFeatureLayer("in_memory/temp_fc", "valid_layer", "coord_status = 'valid'")
 
-# Project to BC Albers and export
-arcpy.management.Project("valid_layer", os.path.join(OUTPUT_GDB, OUTPUT_FC), SR_BCALBERS)
+def main():
+    backend = BACKEND or ('arcpy' if arcpy is not None else 'open')
+    if backend == 'open':
+        convert_well_points(INPUT_CSV, OUTPUT_OPEN, layer=OUTPUT_FC, block_rows=BLOCK_ROWS)
+        return
+    if arcpy is None:
+        print("ERROR: BACKEND is 'arcpy' but arcpy is not installed")
+        sys.exit(1)
+    main_arcpy()
 
-# Cleanup
-arcpy.management.Delete("in_memory/temp_fc")
 
-count = arcpy.GetCount_management(os.path.join(OUTPUT_GDB, OUTPUT_FC))[0]
-print(f"Done. {count} features exported to {OUTPUT_FC} (BC Albers EPSG:3005)")
\ No newline at end of file
+if __name__ == '__main__':
+    main()
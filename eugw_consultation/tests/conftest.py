@@ -0,0 +1,10 @@
+"""
+Test setup: the EUGW scripts are flat modules that import each other by
+name, so the package folder goes on sys.path, as when a script is run
+from it.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
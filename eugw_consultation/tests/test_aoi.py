@@ -0,0 +1,72 @@
+"""
+AOI validation (eugw_aoi.py): reading AOI paths and the point-in-polygon
+check of located well rows.
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+import shapely
+
+import eugw_aoi
+import process_eugw_parcels_to_wells as eugw
+
+# Lower mainland box in lon/lat
+AOI = shapely.box(-124.0, 49.0, -122.0, 50.0)
+
+
+class FakeGeopandas:
+    """Records read_file calls instead of reading."""
+
+    def __init__(self):
+        self.calls = []
+
+    def read_file(self, filename, layer=None):
+        self.calls.append((filename, layer))
+        return filename
+
+
+def test_esri_to_gdf_accepts_pathlib_paths(monkeypatch):
+    fake = FakeGeopandas()
+    monkeypatch.setattr(eugw_aoi, 'gpd', fake)
+    eugw_aoi.esri_to_gdf(Path('W:/data/boundaries.gdb/BC_Boundary'))
+    eugw_aoi.esri_to_gdf(Path('W:/data/aoi.shp'))
+    assert fake.calls == [('W:/data/boundaries.gdb', 'BC_Boundary'), ('W:/data/aoi.shp', None)]
+
+
+def test_only_located_rows_outside_the_aoi_are_flagged():
+    out_df = pd.DataFrame({
+        'pt_latitude': [49.5, 55.0, 55.0, np.nan, 55.0],
+        'pt_longitude': [-123.0, -125.0, -125.0, np.nan, -125.0],
+        'coord_status': ['valid', 'valid', 'recovered_gwells', 'no_coordinates',
+                         'invalid_coordinates'],
+    })
+    out_df, outside = eugw_aoi.validate_coordinates(out_df, eugw_aoi.load_aoi(AOI))
+    assert outside == 2
+    assert out_df['coord_status'].tolist() == ['valid', eugw_aoi.OUTSIDE_STATUS,
+                                               eugw_aoi.OUTSIDE_STATUS, 'no_coordinates',
+                                               'invalid_coordinates']
+    assert out_df.loc[1, 'pt_latitude'] == 55.0
+
+
+def test_empty_aoi_is_rejected():
+    with pytest.raises(ValueError):
+        eugw_aoi.load_aoi(shapely.Polygon())
+
+
+def test_process_eugw_flags_wells_outside_the_aoi(tmp_path):
+    src = tmp_path / 'parcels.csv'
+    pd.DataFrame({
+        'Well_Latitude': ['49.5, 55.0', 'None'],
+        'Well_Longitude': ['-123.0, -125.0', 'None'],
+        'Quantity': ['10', '20'],
+        'Quantity_Units': ['cmd', 'cmd'],
+        'App_Purpose_Name': ['Domestic', 'Irrigation'],
+        'Well_Tag_Number': ['1;2', '3'],
+    }).to_csv(src, index=False)
+    out = tmp_path / 'wells.csv'
+    eugw.process_eugw(src, out, aoi=AOI, run_report=False, qa_report=False)
+    assert pd.read_csv(out)['coord_status'].tolist() == ['valid', eugw_aoi.OUTSIDE_STATUS,
+                                                         'no_coordinates']
@@ -0,0 +1,47 @@
+"""
+Benchmark regression check (benchmark_eugw_wells.py) against the committed
+baseline.
+"""
+
+import json
+import sys
+
+import pytest
+
+import benchmark_eugw_wells as bench
+
+
+def committed_baseline():
+    with open(bench.BASELINE_FILE) as f:
+        return json.load(f)['results']
+
+
+def test_baseline_covers_default_stages():
+    baseline = committed_baseline()
+    for n in bench.DEFAULT_ROWS:
+        for stage in ['read', 'write_csv'] + [f"expand_{e}" for e in bench.DEFAULT_ENGINES]:
+            assert baseline[f"{stage}@{n}"]['rows_per_s'] > 0
+
+
+def test_regressed_result_fails_the_check():
+    baseline = committed_baseline()
+    assert bench.compare_to_baseline(baseline, baseline, bench.DEFAULT_TOLERANCE) == []
+
+    key = f"expand_vectorized@{bench.DEFAULT_ROWS[0]}"
+    regressed = dict(baseline)
+    regressed[key] = dict(baseline[key], rows_per_s=baseline[key]['rows_per_s'] * 0.5,
+                          peak_mb=baseline[key]['peak_mb'] * 2)
+    failures = bench.compare_to_baseline(regressed, baseline, bench.DEFAULT_TOLERANCE)
+    assert len(failures) == 2
+    assert all(msg.startswith(key) for msg in failures)
+
+
+def test_main_exits_on_regression(tmp_path, monkeypatch):
+    baseline = tmp_path / 'baseline.json'
+    baseline.write_text(json.dumps({'results': {
+        'read@200': {'rows': 200, 'rows_per_s': 1e12, 'peak_mb': 1e6}}}))
+    monkeypatch.setattr(sys, 'argv', ['benchmark_eugw_wells.py', '--rows', '200',
+                                      '--baseline', str(baseline)])
+    with pytest.raises(SystemExit) as exc:
+        bench.main()
+    assert exc.value.code == 1
@@ -0,0 +1,176 @@
+"""
+Centroid backend (eugw_centroids.py): the column-wise fields against the
+per-row reference rules, delta refresh against a full rebuild and the
+process pool against a single process, on a GeoParquet parcel layer.
+"""
+
+import json
+import math
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pyproj
+import pytest
+import shapely
+
+import eugw_centroids as ec
+from eugw_normalize import quantity_to_cmd, classify_purpose_list, UNKNOWN_PURPOSE
+from eugw_synthetic import generate_eugw_parcels
+
+
+# ============================================================
+# PER-ROW REFERENCE RULES (the original cursor-loop functions)
+# ============================================================
+
+def reference_sum_quantities(qty_str, unit_str):
+    """
+    Parse potentially comma-separated quantities and units.
+    Returns (total_cmd, quantity_flag).
+    """
+    if qty_str is None or unit_str is None:
+        return (None, 'no_quantity')
+
+    qty_str = str(qty_str).strip()
+    unit_str = str(unit_str).strip()
+
+    if qty_str in ('', 'None', 'nan'):
+        return (None, 'no_quantity')
+
+    qtys = [q.strip() for q in qty_str.split(',')]
+    units = [u.strip() for u in unit_str.split(',')]
+
+    while len(units) < len(qtys):
+        units.append(units[-1])
+
+    cmd_values = []
+    has_unconvertible = False
+    for q, u in zip(qtys, units):
+        val = quantity_to_cmd(q, u)
+        if val is not None:
+            cmd_values.append(val)
+        else:
+            has_unconvertible = True
+
+    if not cmd_values:
+        return (None, 'unconvertible_units')
+
+    flag = 'direct' if len(qtys) == 1 else 'summed'
+    if has_unconvertible:
+        flag += '_partial_unconvertible'
+    return (sum(cmd_values), flag)
+
+
+def reference_classify_purpose(purpose_str):
+    """Classify purpose for symbology."""
+    if purpose_str is None or str(purpose_str).strip() in ec.MISSING_TOKENS:
+        return UNKNOWN_PURPOSE
+    return classify_purpose_list([p.strip() for p in str(purpose_str).split(',')])
+
+
+def write_parcel_layer(path, df, geoms):
+    """Write parcels + polygons as GeoParquet in BC Albers."""
+    table = pa.Table.from_pandas(df.astype(str).where(df.notna(), None), preserve_index=False)
+    table = table.append_column('geometry', pa.array(list(shapely.to_wkb(geoms)), pa.binary()))
+    geo = {'version': '1.0.0', 'primary_column': 'geometry',
+           'columns': {'geometry': {'encoding': 'WKB', 'geometry_types': ['Polygon'],
+                                    'crs': pyproj.CRS('EPSG:3005').to_json_dict()}}}
+    pq.write_table(table.replace_schema_metadata({b'geo': json.dumps(geo).encode()}), path)
+
+
+def synthetic_layer(n, seed):
+    rng = np.random.default_rng(seed)
+    df = generate_eugw_parcels(n, seed=seed)
+    x, y = rng.uniform(1.0e6, 1.8e6, n), rng.uniform(4.0e5, 1.6e6, n)
+    geoms = shapely.buffer(shapely.points(x, y), rng.uniform(10, 500, n)).astype(object)
+    geoms[3] = None
+    geoms[7] = shapely.Polygon()
+    # U shape: centroid outside the polygon
+    geoms[11] = shapely.Polygon([(0, 0), (10, 0), (10, 10), (8, 10), (8, 2), (2, 2), (2, 10), (0, 10)])
+    return df, geoms
+
+
+def read_sorted(path):
+    return pq.read_table(path).to_pandas().sort_values(ec.HASH_FIELD).reset_index(drop=True)
+
+
+def test_derived_fields_match_reference_rules():
+    df = generate_eugw_parcels(3000, seed=4)
+    extra = pd.DataFrame({
+        'Quantity': ['nan', '1_000', ' 5 , x', 'None', '', '-0.0', '3,4,5', 'inf', '7.5', None],
+        'Quantity_Units': ['cmd', 'CMY', ' cms ,', 'cmd', 'cmd', 'cmd', 'cmy,kW', 'cms', 'cmd', 'cmd'],
+        'App_Purpose_Name': ['None', ' nan ', 'a,,b', 'Commercial', None, 'x, COMMERCIAL y',
+                             '', ' Dom ', 'a,b', 'z'],
+    })
+    attrs = pd.concat([df.astype(str).where(df.notna(), None), extra], ignore_index=True)
+    out = ec.derive_fields(attrs)
+
+    assert out['cls_purpose'].tolist() == [reference_classify_purpose(v) for v in attrs['App_Purpose_Name']]
+    for (qty, flag), got_qty, got_flag, got_log in zip(
+            (reference_sum_quantities(q, u) for q, u in zip(attrs['Quantity'], attrs['Quantity_Units'])),
+            out['qty_cmd'], out['qty_flag'], out['qty_cmd_log']):
+        assert got_flag == flag
+        if qty is None or math.isnan(qty):
+            assert math.isnan(got_qty)
+        else:
+            assert got_qty == qty
+        if qty is not None and qty > 0:
+            assert got_log == math.log10(qty + 1)
+        else:
+            assert math.isnan(got_log)
+
+
+def test_delta_refresh_matches_full_rebuild(tmp_path):
+    df, geoms = synthetic_layer(1200, seed=4)
+    write_parcel_layer(tmp_path / 'in.parquet', df, geoms)
+    out = tmp_path / 'delta.parquet'
+    ec.run_centroids(tmp_path / 'in.parquet', out, batch_size=300, delta=True)
+
+    # Edit attributes, drop parcels, grow geometries, add new parcels and duplicates
+    df2, geoms2 = df.copy(), geoms.copy()
+    df2.loc[50:79, 'Quantity'] = '123'
+    geoms2[300:305] = [shapely.buffer(g, 1) for g in geoms2[300:305]]
+    keep = np.ones(len(df2), dtype=bool)
+    keep[200:220] = False
+    added = [100, 100, 100] + list(range(1000, 1015))
+    df2 = pd.concat([df2[keep], df2.iloc[added].assign(Quantity='9')], ignore_index=True)
+    geoms2 = np.concatenate([geoms2[keep], geoms2[added]])
+    write_parcel_layer(tmp_path / 'in2.parquet', df2, geoms2)
+
+    counts = ec.run_centroids(tmp_path / 'in2.parquet', out, batch_size=300, delta=True)
+    assert counts['unchanged'] > 0 and counts['inserted'] > 0 and counts['deleted'] > 0
+
+    # No output there yet: a delta run builds everything, fingerprinted
+    ec.run_centroids(tmp_path / 'in2.parquet', tmp_path / 'full.parquet', batch_size=300, delta=True)
+    pd.testing.assert_frame_equal(read_sorted(out), read_sorted(tmp_path / 'full.parquet'))
+
+    # Nothing changed since: nothing inserted or deleted
+    counts = ec.run_centroids(tmp_path / 'in2.parquet', out, batch_size=250, delta=True)
+    assert counts['inserted'] == 0 and counts['deleted'] == 0
+
+
+@pytest.mark.parametrize('workers', [2, 3])
+def test_parallel_centroids_match_single_process(tmp_path, workers):
+    df, geoms = synthetic_layer(900, seed=6)
+    write_parcel_layer(tmp_path / 'in.parquet', df, geoms)
+    ec.run_centroids(tmp_path / 'in.parquet', tmp_path / 'serial.parquet', batch_size=400)
+    ec.run_centroids(tmp_path / 'in.parquet', tmp_path / 'pool.parquet', batch_size=400, workers=workers)
+    assert pq.read_table(tmp_path / 'pool.parquet').equals(pq.read_table(tmp_path / 'serial.parquet'))
+
+
+def test_full_build_skips_fingerprints(tmp_path, monkeypatch):
+    df, geoms = synthetic_layer(300, seed=5)
+    write_parcel_layer(tmp_path / 'in.parquet', df, geoms)
+
+    def no_fingerprints(self, attrs, wkb):
+        raise AssertionError("full build fingerprinted the source")
+    monkeypatch.setattr(ec.SourceFingerprints, 'keys', no_fingerprints)
+    ec.run_centroids(tmp_path / 'in.parquet', tmp_path / 'full.parquet', batch_size=100)
+    assert ec.HASH_FIELD not in pq.read_schema(tmp_path / 'full.parquet').names
+    monkeypatch.undo()
+
+    # A delta run cannot refresh an unfingerprinted output: it rebuilds it
+    counts = ec.run_centroids(tmp_path / 'in.parquet', tmp_path / 'full.parquet', batch_size=100, delta=True)
+    assert counts.get('unchanged', 0) == 0
+    assert ec.HASH_FIELD in pq.read_schema(tmp_path / 'full.parquet').names
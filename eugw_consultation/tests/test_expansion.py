@@ -0,0 +1,241 @@
+"""
+Well expansion: the vectorized and sharded engines against the row-wise
+reference (process_eugw_parcels_to_wells.py).
+"""
+
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import process_eugw_parcels_to_wells as eugw
+from eugw_synthetic import generate_eugw_parcels
+
+
+def edge_case_parcels(n, seed=0):
+    """Parcels mixing every token shape the parsers handle (numbers, text, blanks, mismatched lists)."""
+    r = random.Random(seed)
+    units = ['cmd', 'cmy', 'cms', 'Sel', 'kW', 'CMY', ' cmd', 'm3/day', '']
+    purposes = ['Irrigation', 'Commercial Enterprise', 'Domestic', 'Industrial commercial']
+    rows = []
+    for k in range(n):
+        nw = r.choice([0, 1, 1, 2, 3, 9])
+        lats, lons = [], []
+        for _ in range(nw):
+            c = r.random()
+            if c < 0.1:
+                lats.append(r.choice(['None', '', 'nan', 'abc']))
+                lons.append('-120.5')
+            elif c < 0.15:
+                lats.append(str(r.uniform(40, 70)))
+                lons.append(str(r.uniform(-150, -100)))
+            else:
+                lats.append(str(round(r.uniform(48.5, 59.5), 6)))
+                lons.append(str(round(r.uniform(-139, -115), 6)))
+        if r.random() < 0.1:
+            lons = lons[:-1]
+        lat = ', '.join(lats) if nw else (np.nan if r.random() < 0.5 else 'None')
+        lon = ','.join(lons) if nw else (np.nan if r.random() < 0.7 else 'x')
+        nq = r.choice([0, 1, 2, 3, max(nw, 1), 9])
+        qty = ','.join(r.choice([str(round(r.uniform(0, 5000), 3)), '', 'abc', '12', '1e3', 'nan'])
+                       for _ in range(nq)) if nq else np.nan
+        unit = ','.join(r.choice(units) for _ in range(r.choice([1, 2, nq + 1])))
+        npur = r.choice([0, 1, 2, 3, max(nw, 1)])
+        purpose = ', '.join(r.choice(purposes) for _ in range(npur)) if npur else np.nan
+        ntag = r.choice([0, 1, 2, nw])
+        tag = r.choice([';', ',', '; ']).join(r.choice(['123', '0', '', '45678', ' 99 ']) for _ in range(ntag)) \
+            if ntag else (np.nan if r.random() < 0.5 else 12345.0)
+        rows.append({'Licence': f'L{k}', 'Well_Latitude': lat, 'Well_Longitude': lon,
+                     'Quantity': qty, 'Quantity_Units': unit, 'App_Purpose_Name': purpose,
+                     'Well_Tag_Number': tag, 'Area': r.uniform(0, 10), 'Count': r.randint(0, 5)})
+    return pd.DataFrame(rows)
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_vectorized_matches_rowwise(seed):
+    df = edge_case_parcels(1500, seed)
+    expected, expected_counts = eugw.expand_parcels_rowwise(df)
+    out, counts = eugw.expand_parcels_vectorized(df)
+    assert dict(counts) == dict(expected_counts)
+    assert out.to_csv(index=False) == expected.to_csv(index=False)
+
+
+def test_vectorized_matches_rowwise_synthetic():
+    df = generate_eugw_parcels(2000, seed=3)
+    expected, _ = eugw.expand_parcels_rowwise(df)
+    out, _ = eugw.expand_parcels_vectorized(df)
+    assert out.to_csv(index=False) == expected.to_csv(index=False)
+
+
+def test_vectorized_matches_rowwise_without_well_tags():
+    df = generate_eugw_parcels(200, seed=1)
+    df['Well_Tag_Number'] = None
+    expected, _ = eugw.expand_parcels_rowwise(df)
+    out, _ = eugw.expand_parcels_vectorized(df)
+    assert out.to_csv(index=False) == expected.to_csv(index=False)
+
+
+def test_sharded_matches_single_process():
+    df = edge_case_parcels(600, seed=4)
+    expected, expected_counts = eugw.expand_parcels_vectorized(df)
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        out, counts = eugw.expand_parcels_sharded(df, executor, shards=3)
+    assert dict(counts) == dict(expected_counts)
+    assert out.to_csv(index=False) == expected.to_csv(index=False)
+
+
+def test_chunked_run_matches_single_pass(tmp_path):
+    src = tmp_path / 'parcels.csv'
+    generate_eugw_parcels(700, seed=5).to_csv(src, index=False)
+    full = tmp_path / 'full.csv'
+    chunked = tmp_path / 'chunked.csv'
+    eugw.process_eugw(src, full, run_report=False, qa_report=False)
+    eugw.process_eugw(src, chunked, chunk_size=97, run_report=False, qa_report=False)
+    assert chunked.read_text() == full.read_text()
+
+
+def sparse_parcels(n):
+    """Parcels whose Count is blank in places and whose Notes/WTNs only turn to text late."""
+    df = generate_eugw_parcels(n, seed=9)
+    df['Count'] = pd.array([None if i % 11 == 0 else i % 7 for i in range(n)], dtype='Int64')
+    df['Notes'] = [None] * (n - 5) + ['some note'] * 5
+    df['Well_Tag_Number'] = [str(10000 + i) for i in range(n - 5)] + ['81955;54733'] * 5
+    return df
+
+
+def test_chunked_output_does_not_depend_on_chunk_size(tmp_path):
+    src = tmp_path / 'sparse.xlsx'
+    sparse_parcels(60).to_excel(src, index=False)
+    outputs = []
+    for chunk_size in (7, 23, 1000):
+        out = tmp_path / f'chunked_{chunk_size}.csv'
+        eugw.process_eugw(src, out, chunk_size=chunk_size, ingest_cache=False,
+                          run_report=False, qa_report=False)
+        outputs.append(out.read_text())
+    assert outputs[0] == outputs[1] == outputs[2]
+    assert ',5.0,' not in outputs[0]
+
+
+@pytest.mark.parametrize('layout', ['wide', 'normalized'])
+def test_chunked_parquet_takes_text_late_in_the_file(tmp_path, layout):
+    src = tmp_path / 'sparse.xlsx'
+    sparse_parcels(60).to_excel(src, index=False)
+    out = tmp_path / 'chunked.parquet'
+    eugw.process_eugw(src, out, chunk_size=7, ingest_cache=False, layout=layout,
+                      run_report=False, qa_report=False)
+    parcels = pd.read_parquet(eugw.parcels_path_for(out) if layout == 'normalized' else out)
+    assert parcels['Notes'].dropna().unique().tolist() == ['some note']
+    assert '81955;54733' in set(parcels['Well_Tag_Number'])
+
+
+def test_parquet_writer_as_text_accepts_typed_chunks_that_disagree(tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    path = tmp_path / 'parcels.parquet'
+    writer = eugw.ParquetTableWriter(path, as_text=True)
+    writer.write(pd.DataFrame({eugw.PARCEL_ID: np.array([1, 2], dtype=np.int64),
+                               'Notes': [np.nan, np.nan], 'Well_Tag_Number': [81955, 54733]}))
+    writer.write(pd.DataFrame({eugw.PARCEL_ID: np.array([3], dtype=np.int64),
+                               'Notes': ['some note'], 'Well_Tag_Number': ['81955;54733']}))
+    writer.close()
+    table = pq.read_table(path)
+    assert str(table.schema.field(eugw.PARCEL_ID).type) == 'int64'
+    assert table.column('Notes').to_pylist() == [None, None, 'some note']
+    assert table.column('Well_Tag_Number').to_pylist() == ['81955', '54733', '81955;54733']
+
+
+def test_memoized_parsers_return_immutable_results():
+    qty = eugw.parse_and_convert_quantities('5,10', 'cmd')
+    _, _, purposes = eugw.classify_purpose('Domestic, Irrigation')
+    assert qty == ((5.0, 'cmd'), (10.0, 'cmd'))
+    assert purposes == ('Domestic', 'Irrigation')
+    assert eugw.parse_and_convert_quantities(None, 'cmd') == ()
+    assert eugw.classify_purpose(None)[2] == ()
+
+
+@pytest.mark.parametrize('engine', ['vectorized', 'rowwise'])
+def test_cache_report_only_for_rowwise_engine(tmp_path, capsys, engine):
+    src = tmp_path / 'parcels.csv'
+    generate_eugw_parcels(40, seed=2).to_csv(src, index=False)
+    eugw.process_eugw(src, tmp_path / 'wells.csv', engine=engine,
+                      run_report=False, qa_report=False)
+    assert ('Parse Cache' in capsys.readouterr().out) == (engine == 'rowwise')
+
+
+def test_chunked_output_does_not_depend_on_an_ingest_sidecar(tmp_path, monkeypatch):
+    import eugw_ingest
+    monkeypatch.setattr(eugw_ingest, 'DEFAULT_CACHE_DIR', str(tmp_path / 'cache'))
+    src = tmp_path / 'sparse.xlsx'
+    sparse_parcels(60).to_excel(src, index=False)
+
+    runs = {}
+    for name, cached in (('no_sidecar', False), ('sidecar', True)):
+        if cached:
+            eugw_ingest.read_parcels(src)
+            assert eugw_ingest.iter_cached_chunks(src, 7) is not None
+        out = tmp_path / f'{name}.csv'
+        eugw.process_eugw(src, out, chunk_size=7, ingest_cache=cached,
+                          run_report=False, qa_report=False)
+        runs[name] = out.read_text()
+    assert runs['sidecar'] == runs['no_sidecar']
+    assert ',1.0,' not in runs['sidecar']
+
+
+@pytest.mark.parametrize('chunk_size', [None, 40])
+def test_incremental_rerun_expands_only_the_edited_parcel(tmp_path, monkeypatch, chunk_size):
+    src = tmp_path / 'parcels.csv'
+    df = generate_eugw_parcels(150, seed=6)
+    df.to_csv(src, index=False)
+    out = tmp_path / 'incremental.csv'
+    eugw.process_eugw(src, out, chunk_size=chunk_size, incremental=True,
+                      run_report=False, qa_report=False)
+
+    df.loc[17, 'Quantity'] = '123'
+    df.to_csv(src, index=False)
+    expanded = []
+    vectorized = eugw.ENGINES['vectorized']
+
+    def counting(chunk, keep_columns=None):
+        expanded.append(len(chunk))
+        return vectorized(chunk, keep_columns=keep_columns)
+
+    monkeypatch.setitem(eugw.ENGINES, 'vectorized', counting)
+    eugw.process_eugw(src, out, chunk_size=chunk_size, incremental=True,
+                      run_report=False, qa_report=False)
+    assert sum(expanded) == 1
+
+    full = tmp_path / 'full.csv'
+    eugw.process_eugw(src, full, chunk_size=chunk_size, run_report=False, qa_report=False)
+    assert out.read_text() == full.read_text()
+
+    store = pd.read_pickle(eugw.incremental_store_path(out))
+    assert list(store['wells'].columns) == [eugw.HASH_COL, eugw.ROW_COL] + eugw.NEW_COLS
+
+
+@pytest.mark.parametrize('ext', ['.csv', '.parquet'])
+def test_normalized_layout_round_trips_to_wide(tmp_path, ext):
+    src = tmp_path / 'parcels.csv'
+    generate_eugw_parcels(150, seed=8).to_csv(src, index=False)
+    wide = tmp_path / f'wide{ext}'
+    normalized = tmp_path / f'normalized{ext}'
+    eugw.process_eugw(src, wide, run_report=False, qa_report=False)
+    eugw.process_eugw(src, normalized, chunk_size=40, layout='normalized',
+                      run_report=False, qa_report=False)
+
+    read = pd.read_parquet if ext == '.parquet' else pd.read_csv
+    expected = read(wide).drop(columns='geometry', errors='ignore')
+    slim = read(normalized).drop(columns='geometry', errors='ignore')
+    assert list(slim.columns) == eugw.NEW_COLS + [eugw.PARCEL_ID]
+    joined = eugw.read_well_points(normalized)
+    assert joined.astype(str).to_csv(index=False) == expected.astype(str).to_csv(index=False)
+
+    subset = eugw.read_well_points(normalized, columns=['File_Number'])
+    assert list(subset.columns) == eugw.NEW_COLS + ['File_Number']
+
+
+def test_join_rejects_unknown_parcel_ids():
+    wells = pd.DataFrame({c: [None] for c in eugw.NEW_COLS}).assign(**{eugw.PARCEL_ID: [9]})
+    parcels = pd.DataFrame({eugw.PARCEL_ID: [1], 'File_Number': ['A']})
+    with pytest.raises(KeyError):
+        eugw.join_wells_to_parcels(wells, parcels)
@@ -0,0 +1,74 @@
+"""
+GWELLS coordinate recovery (eugw_gwells.py): the WTN index and the batch
+join that fills rows without usable coordinates.
+"""
+
+import numpy as np
+import pandas as pd
+
+import process_eugw_parcels_to_wells as eugw
+from eugw_gwells import (normalize_wtns, load_gwells_index, recover_coordinates,
+                         RECOVERED_STATUS)
+
+
+def write_gwells(path):
+    pd.DataFrame({
+        'WELL_TAG_NUMBER': ['555', '777.0', '777', '888', '0', 'abc'],
+        'LATITUDE': ['50.5', '51.25', '40.0', '70.0', '50.0', '50.0'],
+        'LONGITUDE': ['122.5', '-121.75', '-121.0', '-120.0', '-120.0', '-120.0'],
+    }).to_csv(path, index=False)
+
+
+def test_normalize_wtns():
+    got = normalize_wtns(['12345', '12345.0', 12345.0, ' 7 ', 'abc', None, 0, ''])
+    assert got.tolist() == ['12345', '12345', '12345', '7', '', '', '', '']
+
+
+def test_index_keeps_first_valid_bc_location(tmp_path):
+    path = tmp_path / 'gwells.csv'
+    write_gwells(path)
+    index = load_gwells_index(path)
+    assert sorted(index.index) == ['555', '777']
+    assert index.loc['555', 'lon'] == -122.5
+    assert (index.loc['777', 'lat'], index.loc['777', 'lon']) == (51.25, -121.75)
+
+
+def test_recovery_tries_every_wtn_in_order(tmp_path):
+    path = tmp_path / 'gwells.csv'
+    write_gwells(path)
+    out_df = pd.DataFrame({
+        'pt_latitude': [49.0, np.nan, np.nan, np.nan],
+        'pt_longitude': [-123.0, np.nan, 1.0, np.nan],
+        'pt_well_tag': ['555', '', '', '999'],
+        'coord_status': ['valid', 'no_coordinates', 'invalid_coordinates', 'no_coordinates'],
+        'Well_Tag_Number': ['555', '999; 777;555', np.nan, '888'],
+    })
+    out_df, recovered = recover_coordinates(out_df, load_gwells_index(path))
+
+    assert recovered == 1
+    assert out_df['coord_status'].tolist() == ['valid', RECOVERED_STATUS,
+                                               'invalid_coordinates', 'no_coordinates']
+    assert out_df.loc[1, ['pt_latitude', 'pt_longitude', 'pt_well_tag']].tolist() == \
+        [51.25, -121.75, '777']
+    assert out_df.loc[0, ['pt_latitude', 'pt_longitude']].tolist() == [49.0, -123.0]
+
+
+def test_process_eugw_recovers_by_well_tag(tmp_path):
+    src = tmp_path / 'parcels.csv'
+    pd.DataFrame({
+        'Well_Latitude': ['None', '49.5'],
+        'Well_Longitude': ['None', '-123.5'],
+        'Quantity': ['10', '20'],
+        'Quantity_Units': ['cmd', 'cmd'],
+        'App_Purpose_Name': ['Domestic', 'Irrigation'],
+        'Well_Tag_Number': ['777', '555'],
+    }).to_csv(src, index=False)
+    gwells = tmp_path / 'gwells.csv'
+    write_gwells(gwells)
+
+    out = tmp_path / 'wells.csv'
+    eugw.process_eugw(src, out, gwells_file=str(gwells), run_report=False, qa_report=False)
+    wells = pd.read_csv(out, dtype={'pt_well_tag': str})
+    assert wells['coord_status'].tolist() == [RECOVERED_STATUS, 'valid']
+    assert wells.loc[0, ['pt_latitude', 'pt_longitude']].tolist() == [51.25, -121.75]
+    assert wells.loc[1, ['pt_latitude', 'pt_longitude']].tolist() == [49.5, -123.5]
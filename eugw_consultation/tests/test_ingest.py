@@ -0,0 +1,63 @@
+"""
+Ingest cache (eugw_ingest.py): sidecar hits, misses and keys.
+"""
+
+import os
+
+import pandas as pd
+import pytest
+
+import eugw_ingest
+from eugw_synthetic import generate_eugw_parcels
+
+pytest.importorskip('openpyxl')
+
+
+@pytest.fixture
+def workbook(tmp_path, monkeypatch):
+    monkeypatch.setattr(eugw_ingest, 'DEFAULT_CACHE_DIR', str(tmp_path / 'cache'))
+    path = tmp_path / 'parcels.xlsx'
+    generate_eugw_parcels(50, seed=3).to_excel(path, index=False)
+    return path
+
+
+def test_sidecar_hit_returns_the_workbook_table(workbook, capsys):
+    first = eugw_ingest.read_parcels(workbook, engine='openpyxl')
+    assert 'Ingest cache written' in capsys.readouterr().out
+    second = eugw_ingest.read_parcels(workbook, engine='openpyxl')
+    assert 'Ingest cache hit' in capsys.readouterr().out
+    pd.testing.assert_frame_equal(second, first)
+    pd.testing.assert_frame_equal(second, pd.read_excel(workbook, engine='openpyxl'))
+
+
+def test_hit_after_touch_does_not_rewrite_metadata(workbook, capsys):
+    eugw_ingest.read_parcels(workbook, engine='openpyxl')
+    meta_path = eugw_ingest.sidecar_paths(workbook, engine='openpyxl')[1]
+    written = os.stat(meta_path).st_mtime_ns
+    with open(meta_path) as f:
+        meta = f.read()
+
+    stat = os.stat(workbook)
+    os.utime(workbook, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    capsys.readouterr()
+    eugw_ingest.read_parcels(workbook, engine='openpyxl')
+    assert 'Ingest cache hit' in capsys.readouterr().out
+    assert os.stat(meta_path).st_mtime_ns == written
+    with open(meta_path) as f:
+        assert f.read() == meta
+
+
+def test_sidecar_is_keyed_by_excel_engine(workbook):
+    eugw_ingest.read_parcels(workbook, engine='openpyxl')
+    assert eugw_ingest.sidecar_paths(workbook, engine='openpyxl') != \
+        eugw_ingest.sidecar_paths(workbook, engine='calamine')
+    assert eugw_ingest.iter_cached_chunks(workbook, 10, engine='openpyxl') is not None
+    assert eugw_ingest.iter_cached_chunks(workbook, 10, engine='calamine') is None
+
+
+def test_edited_workbook_is_read_again(workbook, capsys):
+    eugw_ingest.read_parcels(workbook, engine='openpyxl')
+    generate_eugw_parcels(60, seed=3).to_excel(workbook, index=False)
+    capsys.readouterr()
+    assert len(eugw_ingest.read_parcels(workbook, engine='openpyxl')) == 60
+    assert 'Ingest cache written' in capsys.readouterr().out
@@ -0,0 +1,51 @@
+"""
+Run instrumentation (eugw_instrument.py): stage accounting and the JSON
+run report process_eugw writes.
+"""
+
+import json
+
+import pandas as pd
+
+import process_eugw_parcels_to_wells as eugw
+from eugw_instrument import RunProfiler, report_path_for
+from eugw_synthetic import generate_eugw_parcels
+
+
+def test_repeated_stages_accumulate():
+    profiler = RunProfiler()
+    for n in (3, 4):
+        with profiler.stage('expand', rows=n):
+            pass
+    with profiler.stage('read') as live:
+        live['rows'] = 10
+
+    summary = profiler.summary()
+    assert list(summary) == ['expand', 'read']
+    assert (summary['expand']['calls'], summary['expand']['rows']) == (2, 7)
+    assert summary['read']['rows'] == 10
+
+
+def test_timed_iter_yields_every_item_and_counts_rows():
+    profiler = RunProfiler()
+    chunks = [pd.DataFrame({'a': range(n)}) for n in (5, 2, 8)]
+    assert [len(c) for c in profiler.timed_iter(chunks, 'read')] == [5, 2, 8]
+    # One call per chunk plus the exhausted next()
+    assert (profiler.summary()['read']['calls'], profiler.summary()['read']['rows']) == (4, 15)
+
+
+def test_process_eugw_writes_run_report(tmp_path):
+    src = tmp_path / 'parcels.csv'
+    generate_eugw_parcels(120, seed=1).to_csv(src, index=False)
+    out = tmp_path / 'wells.csv'
+    eugw.process_eugw(src, out, chunk_size=50, qa_report=False)
+
+    assert report_path_for(out) == str(tmp_path / 'wells_run_report.json')
+    with open(report_path_for(out)) as f:
+        report = json.load(f)
+    stages = report['stages']
+    assert {'read', 'expand', 'write', 'summary'} <= set(stages)
+    assert stages['read']['rows'] == stages['expand']['rows'] == 120
+    assert stages['expand']['calls'] == 3
+    assert report['run']['parcels'] == 120
+    assert report['run']['output_rows'] == stages['write']['rows'] == len(pd.read_csv(out))
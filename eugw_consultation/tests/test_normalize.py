@@ -0,0 +1,61 @@
+"""
+Shared normalization (eugw_normalize.py): each script keeps the units its
+original converter accepted.
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+
+from eugw_normalize import (quantity_to_cmd, quantities_to_cmd, LICENCE_UNITS,
+                            PARCEL_UNITS)
+
+
+UNITS = ['cmd', 'CMY', ' cms ', 'm3/day', 'm3/year', 'Sel', 'kW', '', 'litres']
+
+
+def baseline_parcel_to_cmd(qty, unit):
+    """The wells/centroids scripts' original convert_single_qty_to_cmd."""
+    try:
+        qty = float(qty)
+    except (ValueError, TypeError):
+        return None
+    unit = str(unit).strip().lower()
+    if unit == 'cmd':
+        return qty
+    elif unit == 'cmy':
+        return qty / 365.0
+    elif unit == 'cms':
+        return qty * 86400.0
+    return None
+
+
+def baseline_licence_to_cmd(qty, unit):
+    """total_withdrawal_raster's original convert_licence_to_cmd."""
+    unit = str(unit).strip().lower()
+    if unit in ("m3/day", "cmd"):
+        return float(qty)
+    elif unit in ("m3/year", "cmy"):
+        return float(qty) / 365.0
+    return None
+
+
+def as_float(value):
+    return np.nan if value is None else value
+
+
+def test_parcel_units_match_the_wells_and_centroid_scripts():
+    for unit in UNITS:
+        assert quantity_to_cmd('12.5', unit) == baseline_parcel_to_cmd('12.5', unit)
+        assert quantity_to_cmd('12.5', unit, PARCEL_UNITS) == baseline_parcel_to_cmd('12.5', unit)
+    assert quantity_to_cmd('10', 'm3/day') is None
+    assert quantity_to_cmd('1', 'cms') == 86400.0
+
+
+def test_licence_units_match_the_withdrawal_raster():
+    qty = pd.Series(['730'] * len(UNITS), dtype=object)
+    got = quantities_to_cmd(qty, pd.Series(UNITS, dtype=object), LICENCE_UNITS)
+    expected = np.array([as_float(baseline_licence_to_cmd('730', u)) for u in UNITS])
+    np.testing.assert_array_equal(got, expected)
+    assert math.isnan(quantities_to_cmd(pd.Series(['1']), pd.Series(['cms']), LICENCE_UNITS)[0])
@@ -0,0 +1,74 @@
+"""
+QA report (eugw_qa.py): bounded quantity sketches against exact statistics.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from eugw_qa import QAReport, QUANTILES
+
+
+def well_rows(n, seed=0):
+    """Expanded well rows with the columns QAReport reads."""
+    rng = np.random.default_rng(seed)
+    qty = rng.lognormal(3, 2, n)
+    qty[rng.random(n) < 0.1] = np.nan
+    return pd.DataFrame({
+        'coord_status': rng.choice(['valid', 'recovered_gwells', 'missing'], n),
+        'classified_purpose': rng.choice(['Domestic', 'Irrigation', 'Unknown'], n),
+        'quantity_flag': rng.choice(['single', 'summed', 'no_quantity'], n),
+        'quantity_cmd': qty,
+        'pt_well_tag': rng.choice(['', '81955', None], n),
+    })
+
+
+def test_quantiles_within_relative_accuracy_of_exact():
+    rows = well_rows(20000)
+    qa = QAReport()
+    for start in range(0, len(rows), 3000):
+        qa.update(rows.iloc[start:start + 3000], rows.iloc[start:start + 3000])
+    m = qa.metrics()
+
+    finite = rows[np.isfinite(rows['quantity_cmd'])]
+    groups = {'all': finite}
+    groups.update({flag: g for flag, g in finite.groupby('quantity_flag')})
+    for name, group in groups.items():
+        stats = m['quantity_cmd'] if name == 'all' else m['quantity_cmd_by_flag'][name]
+        values = group['quantity_cmd'].to_numpy()
+        assert stats['count'] == len(values)
+        assert stats['min'] == values.min() and stats['max'] == values.max()
+        assert stats['sum'] == pytest.approx(values.sum())
+        for q in QUANTILES:
+            exact = np.quantile(values, q, method='lower')
+            assert abs(stats[f"p{int(q * 100):02d}"] - exact) <= 0.01 * exact
+
+    # Only bucket counts are kept, far fewer than the rows
+    buckets = sum(len(s.sketch.positive) for s in qa.quantity_by_flag.values())
+    assert buckets < 3000
+
+
+def test_chunked_quantiles_match_single_pass():
+    rows = well_rows(5000, seed=1)
+    single, chunked = QAReport(), QAReport()
+    single.update(rows, rows)
+    for start in range(0, len(rows), 333):
+        chunked.update(rows.iloc[start:start + 333], rows.iloc[start:start + 333])
+    a, b = single.metrics(), chunked.metrics()
+    for key in ['count', 'min', 'max'] + [f"p{int(q * 100):02d}" for q in QUANTILES]:
+        assert a['quantity_cmd'][key] == b['quantity_cmd'][key]
+    assert a['counts'] == b['counts'] and a['coverage_pct'] == b['coverage_pct']
+
+
+def test_category_counts_are_folded_per_chunk():
+    rows = well_rows(4000, seed=2)
+    rows.loc[::17, 'classified_purpose'] = None
+    single, chunked = QAReport(), QAReport()
+    single.update(rows, rows)
+    for start in range(0, len(rows), 100):
+        chunked.update(rows.iloc[start:start + 100], rows.iloc[start:start + 100])
+
+    # One entry per distinct category combination, however many chunks
+    assert len(chunked.joint) == len(single.joint) <= 3 * 4 * 3
+    assert chunked.metrics()['counts'] == single.metrics()['counts']
+    assert chunked.metrics()['counts']['classified_purpose']['null'] == len(rows[::17])
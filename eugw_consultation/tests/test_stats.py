@@ -0,0 +1,50 @@
+"""
+Streaming statistics (eugw_stats.py): values added one at a time land in
+the same buckets as the same values added as an array.
+"""
+
+import numpy as np
+
+from eugw_stats import QuantileSketch, StreamingStats
+
+
+def boundary_values(seed=0):
+    """Random values plus values on and next to every bucket boundary."""
+    rng = np.random.default_rng(seed)
+    gamma = QuantileSketch().gamma
+    edges = np.array([gamma ** k for k in range(-400, 400)])
+    values = np.concatenate([edges, np.nextafter(edges, 0), np.nextafter(edges, np.inf),
+                             rng.lognormal(2, 4, 5000), [0.0, 1e-13]])
+    return np.concatenate([values, -values[::3]])
+
+
+def test_values_on_a_bucket_edge_stay_in_the_lower_bucket():
+    sketch = QuantileSketch()
+    keys = np.arange(-400, 400)
+    edges = np.array([sketch.gamma ** int(k) for k in keys])
+    assert (sketch._keys(edges) == keys).all()
+    assert (sketch._keys(np.nextafter(edges, np.inf)) == keys + 1).all()
+    assert [int(sketch._keys(np.array([e]))[0]) for e in edges[::37]] == keys[::37].tolist()
+
+
+def test_add_and_add_many_fill_the_same_buckets():
+    values = boundary_values()
+    one, many = QuantileSketch(), QuantileSketch()
+    for v in values:
+        one.add(float(v))
+    many.add_many(values)
+    assert one.positive == many.positive
+    assert one.negative == many.negative
+    assert (one.zeros, one.count) == (many.zeros, many.count)
+
+
+def test_streaming_stats_summary_does_not_depend_on_how_values_are_added():
+    values = np.append(boundary_values(seed=1), np.nan)
+    one, many = StreamingStats(), StreamingStats()
+    for v in values:
+        one.add(float(v))
+    for part in np.array_split(values, 7):
+        many.add_many(part)
+    a, b = one.summary((0.05, 0.5, 0.95, 0.99)), many.summary((0.05, 0.5, 0.95, 0.99))
+    assert np.isclose(a.pop('mean'), b.pop('mean'))
+    assert a == b
@@ -0,0 +1,88 @@
+"""
+Well point export (eugw_well_points.py): which rows count as located,
+block streaming of wide and normalized outputs, and the reprojected
+GeoParquet layer.
+"""
+
+import numpy as np
+import pandas as pd
+import pyproj
+import pytest
+import shapely
+
+pytest.importorskip('pyarrow')
+import pyarrow.parquet as pq
+
+import process_eugw_parcels_to_wells as eugw
+from eugw_gwells import LOCATED_STATUS
+from eugw_synthetic import generate_eugw_parcels
+from eugw_well_points import (read_located_wells, iter_located_wells, reproject_points,
+                              convert_well_points)
+
+
+@pytest.fixture
+def wells_output(tmp_path):
+    src = tmp_path / 'parcels.csv'
+    generate_eugw_parcels(400, seed=3).to_csv(src, index=False)
+    eugw.process_eugw(src, tmp_path / 'wide.csv', run_report=False, qa_report=False)
+    eugw.process_eugw(src, tmp_path / 'normalized.csv', layout='normalized',
+                      run_report=False, qa_report=False)
+    return tmp_path
+
+
+def test_only_valid_rows_are_exported_by_default(tmp_path):
+    wells = pd.DataFrame({
+        'pt_latitude': [49.1, 50.2, np.nan, 51.0, 52.5],
+        'pt_longitude': [-123.1, -121.5, np.nan, -120.0, -119.5],
+        'pt_well_tag': ['1', '2', '', '4', '5'],
+        'quantity_cmd': [1.0, 2.0, 3.0, 4.0, 5.0],
+        'coord_status': ['valid', 'recovered_gwells', 'no_coordinates',
+                         'outside_aoi', 'invalid_coordinates'],
+    })
+    path = tmp_path / 'wells.csv'
+    wells.to_csv(path, index=False)
+
+    assert read_located_wells(path)['pt_well_tag'].tolist() == ['1']
+    located = read_located_wells(path, statuses=LOCATED_STATUS)
+    assert located['coord_status'].tolist() == ['valid', 'recovered_gwells']
+
+
+def test_blocks_stream_the_same_rows(wells_output):
+    expected = read_located_wells(wells_output / 'wide.csv')
+    blocks = list(iter_located_wells(wells_output / 'wide.csv', block_rows=50))
+    assert len(blocks) > 1
+    assert all(len(b) >= 50 for b in blocks[:-1])
+    streamed = pd.concat(blocks, ignore_index=True)
+    assert streamed.to_csv(index=False) == expected.to_csv(index=False)
+    assert set(streamed['coord_status']) == {'valid'}
+
+
+def test_normalized_input_is_joined_to_its_parcels(wells_output):
+    wide = read_located_wells(wells_output / 'wide.csv')
+    joined = pd.concat(iter_located_wells(wells_output / 'normalized.csv', block_rows=50),
+                       ignore_index=True)
+    assert joined.to_csv(index=False) == wide.to_csv(index=False)
+
+
+def test_reprojection_matches_pyproj():
+    lon = np.array([-123.1, -120.0, -115.5])
+    lat = np.array([49.3, 53.9, 58.8])
+    x, y = reproject_points(lon, lat)
+    ex, ey = pyproj.Transformer.from_crs('EPSG:4326', 'EPSG:3005', always_xy=True).transform(lon, lat)
+    np.testing.assert_array_equal(x, ex)
+    np.testing.assert_array_equal(y, ey)
+
+
+def test_geoparquet_points_are_in_bc_albers(wells_output):
+    out = wells_output / 'points.parquet'
+    written = convert_well_points(wells_output / 'wide.csv', out, block_rows=50)
+    wells = read_located_wells(wells_output / 'wide.csv')
+    assert written == len(wells)
+
+    table = pq.read_table(out)
+    assert table.num_rows == written
+    points = shapely.from_wkb(table.column('geometry').to_numpy(zero_copy_only=False))
+    x, y = reproject_points(wells['pt_longitude'], wells['pt_latitude'])
+    np.testing.assert_array_equal(shapely.get_x(points), x)
+    np.testing.assert_array_equal(shapely.get_y(points), y)
+    assert b'3005' in table.schema.metadata[b'geo']
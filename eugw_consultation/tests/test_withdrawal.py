@@ -0,0 +1,231 @@
+"""
+Open withdrawal backend (eugw_withdrawal.py): Step 2 dedup and Step 3
+aquifer join against the arcpy script's per-record rules, and the tiled
+rasterizer against a single-array burn and brute-force cell areas.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+import shapely
+
+import eugw_withdrawal as w
+from eugw_withdrawal import parse_wtns, parse_aquifer_ids
+
+
+# ============================================================
+# REFERENCES (the arcpy script's per-record loops)
+# ============================================================
+
+def reference_dedup(records, licence_cmd_by_wtn, gwells_aq, aq_material):
+    """Step 2 of total_withdrawal_raster.py as the original cursor loop."""
+    rows = []
+    for wtn_raw, qty_cmd, aq_ids_raw in records:
+        wtns = parse_wtns(wtn_raw)
+        licensed_vol = 0
+        matched_wtns = []
+        for wtn in wtns:
+            if wtn in licence_cmd_by_wtn:
+                licensed_vol += licence_cmd_by_wtn[wtn]
+                matched_wtns.append(wtn)
+        original_cmd = qty_cmd if qty_cmd is not None else 0
+        if not matched_wtns:
+            adjusted_cmd, flag = original_cmd, "no_licence_match"
+        else:
+            adjusted_cmd = original_cmd - licensed_vol
+            if adjusted_cmd <= 0:
+                continue
+            flag = f"reduced_by_{','.join(matched_wtns)}"
+
+        resolved_aq, aq_src = None, ""
+        for wtn in wtns:
+            if wtn in gwells_aq:
+                resolved_aq, aq_src = gwells_aq[wtn], f"gwells_wtn_{wtn}"
+                break
+        if resolved_aq is None:
+            aq_ids = parse_aquifer_ids(aq_ids_raw)
+            if len(aq_ids) == 1:
+                resolved_aq, aq_src = aq_ids[0], "eugw_attribute_single"
+            elif len(aq_ids) > 1:
+                shallow = [a for a in aq_ids if "sand" in aq_material.get(a, "").lower()]
+                if shallow:
+                    resolved_aq, aq_src = shallow[0], f"eugw_attribute_resolved_shallow_{len(aq_ids)}_ids"
+                else:
+                    resolved_aq, aq_src = aq_ids[0], f"eugw_attribute_resolved_first_{len(aq_ids)}_ids"
+        rows.append(('; '.join(wtns), float(adjusted_cmd), resolved_aq, aq_src, "EUGW", flag))
+    return rows
+
+
+def reference_join(points, polygons, aquifer_ids, materials):
+    """Step 3 spatial join resolution (JOIN_ONE_TO_MANY, WITHIN) per point."""
+    resolved = {}
+    for i, point in enumerate(points):
+        if point is None:
+            continue
+        entries = [(int(a), str(m).lower() if m else "")
+                   for poly, a, m in zip(polygons, aquifer_ids, materials)
+                   if poly is not None and a is not None and point.within(poly)]
+        if not entries:
+            continue
+        if len(entries) == 1:
+            resolved[i] = (entries[0][0], "licence_spatial_join_single")
+            continue
+        shallow = [e for e in entries if "sand" in e[1]]
+        if shallow:
+            resolved[i] = (shallow[0][0], f"licence_spatial_join_resolved_shallow_{len(entries)}_ids")
+        else:
+            resolved[i] = (entries[0][0], f"licence_spatial_join_resolved_first_{len(entries)}_ids")
+    return resolved
+
+
+def brute_force_raster(polygons, values, priorities, x0, y0, cell_size, n_rows, n_cols):
+    """
+    PolygonToRaster per cell from exact intersections of every cell and
+    polygon: the largest positive priority, else the maximum combined area.
+    """
+    grid = np.full((n_rows, n_cols), w.NODATA, dtype=np.float32)
+    for r in range(n_rows):
+        for c in range(n_cols):
+            cell = shapely.box(x0 + c * cell_size, y0 - (r + 1) * cell_size,
+                               x0 + (c + 1) * cell_size, y0 - r * cell_size)
+            overlaps = [(value, priority, poly.intersection(cell).area)
+                        for poly, value, priority in zip(polygons, values, priorities)]
+            overlaps = [o for o in overlaps if o[2] > 0]
+            top = max((o[1] for o in overlaps), default=0)
+            area = {}
+            for value, priority, a in overlaps:
+                if top <= 0 or priority == top:
+                    area[value] = area.get(value, 0) + a
+            if area:
+                grid[r, c] = max(area.items(), key=lambda kv: (kv[1], kv[0]))[0]
+    return grid
+
+
+# ============================================================
+# FIXTURES
+# ============================================================
+
+def eugw_records(n, seed):
+    rng = np.random.default_rng(seed)
+    wtn_pool = [str(i) for i in range(1, 60)] + ['12.0', ' 7 ', 'abc', '', 'x1']
+    aq_pool = [str(i) for i in range(1, 15)] + ['3.0', '', 'bad', ' 4']
+    records = []
+    for _ in range(n):
+        wtn = None if rng.random() < 0.1 else \
+            str(rng.choice([';', ',', '; '])).join(rng.choice(wtn_pool, rng.integers(0, 5)))
+        qty = None if rng.random() < 0.05 else float(rng.uniform(0, 80))
+        aq = None if rng.random() < 0.2 else \
+            str(rng.choice([',', ';', ', '])).join(rng.choice(aq_pool, rng.integers(0, 4)))
+        records.append((wtn, qty, aq))
+    licences = {str(i): float(rng.uniform(0, 30)) for i in range(1, 40, 2)}
+    gwells = {str(i): int(rng.integers(1, 15)) for i in range(5, 60, 4)}
+    materials = {i: str(rng.choice(['Sand and Gravel', 'Bedrock', '', 'SAND'])) for i in range(1, 12)}
+    return records, licences, gwells, materials
+
+
+def overlapping_polygons(n, seed, extent=1000):
+    rng = np.random.default_rng(seed)
+    polygons = []
+    for i in range(n):
+        cx, cy = rng.uniform(0, extent, 2)
+        r = rng.uniform(extent / 40, extent / 4)
+        p = shapely.Point(cx, cy).buffer(r, quad_segs=int(rng.integers(1, 12)))
+        if i % 4 == 0:
+            p = p.difference(shapely.Point(cx + r / 4, cy).buffer(r / 3))
+        if i % 7 == 0:
+            p = shapely.union(p, shapely.box(cx, cy - extent / 2, cx + extent / 30, cy - extent / 3))
+        polygons.append(p)
+    return polygons
+
+
+# ============================================================
+# TESTS
+# ============================================================
+
+@pytest.mark.parametrize('seed', [0, 1])
+def test_dedup_matches_record_loop(seed):
+    records, licences, gwells, materials = eugw_records(5000, seed)
+    expected = reference_dedup(records, licences, gwells, materials)
+
+    wtn, qty, aq = (np.array(col, dtype=object) for col in zip(*records))
+    out, counts = w.dedup_eugw(wtn, qty, aq, licences, gwells, materials)
+    got = [(t, q, None if pd.isna(a) else int(a), s, src, f)
+           for t, q, a, s, src, f in out.itertuples(index=False)]
+    assert got == expected
+    assert counts['kept'] == len(expected)
+    assert counts['kept'] + counts['dropped'] == len(records)
+
+
+def test_aquifer_join_matches_spatial_join_resolution():
+    rng = np.random.default_rng(3)
+    polygons = overlapping_polygons(120, seed=3)
+    polygons[5] = None
+    ids = [None if i % 17 == 0 else int(rng.integers(1, 400)) for i in range(len(polygons))]
+    materials = [rng.choice(['Sand and Gravel', 'Bedrock', None, 'sand']) for _ in polygons]
+    points = list(shapely.points(rng.uniform(-100, 1100, (2000, 2))))
+    points[3] = None
+
+    expected = reference_join(points, polygons, ids, materials)
+    resolved = w.join_aquifers(w.aquifer_tree(polygons), points, ids, materials, 'licence_spatial_join')
+    got = {int(i): (int(a), s) for i, (a, s) in zip(resolved.index, resolved.itertuples(index=False))}
+    assert got == expected
+
+
+def test_burn_matches_brute_force_cell_areas():
+    rng = np.random.default_rng(1)
+    polygons = overlapping_polygons(20, seed=1, extent=600)
+    values = rng.integers(0, 6, len(polygons)).astype(float)
+    geoms = np.array(polygons, dtype=object)
+    x0, y0, n_rows, n_cols = w.raster_grid(shapely.total_bounds(geoms), 30)
+    grid = w.burn_polygons(geoms, values, x0, y0, 30, n_rows, n_cols, priorities=values)
+    expected = brute_force_raster(polygons, values, values, x0, y0, 30, n_rows, n_cols)
+    np.testing.assert_array_equal(grid, expected)
+
+
+def test_priority_field_wins_over_combined_area():
+    # A sliver of the denser aquifer beats the aquifer covering most of the cell
+    big = shapely.box(0, 0, 60, 30)
+    sliver = shapely.box(25, 0, 60, 30)
+    zero = shapely.box(0, 0, 60, 30)
+    geoms = np.array([big, sliver, zero], dtype=object)
+    grid = w.burn_polygons(geoms[:2], [2.0, 7.0], 0, 30, 30, 1, 2, priorities=[2.0, 7.0])
+    np.testing.assert_array_equal(grid, [[7.0, 7.0]])
+    # Without priorities (or only zero priorities) the combined area decides
+    grid = w.burn_polygons(geoms[:2], [2.0, 7.0], 0, 30, 30, 1, 2)
+    np.testing.assert_array_equal(grid, [[2.0, 7.0]])
+    grid = w.burn_polygons(geoms[[0, 2]], [0.0, 0.0], 0, 30, 30, 1, 2, priorities=[0.0, 0.0])
+    np.testing.assert_array_equal(grid, [[0.0, 0.0]])
+
+
+def _assemble(tiles, n_rows, n_cols):
+    grid = np.full((n_rows, n_cols), np.nan, dtype=np.float32)
+    for r, c, tile in tiles:
+        grid[r:r + tile.shape[0], c:c + tile.shape[1]] = tile
+    return grid
+
+
+@pytest.mark.parametrize('tile_size', [17, 64, 1024])
+def test_tiles_match_single_array_burn(tile_size):
+    rng = np.random.default_rng(5)
+    geoms = np.array(overlapping_polygons(40, seed=5, extent=3000), dtype=object)
+    values = np.round(rng.uniform(0, 50, len(geoms)), 4)
+    values[::5] = values[0]
+    x0, y0, n_rows, n_cols = w.raster_grid(shapely.total_bounds(geoms), 30)
+    expected = w.burn_polygons(geoms, values, x0, y0, 30, n_rows, n_cols, priorities=values)
+    tiles = w.iter_density_tiles(geoms, values, x0, y0, 30, n_rows, n_cols, tile_size,
+                                 priorities=values)
+    np.testing.assert_array_equal(_assemble(tiles, n_rows, n_cols), expected)
+
+
+def test_tiles_in_process_pool_match_serial():
+    rng = np.random.default_rng(8)
+    geoms = np.array(overlapping_polygons(25, seed=8, extent=2000), dtype=object)
+    values = np.round(rng.uniform(0, 50, len(geoms)), 4)
+    x0, y0, n_rows, n_cols = w.raster_grid(shapely.total_bounds(geoms), 30)
+    expected = w.burn_polygons(geoms, values, x0, y0, 30, n_rows, n_cols, priorities=values)
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        tiles = w.iter_density_tiles(geoms, values, x0, y0, 30, n_rows, n_cols, 23, executor, 4,
+                                     priorities=values)
+        np.testing.assert_array_equal(_assemble(tiles, n_rows, n_cols), expected)